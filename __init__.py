@@ -1,3 +1,12 @@
 from .main import run_bot
 
-__all__ = ["run_bot"]
+__all__ = ["run_bot", "recompute_ratings"]
+
+
+def __getattr__(name: str):
+    # Imported on first use so `python -m boost_bot.recompute` doesn't find the module already loaded.
+    if name == "recompute_ratings":
+        from .recompute import main
+
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,4 @@
+"""Offline benchmark suite on synthetic data; see ``python -m boost_bot.benchmarks --help``."""
+from .runner import bench, main
+
+__all__ = ["bench", "main"]
@@ -0,0 +1,34 @@
+"""Team balancing for every lobby size the bot allows."""
+import random
+
+from ..balance import partition_teams, partition_teams_constrained
+from .runner import bench
+
+LOBBY_SIZES = (2, 4, 8, 10, 16, 20, 24, 30, 36, 40)
+
+
+def synthetic_lobby(seed: int, size: int) -> list[tuple[int, int]]:
+    """``size`` players with points spread like a live ladder (mostly 700-1300)."""
+    rng = random.Random(seed * 1000 + size)
+    return [(10_000 + i, max(0, int(rng.gauss(1000, 150)))) for i in range(size)]
+
+
+@bench("balance", "exact", params=[f"n={n}" for n in LOBBY_SIZES], quick=["n=2", "n=10", "n=40"])
+def exact(ctx, param):
+    players = synthetic_lobby(ctx.seed, int(param[2:]))
+    return lambda: partition_teams(players)
+
+
+@bench("balance", "constrained", params=[f"n={n}" for n in LOBBY_SIZES if n >= 4], quick=["n=10", "n=40"])
+def constrained(ctx, param):
+    size = int(param[2:])
+    players = synthetic_lobby(ctx.seed, size)
+    rng = random.Random(ctx.seed * 1000 + size + 1)
+    uids = [uid for uid, _ in players]
+    rng.shuffle(uids)
+    # One premade pair per 10 players, one keep-apart pair, one capped role.
+    together = [set(uids[i:i + 2]) for i in range(0, max(2, size // 5), 2)]
+    apart = {frozenset(uids[-2:])}
+    roles = {uid: "healer" for uid in uids[size // 2: size // 2 + max(2, size // 5)]}
+    role_caps = {"healer": max(1, (len(roles) + 1) // 2)}
+    return lambda: partition_teams_constrained(players, together, apart, roles, role_caps)
@@ -0,0 +1,57 @@
+"""Queue embed rendering for open and started lobbies of every size."""
+from paths import BOOST_PLAYERS_FILE
+
+from ..stats_store import _StatsCache
+from .bench_store import synthetic_stats
+from .runner import SkipCase, bench
+
+LOBBY_SIZES = (2, 10, 20, 40)
+# Ladder the started-match embed looks team points up in.
+LADDER_SIZE = 10_000
+
+_PARAMS = [f"n={n}" for n in LOBBY_SIZES]
+
+
+def _view(ctx, size: int, started: bool):
+    try:
+        from ..lobby import Lobby
+        from ..views import JoinView
+    except ImportError as e:
+        raise SkipCase(f"discord.py is not installed ({e})")
+
+    uids = [100_000_000_000_000_000 + i * 37 for i in range(size)]
+    lobby = Lobby(uids[0], title="Benchmark", max_players=max(size, 2))
+    for uid in uids:
+        lobby.add(uid)
+    # Constraints add a field to the open-lobby embed.
+    lobby.together = [set(uids[:2])]
+    if started:
+        lobby.started = True
+        lobby.team_a, lobby.team_b = uids[::2], uids[1::2]
+        lobby.forfeit_votes_a = set(uids[:2:2])
+    return JoinView(0, lobby)
+
+
+@bench("embed", "open", params=_PARAMS, quick=["n=10", "n=40"])
+async def open_lobby(ctx, param):
+    view = _view(ctx, int(param[2:]), started=False)
+    return lambda: view.build_queue_embed(None, note="Benchmark note")
+
+
+@bench("embed", "started", params=_PARAMS, quick=["n=10", "n=40"])
+async def started(ctx, param):
+    """Team totals come from the shared stats cache, seeded here so no file is read."""
+    view = _view(ctx, int(param[2:]), started=True)
+    import discord
+
+    cache = _StatsCache._instances.pop(BOOST_PLAYERS_FILE, None)
+    seeded = _StatsCache.for_path(BOOST_PLAYERS_FILE)
+    seeded.data = synthetic_stats(ctx.seed, LADDER_SIZE)
+    guild = discord.Object(id=1)
+    try:
+        yield lambda: view.build_queue_embed(guild)
+    finally:
+        if cache is not None:
+            _StatsCache._instances[BOOST_PLAYERS_FILE] = cache
+        else:
+            _StatsCache._instances.pop(BOOST_PLAYERS_FILE, None)
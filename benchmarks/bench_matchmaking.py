@@ -0,0 +1,39 @@
+"""Matchmaker passes over large standing queues."""
+import random
+
+from ..matchmaking import MatchmakingQueue, QueueEntry
+from .runner import bench
+
+QUEUE_SIZES = (100, 1_000, 10_000, 100_000)
+
+
+def synthetic_queue(seed: int, count: int, now: float) -> MatchmakingQueue:
+    """``count`` players who queued over the last five minutes."""
+    rng = random.Random(seed * 31 + count)
+    queue = MatchmakingQueue()
+    for i in range(count):
+        queue.add(QueueEntry(10_000 + i, max(0, int(rng.gauss(1000, 200))), None, now - rng.uniform(0, 300)))
+    return queue
+
+
+@bench("matchmaking", "enqueue", params=[f"n={n}" for n in QUEUE_SIZES], quick=["n=1000"])
+def enqueue(ctx, param):
+    queue = synthetic_queue(ctx.seed, int(param[2:]), 0.0)
+    rng = random.Random(ctx.seed)
+    uids = iter(range(10**9, 2 * 10**9))
+
+    def run():
+        uid = next(uids)
+        queue.add(QueueEntry(uid, rng.randint(500, 1500), None, 1.0))
+        queue.remove(uid)
+    return run
+
+
+@bench("matchmaking", "tick", params=[f"n={n}" for n in QUEUE_SIZES], quick=["n=1000"])
+def tick(ctx, param):
+    """One pass that pops matches, then restores the players (timed too) so every round sees the same queue."""
+    queue = synthetic_queue(ctx.seed, int(param[2:]), 0.0)
+
+    def run():
+        queue.restore([entry for group in queue.pop_matches(60.0) for entry in group])
+    return run
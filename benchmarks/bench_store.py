@@ -0,0 +1,268 @@
+"""Stats store operations on synthetic ladders of 100 to 1M players.
+
+Every case works on its own copy of a generated players file (or SQLite
+database) under the run's temp directory; the live data is never touched.
+"""
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+
+from .. import stats_store
+from ..rank_index import RankIndex
+from ..stats_store import PlayerStatsStore, _StatsCache
+from .runner import bench
+
+PLAYER_COUNTS = (100, 10_000, 100_000, 1_000_000)
+QUICK_COUNTS = (100, 10_000)
+TEAM_SIZE = 5
+
+_PARAMS = [f"n={n}" for n in PLAYER_COUNTS]
+_QUICK = [f"n={n}" for n in QUICK_COUNTS]
+
+
+def synthetic_stats(seed: int, count: int) -> dict:
+    """``count`` complete entries in the shape the bot and webapp write."""
+    rng = random.Random(seed * 7919 + count)
+    stats = {}
+    for i in range(count):
+        wins, losses, draws = rng.randint(0, 200), rng.randint(0, 200), rng.randint(0, 10)
+        stats[str(100_000_000_000_000_000 + i)] = {
+            "name": f"player{i}",
+            "points": max(0, int(rng.gauss(1000, 200))),
+            "wins": wins,
+            "losses": losses,
+            "draws": draws,
+        }
+    return stats
+
+
+def _master_file(ctx, count: int) -> str:
+    """Path of the generated snapshot for ``count`` players, written once per run."""
+    path = ctx.path("master", f"players-{count}.json")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(synthetic_stats(ctx.seed, count), f, indent=2)
+    return path
+
+
+def _copy_players(ctx, count: int, case: str) -> str:
+    directory = ctx.path(case, str(count))
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    path = os.path.join(directory, "players.json")
+    shutil.copyfile(_master_file(ctx, count), path)
+    return path
+
+
+def _count(param: str) -> int:
+    return int(param[2:])
+
+
+def _drop_cache(path: str):
+    cache = _StatsCache._instances.pop(path, None)
+    if cache is not None and cache._flush_task is not None:
+        cache._flush_task.cancel()
+
+
+async def _json_store(ctx, param, case: str):
+    path = _copy_players(ctx, _count(param), case)
+    store = PlayerStatsStore(0, file_path=path)
+    await store.load()
+    return store, path
+
+
+def _match_picker(ctx, uids: list[str]):
+    rng = random.Random(ctx.seed)
+
+    def pick() -> tuple[list[int], list[int]]:
+        players = [int(uid) for uid in rng.sample(uids, 2 * TEAM_SIZE)]
+        return players[:TEAM_SIZE], players[TEAM_SIZE:]
+    return pick
+
+
+@bench("store", "load", params=_PARAMS, quick=_QUICK, rounds=3)
+async def load(ctx, param):
+    """Cold start: parse the snapshot and replay the (empty) journal."""
+    path = _copy_players(ctx, _count(param), "load")
+    try:
+        async def run():
+            _drop_cache(path)
+            await _StatsCache.for_path(path).get()
+        yield run
+    finally:
+        _drop_cache(path)
+
+
+@bench("store", "record_match", params=_PARAMS, quick=_QUICK)
+async def record_match(ctx, param):
+    """One 5v5 result: rate, journal with fsync, apply, re-rank. Compaction is timed separately."""
+    store, path = await _json_store(ctx, param, "record_match")
+    pick = _match_picker(ctx, list((await store.load()).keys()))
+    delay = stats_store.FLUSH_DELAY_SECS
+    stats_store.FLUSH_DELAY_SECS = 3600
+    await store._cache.ranks()
+    try:
+        async def run():
+            winners, losers = pick()
+            await store.record_match(None, winners, losers)
+        yield run
+    finally:
+        stats_store.FLUSH_DELAY_SECS = delay
+        _drop_cache(path)
+
+
+@bench("store", "compact", params=_PARAMS, quick=_QUICK, rounds=3)
+async def compact(ctx, param):
+    """Fold one journaled result into the snapshot (write, fsync, rename, trim)."""
+    store, path = await _json_store(ctx, param, "compact")
+    pick = _match_picker(ctx, list((await store.load()).keys()))
+    try:
+        async def run():
+            winners, losers = pick()
+            await store.record_match(None, winners, losers)
+            await store.flush()
+        yield run
+    finally:
+        _drop_cache(path)
+
+
+@bench("store", "rank_index_build", params=_PARAMS, quick=_QUICK, rounds=3)
+async def rank_index_build(ctx, param):
+    stats = synthetic_stats(ctx.seed, _count(param))
+    return lambda: RankIndex.from_stats(stats)
+
+
+@bench("store", "leaderboard_top10", params=_PARAMS, quick=_QUICK)
+async def leaderboard(ctx, param):
+    store, path = await _json_store(ctx, param, "leaderboard")
+    await store._cache.ranks()
+    try:
+        yield lambda: store.get_leaderboard(10)
+    finally:
+        _drop_cache(path)
+
+
+@bench("store", "rank", params=_PARAMS, quick=_QUICK)
+async def rank(ctx, param):
+    store, path = await _json_store(ctx, param, "rank")
+    uids = [int(uid) for uid in (await store.load())]
+    await store._cache.ranks()
+    rng = random.Random(ctx.seed)
+    try:
+        yield lambda: store.get_rank(rng.choice(uids))
+    finally:
+        _drop_cache(path)
+
+
+@bench("store", "points_map", params=_PARAMS, quick=_QUICK, rounds=3)
+async def points_map(ctx, param):
+    store, path = await _json_store(ctx, param, "points_map")
+    try:
+        yield store.get_points_map
+    finally:
+        _drop_cache(path)
+
+
+@bench("store", "points_for", params=_PARAMS, quick=_QUICK)
+async def points_for(ctx, param):
+    """Points of one lobby's players, as the Start button and match embed read them."""
+    store, path = await _json_store(ctx, param, "points_for")
+    pick = _match_picker(ctx, list((await store.load()).keys()))
+    try:
+        yield lambda: store.get_points_for(sum(pick(), []))
+    finally:
+        _drop_cache(path)
+
+
+def _sqlite_db(ctx, count: int) -> str:
+    """A database already holding the synthetic players, marked as imported so
+    the store never reads the live players file."""
+    from ..stats_sqlite import _SCHEMA, _row_from_entry
+
+    directory = ctx.path("sqlite", str(count))
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    path = os.path.join(directory, "players.sqlite3")
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.executescript(_SCHEMA)
+        with open(_master_file(ctx, count), "r", encoding="utf-8") as f:
+            rows = [_row_from_entry(k, v) for k, v in json.load(f).items()]
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO players (user_id, points, wins, losses, draws, name) VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+        conn.execute("INSERT INTO meta (key, value) VALUES ('imported_json', 'benchmark')")
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return path
+
+
+async def _sqlite_store(ctx, param):
+    from ..stats_sqlite import SqlitePlayerStatsStore
+
+    path = _sqlite_db(ctx, _count(param))
+    return SqlitePlayerStatsStore(0, db_path=path), path
+
+
+async def _close_sqlite(path: str):
+    from ..stats_sqlite import _Database
+
+    db = _Database._instances.pop(path, None)
+    if db is None:
+        return
+    if db._conn is not None:
+        await asyncio.get_running_loop().run_in_executor(db._executor, db._conn.close)
+
+
+@bench("store_sqlite", "record_match", params=_PARAMS, quick=_QUICK)
+async def sqlite_record_match(ctx, param):
+    store, path = await _sqlite_store(ctx, param)
+    with sqlite3.connect(path) as conn:
+        uids = [row[0] for row in conn.execute("SELECT user_id FROM players")]
+    pick = _match_picker(ctx, uids)
+    try:
+        async def run():
+            winners, losers = pick()
+            await store.record_match(None, winners, losers)
+        yield run
+    finally:
+        await _close_sqlite(path)
+
+
+@bench("store_sqlite", "leaderboard_top10", params=_PARAMS, quick=_QUICK)
+async def sqlite_leaderboard(ctx, param):
+    store, path = await _sqlite_store(ctx, param)
+    try:
+        yield lambda: store.get_leaderboard(10)
+    finally:
+        await _close_sqlite(path)
+
+
+@bench("store_sqlite", "rank", params=_PARAMS, quick=_QUICK)
+async def sqlite_rank(ctx, param):
+    store, path = await _sqlite_store(ctx, param)
+    with sqlite3.connect(path) as conn:
+        uids = [int(row[0]) for row in conn.execute("SELECT user_id FROM players")]
+    rng = random.Random(ctx.seed)
+    try:
+        yield lambda: store.get_rank(rng.choice(uids))
+    finally:
+        await _close_sqlite(path)
+
+
+@bench("store_sqlite", "points_for", params=_PARAMS, quick=_QUICK)
+async def sqlite_points_for(ctx, param):
+    store, path = await _sqlite_store(ctx, param)
+    with sqlite3.connect(path) as conn:
+        uids = [row[0] for row in conn.execute("SELECT user_id FROM players")]
+    pick = _match_picker(ctx, uids)
+    try:
+        yield lambda: store.get_points_for(sum(pick(), []))
+    finally:
+        await _close_sqlite(path)
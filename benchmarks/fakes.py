@@ -0,0 +1,196 @@
+"""Stand-ins for the discord.py objects the handlers touch, with simulated REST latency.
+
+Only the attributes and coroutines the bot actually uses are provided. Every
+call that would be a Discord API request sleeps for a sampled latency and is
+counted in :class:`FakeRest`, so a run reports REST volume without a network.
+"""
+import asyncio
+import itertools
+import random
+import time
+
+import discord
+
+_ids = itertools.count(900_000_000_000_000_000)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+class FakeRest:
+    """Latency model and call counter shared by every fake object in a run."""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.calls: dict[str, int] = {}
+        self.busy = 0.0
+
+    async def call(self, kind: str):
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        delay = max(0.0, self.rng.gauss(self.latency, self.jitter)) if self.latency else 0.0
+        self.busy += delay
+        await asyncio.sleep(delay)
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+class FakePermissions:
+    def __init__(self, administrator: bool = False):
+        self.administrator = administrator
+
+
+class FakeMember:
+    def __init__(self, guild: "FakeGuild", uid: int, name: str, admin: bool = False):
+        self.guild = guild
+        self.id = uid
+        self.name = name
+        self.display_name = name
+        self.global_name = name
+        self.guild_permissions = FakePermissions(admin)
+        self.bot = False
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+
+class FakeChannel:
+    def __init__(self, guild: "FakeGuild"):
+        self.id = next_id()
+        self.guild = guild
+
+
+class FakeMessage:
+    """A sent message; remembers the last embed and view it was given, as Discord would."""
+
+    def __init__(self, rest: FakeRest, channel: FakeChannel, content=None, embed=None, view=None):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.embed = embed
+        self.view = view
+        self.edits = 0
+        self._rest = rest
+
+    async def edit(self, **kwargs):
+        await self._rest.call("message_edit")
+        self.edits += 1
+        self.content = kwargs.get("content", self.content)
+        self.embed = kwargs.get("embed", self.embed)
+        if "view" in kwargs:
+            self.view = kwargs["view"]
+        return self
+
+
+class FakeGuild:
+    """A guild whose member cache only holds members added with ``cached=True``.
+
+    The rest are only found through :meth:`query_members`, like members
+    discord.py has not chunked yet.
+    """
+
+    def __init__(self, rest: FakeRest, shard_id: int = 0):
+        self.id = next_id()
+        self.shard_id = shard_id
+        self.name = f"guild-{self.id}"
+        self.channel = FakeChannel(self)
+        self._rest = rest
+        self._members: dict[int, FakeMember] = {}
+        self._cached: set[int] = set()
+
+    def add_member(self, name: str, admin: bool = False, cached: bool = True) -> FakeMember:
+        member = FakeMember(self, next_id(), name, admin)
+        self._members[member.id] = member
+        if cached:
+            self._cached.add(member.id)
+        return member
+
+    @property
+    def members(self) -> list[FakeMember]:
+        return list(self._members.values())
+
+    def get_member(self, uid: int) -> FakeMember | None:
+        return self._members.get(uid) if uid in self._cached else None
+
+    async def query_members(self, *, user_ids=None, limit: int = 5, cache: bool = True, **_):
+        await self._rest.call("gateway_member_chunk")
+        found = [self._members[uid] for uid in (user_ids or ()) if uid in self._members][:limit]
+        if cache:
+            self._cached.update(m.id for m in found)
+        return found
+
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    def _ack(self):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        self._done = True
+        self._interaction.acked_at = time.perf_counter()
+
+    async def send_message(self, content=None, *, embed=None, view=None, ephemeral: bool = False, **_):
+        self._ack()
+        await self._interaction.rest.call("interaction_response")
+        if not ephemeral:
+            self._interaction.original = FakeMessage(
+                self._interaction.rest, self._interaction.channel, content, embed, view
+            )
+            self._interaction.sent.append(self._interaction.original)
+        self._interaction.replies.append(content)
+
+    async def defer(self, **_):
+        self._ack()
+        await self._interaction.rest.call("interaction_defer")
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+
+    async def send(self, content=None, *, embed=None, view=None, ephemeral: bool = False, wait: bool = False, **_):
+        await self._interaction.rest.call("followup")
+        self._interaction.replies.append(content)
+        message = FakeMessage(self._interaction.rest, self._interaction.channel, content, embed, view)
+        if not ephemeral:
+            self._interaction.sent.append(message)
+        return message if wait else None
+
+
+class FakeInteraction:
+    """One slash command or button click by ``user``; ``message`` is set for button clicks."""
+
+    application_id = 1
+
+    def __init__(self, rest: FakeRest, user: FakeMember, message: FakeMessage | None = None):
+        self.rest = rest
+        self.id = next_id()
+        self.token = f"token-{self.id}"
+        self.user = user
+        self.guild = user.guild
+        self.guild_id = user.guild.id
+        self.channel = message.channel if message is not None else user.guild.channel
+        self.message = message
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.original: FakeMessage | None = None
+        self.replies: list = []
+        # Non-ephemeral messages this interaction created.
+        self.sent: list[FakeMessage] = []
+        self.created_at = time.perf_counter()
+        self.acked_at: float | None = None
+
+    async def original_response(self) -> FakeMessage:
+        await self.rest.call("original_response")
+        return self.original
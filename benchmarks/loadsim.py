@@ -0,0 +1,337 @@
+"""End-to-end load simulator: drives the real command and button handlers with fake Discord objects.
+
+Every lobby runs the full lifecycle (``/startqueue``, a burst of Join clicks,
+Start, then a result or a forfeit vote) concurrently with all the others,
+while members poll ``/leaderboard``. REST calls sleep for a simulated
+latency instead of reaching Discord, and the stats go to a temp directory.
+At the end the players file on disk is checked against the results the
+lobbies ended with::
+
+    python -m boost_bot.benchmarks.loadsim --guilds 50 --lobbies 4 --size 10 --rest-latency-ms 80
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from logging_config import setup_logging
+from paths import BOOST_PLAYERS_FILE
+
+from ..edit_coalescer import queue_edits
+from ..lobby_store import lobby_checkpoint
+from ..main import leaderboard, startqueue
+from .. import stats_store
+from ..rest_scheduler import outbound
+from ..stats_store import STATS_BACKEND, STATS_SCOPE, _StatsCache, flush_all_stats
+from .fakes import FakeGuild, FakeInteraction, FakeMember, FakeMessage, FakeRest
+
+log = setup_logging("boost_bot.loadsim")
+
+# Discord drops an interaction that is not acknowledged within this long.
+ACK_DEADLINE_SECS = 3.0
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def _latency_summary(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": round((_percentile(values, 0.5) or 0) * 1000, 2),
+        "p99_ms": round((_percentile(values, 0.99) or 0) * 1000, 2),
+        "max_ms": round(max(values, default=0) * 1000, 2),
+    }
+
+
+def isolate_storage(workdir: str) -> str:
+    """Point the stats store and the lobby checkpoint at ``workdir``; returns the stats path.
+
+    The handlers open the store by the configured path, so the shared cache
+    for that path is replaced with one backed by a temp file. With per-guild
+    ladders the returned path is the directory holding them.
+    """
+    lobby_checkpoint.file_path = os.path.join(workdir, "lobbies.json")
+    if STATS_SCOPE == "guild":
+        stats_store.GUILD_STATS_DIR = os.path.join(workdir, "guilds")
+        return stats_store.GUILD_STATS_DIR
+    if STATS_BACKEND == "sqlite":
+        from ..stats_sqlite import _SCHEMA, BOOST_STATS_DB, _Database
+
+        db_path = os.path.join(workdir, "players.sqlite3")
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        try:
+            conn.executescript(_SCHEMA)
+            # Stops the first open from importing the live players file.
+            conn.execute("INSERT INTO meta (key, value) VALUES ('imported_json', 'loadsim')")
+        finally:
+            conn.close()
+        _Database._instances[BOOST_STATS_DB] = _Database(db_path)
+        return db_path
+    players_path = os.path.join(workdir, "players.json")
+    _StatsCache._instances[BOOST_PLAYERS_FILE] = _StatsCache(players_path)
+    return players_path
+
+
+def read_games(path: str) -> dict[int, int]:
+    """Wins + losses + draws per player as written to disk (summed over a directory of guild ladders)."""
+    if os.path.isdir(path):
+        games: dict[int, int] = {}
+        for name in os.listdir(path):
+            if name.endswith((".json", ".sqlite3")):
+                for uid, count in read_games(os.path.join(path, name)).items():
+                    games[uid] = games.get(uid, 0) + count
+        return games
+    if path.endswith(".sqlite3"):
+        with sqlite3.connect(path) as conn:
+            return {int(uid): games for uid, games in conn.execute(
+                "SELECT user_id, wins + losses + draws FROM players"
+            )}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            stats = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {
+        int(uid): int(e.get("wins", 0)) + int(e.get("losses", 0)) + int(e.get("draws", 0))
+        for uid, e in stats.items() if isinstance(e, dict)
+    }
+
+
+class LoadSimulator:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.rest = FakeRest(args.rest_latency_ms / 1000, args.rest_jitter_ms / 1000, args.seed)
+        self.ack_latency: list[float] = []
+        self.handler_latency: dict[str, list[float]] = {}
+        self.late_acks = 0
+        self.unacked = 0
+        self.errors: dict[str, int] = {}
+        self.disabled_clicks = 0
+        self.queue_messages: list[FakeMessage] = []
+
+    # -- dispatch ------------------------------------------------------------
+
+    async def _dispatch(self, kind: str, interaction: FakeInteraction, coro):
+        try:
+            await coro
+        except Exception as e:
+            key = f"{kind}: {type(e).__name__}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+            log.debug("%s raised %r", kind, e)
+        now = time.perf_counter()
+        self.handler_latency.setdefault(kind, []).append(now - interaction.created_at)
+        if interaction.acked_at is None:
+            self.unacked += 1
+        else:
+            ack = interaction.acked_at - interaction.created_at
+            self.ack_latency.append(ack)
+            if ack > ACK_DEADLINE_SECS:
+                self.late_acks += 1
+
+    async def click(self, message: FakeMessage, custom_id: str, member: FakeMember):
+        """Press a button on ``message`` as ``member``, through the view Discord would route it to."""
+        item = next(
+            (c for c in getattr(message.view, "children", ()) if getattr(c, "custom_id", None) == custom_id), None
+        )
+        if item is None or item.disabled:
+            # The client would not have shown the button.
+            self.disabled_clicks += 1
+            return
+        interaction = FakeInteraction(self.rest, member, message)
+        await self._dispatch(f"button:{custom_id.split(':', 1)[1]}", interaction, item.callback(interaction))
+
+    async def command(self, name: str, command, member: FakeMember, **options) -> FakeInteraction:
+        interaction = FakeInteraction(self.rest, member)
+        await self._dispatch(f"command:{name}", interaction, command.callback(interaction, **options))
+        return interaction
+
+    async def _after(self, delay: float, coro):
+        await asyncio.sleep(delay)
+        await coro
+
+    def _burst(self, members: list[FakeMember], make) -> list[asyncio.Task]:
+        """One task per member, arriving as a Poisson process at ``--click-rate`` per second."""
+        tasks, t = [], 0.0
+        for member in members:
+            t += self.rng.expovariate(self.args.click_rate)
+            tasks.append(asyncio.create_task(self._after(t, make(member))))
+        return tasks
+
+    # -- scenario ------------------------------------------------------------
+
+    async def run_lobby(self, guild: FakeGuild, host: FakeMember, players: list[FakeMember], delay: float):
+        await asyncio.sleep(delay)
+        created = await self.command(
+            "startqueue", startqueue, host, title=f"Sim {len(self.queue_messages)}", size=self.args.size
+        )
+        if not created.sent:
+            return
+        message = created.sent[-1]
+        self.queue_messages.append(message)
+
+        # Everyone clicks Join; the extras find the queue full.
+        await asyncio.gather(*self._burst(players, lambda m: self.click(message, "boost:join", m)))
+
+        starts = [self.click(message, "boost:start", host)]
+        if self.rng.random() < self.args.double_click:
+            starts.append(self.click(message, "boost:start", host))
+        await asyncio.gather(*starts)
+        lobby = getattr(message.view, "lobby", None)
+        if lobby is None or not lobby.started:
+            return
+
+        if self.rng.random() < self.args.forfeit_ratio:
+            by_id = {m.id: m for m in players}
+            losers = [by_id[uid] for uid in lobby.team_b if uid in by_id]
+            await asyncio.gather(*self._burst(losers, lambda m: self.click(message, "boost:forfeit", m)))
+        else:
+            outcome = self.rng.choice(("boost:team_a", "boost:team_b", "boost:draw"))
+            results = [self.click(message, outcome, host)]
+            if self.rng.random() < self.args.double_click:
+                results.append(self.click(message, outcome, host))
+            await asyncio.gather(*results)
+
+    async def poll_leaderboard(self, members: list[FakeMember], stop: asyncio.Event):
+        if self.args.read_rate <= 0:
+            return
+        pending = set()
+        while not stop.is_set():
+            await asyncio.sleep(self.rng.expovariate(self.args.read_rate))
+            task = asyncio.create_task(self.command("leaderboard", leaderboard, self.rng.choice(members)))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending)
+
+    async def run(self, stats_path: str) -> dict:
+        args = self.args
+        guilds, lobby_runs, everyone = [], [], []
+        for g in range(args.guilds):
+            guild = FakeGuild(self.rest, shard_id=g % max(1, args.shards))
+            guilds.append(guild)
+            for i in range(args.lobbies):
+                host = guild.add_member(f"host{g}_{i}", admin=True)
+                players = [
+                    guild.add_member(f"user{g}_{i}_{p}", cached=self.rng.random() < args.cached_members)
+                    for p in range(args.size + args.overflow)
+                ]
+                everyone.extend(players)
+                lobby_runs.append((guild, host, players))
+
+        requested, sent = queue_edits.requested, queue_edits.sent
+        started = time.perf_counter()
+        stop = asyncio.Event()
+        reader = asyncio.create_task(self.poll_leaderboard(everyone, stop))
+        await asyncio.gather(*(
+            self.run_lobby(guild, host, players, self.rng.uniform(0, args.ramp))
+            for guild, host, players in lobby_runs
+        ))
+        stop.set()
+        await reader
+        wall = time.perf_counter() - started
+        await flush_all_stats()
+        await lobby_checkpoint.save()
+
+        expected: dict[int, int] = {}
+        recorded = 0
+        for message in self.queue_messages:
+            lobby = message.view.lobby
+            if lobby.finished and lobby.team_a:
+                recorded += 1
+                for uid in list(lobby.team_a) + list(lobby.team_b):
+                    expected[uid] = expected.get(uid, 0) + 1
+        actual = read_games(stats_path)
+        lost = sum(max(0, n - actual.get(uid, 0)) for uid, n in expected.items())
+        duplicated = sum(max(0, actual.get(uid, 0) - expected.get(uid, 0)) for uid in actual)
+
+        clicks = sum(len(v) for v in self.handler_latency.values())
+        return {
+            "config": vars(args),
+            "wall_seconds": round(wall, 3),
+            "interactions": clicks,
+            "ack_latency": {
+                **_latency_summary(self.ack_latency), "late": self.late_acks, "unacked": self.unacked,
+            },
+            "handler_latency": _latency_summary([x for v in self.handler_latency.values() for x in v]),
+            "by_kind": {kind: _latency_summary(v) for kind, v in sorted(self.handler_latency.items())},
+            "errors": dict(sorted(self.errors.items())),
+            "disabled_clicks": self.disabled_clicks,
+            "rest": {
+                "calls": dict(sorted(self.rest.calls.items())),
+                "total": self.rest.total,
+                "per_interaction": round(self.rest.total / max(1, clicks), 2),
+                "scheduler": outbound.snapshot(),
+            },
+            "queue_edits": {"requested": queue_edits.requested - requested, "sent": queue_edits.sent - sent},
+            "stats": {
+                "results_expected": recorded,
+                "games_expected": sum(expected.values()),
+                "games_on_disk": sum(actual.get(uid, 0) for uid in expected),
+                "lost_updates": lost,
+                "duplicate_updates": duplicated,
+            },
+        }
+
+
+def _print_report(report: dict):
+    ack, handler, rest, stats = report["ack_latency"], report["handler_latency"], report["rest"], report["stats"]
+    print(f"{report['interactions']} interaction(s) in {report['wall_seconds']:.1f}s")
+    print(f"ack      p50 {ack['p50_ms']:.1f}ms  p99 {ack['p99_ms']:.1f}ms  max {ack['max_ms']:.1f}ms  "
+          f"late {ack['late']}  unacked {ack['unacked']}")
+    print(f"handler  p50 {handler['p50_ms']:.1f}ms  p99 {handler['p99_ms']:.1f}ms  max {handler['max_ms']:.1f}ms")
+    for kind, s in report["by_kind"].items():
+        print(f"  {kind:<24} {s['count']:>6}  p50 {s['p50_ms']:>8.1f}ms  p99 {s['p99_ms']:>8.1f}ms")
+    print(f"rest     {rest['total']} call(s), {rest['per_interaction']} per interaction: "
+          + ", ".join(f"{k}={v}" for k, v in rest["calls"].items()))
+    edits = report["queue_edits"]
+    print(f"edits    {edits['requested']} requested, {edits['sent']} sent")
+    print(f"results  {stats['results_expected']} match(es), {stats['games_expected']} game(s) expected, "
+          f"{stats['games_on_disk']} on disk; lost {stats['lost_updates']}, duplicated {stats['duplicate_updates']}")
+    if report["errors"]:
+        print("errors   " + ", ".join(f"{k} x{v}" for k, v in report["errors"].items()))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Drive the bot's handlers with simulated Discord traffic.")
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--lobbies", type=int, default=2, help="lobbies per guild, all running at once")
+    parser.add_argument("--size", type=int, default=10, help="players per lobby (even)")
+    parser.add_argument("--overflow", type=int, default=2, help="extra members per lobby who click Join too late")
+    parser.add_argument("--click-rate", type=float, default=20.0, help="Join/Forfeit clicks per second per lobby")
+    parser.add_argument("--read-rate", type=float, default=5.0, help="/leaderboard calls per second overall")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which lobbies are opened")
+    parser.add_argument("--double-click", type=float, default=0.2, help="chance the host clicks Start/result twice")
+    parser.add_argument("--forfeit-ratio", type=float, default=0.3, help="share of matches ended by a forfeit vote")
+    parser.add_argument("--cached-members", type=float, default=0.8, help="share of members in the member cache")
+    parser.add_argument("--rest-latency-ms", type=float, default=50.0)
+    parser.add_argument("--rest-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", help="write the report as JSON here")
+    args = parser.parse_args(argv)
+    if args.size < 2 or args.size % 2:
+        parser.error("--size must be an even number of at least 2")
+
+    with tempfile.TemporaryDirectory(prefix="boost-loadsim-") as workdir:
+        stats_path = isolate_storage(workdir)
+        report = asyncio.run(LoadSimulator(args).run(stats_path))
+    _print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+    return 1 if report["stats"]["lost_updates"] or report["stats"]["duplicate_updates"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
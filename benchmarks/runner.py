@@ -0,0 +1,224 @@
+"""Registry, timing loop and baseline comparison for the benchmark suite."""
+import argparse
+import asyncio
+import fnmatch
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from logging_config import setup_logging
+
+log = setup_logging("boost_bot.benchmarks")
+
+# Seed for every synthetic data set, so runs on different machines time the same inputs.
+DEFAULT_SEED = 1234
+# A case counts as regressed when its best time is this fraction slower than the baseline's.
+DEFAULT_THRESHOLD = 0.2
+
+
+class SkipCase(Exception):
+    """Raised by a setup that cannot run here (e.g. an optional dependency is missing)."""
+
+
+@dataclass
+class Case:
+    group: str
+    name: str
+    setup: Callable
+    params: tuple = (None,)
+    quick_params: tuple | None = None
+    rounds: int = 7
+
+    def key(self, param) -> str:
+        return f"{self.group}/{self.name}" + (f"[{param}]" if param is not None else "")
+
+
+CASES: list[Case] = []
+
+
+def bench(group: str, name: str, params=(None,), quick=None, rounds: int = 7):
+    """Register ``setup(ctx, param)`` as a benchmark case.
+
+    ``setup`` (sync or async) builds the synthetic input and returns the
+    callable to time. It may instead be an async generator that yields the
+    callable and cleans up after the ``yield``. ``quick`` limits the
+    parameters used by ``--quick``.
+    """
+    def decorator(setup):
+        CASES.append(Case(group, name, setup, tuple(params), tuple(quick) if quick is not None else None, rounds))
+        return setup
+    return decorator
+
+
+@dataclass
+class BenchContext:
+    """What a case's setup gets besides its parameter."""
+
+    seed: int
+    workdir: str
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.workdir, *parts)
+
+
+async def _time_once(fn, number: int, is_async: bool) -> float:
+    start = time.perf_counter()
+    if is_async:
+        for _ in range(number):
+            await fn()
+    else:
+        for _ in range(number):
+            fn()
+    return (time.perf_counter() - start) / number
+
+
+async def measure(fn, rounds: int, min_time: float) -> dict:
+    """Best/median/mean seconds per call over ``rounds`` rounds.
+
+    Fast calls are repeated inside a round until it takes about
+    ``min_time``, so clock resolution does not dominate.
+    """
+    start = time.perf_counter()
+    result = fn()
+    is_async = inspect.isawaitable(result)
+    if is_async:
+        await result
+    first = time.perf_counter() - start
+    number = 1
+    if first < min_time:
+        number = max(1, min(100_000, int(min_time / max(first, 1e-7))))
+    times = [await _time_once(fn, number, is_async) for _ in range(rounds)]
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "rounds": rounds,
+        "number": number,
+    }
+
+
+async def _run_case(case: Case, param, ctx: BenchContext, rounds: int, min_time: float) -> dict:
+    if inspect.isasyncgenfunction(case.setup):
+        gen = case.setup(ctx, param)
+        fn = await gen.__anext__()
+        try:
+            return await measure(fn, rounds, min_time)
+        finally:
+            try:
+                await gen.__anext__()
+            except StopAsyncIteration:
+                pass
+    fn = case.setup(ctx, param)
+    if inspect.isawaitable(fn):
+        fn = await fn
+    return await measure(fn, rounds, min_time)
+
+
+async def run_cases(
+    pattern: str = "*", quick: bool = False, seed: int = DEFAULT_SEED,
+    rounds: int | None = None, min_time: float = 0.05,
+) -> dict[str, dict]:
+    # Brackets are part of the keys, so only * and ? are wildcards.
+    pattern = pattern.replace("[", "[[]")
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="boost-bench-") as workdir:
+        ctx = BenchContext(seed=seed, workdir=workdir)
+        for case in CASES:
+            params = case.quick_params if quick and case.quick_params is not None else case.params
+            for param in params:
+                key = case.key(param)
+                if not fnmatch.fnmatchcase(key, pattern):
+                    continue
+                try:
+                    result = await _run_case(case, param, ctx, rounds or case.rounds, min_time)
+                except SkipCase as e:
+                    log.info("Skipping %s: %s", key, e)
+                    continue
+                results[key] = result
+                print(f"{key:<48} {_fmt_secs(result['min']):>10} {_fmt_secs(result['median']):>10}", flush=True)
+    return results
+
+
+def _fmt_secs(secs: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if secs >= scale:
+            return f"{secs / scale:.3g}{unit}"
+    return f"{secs / 1e-9:.3g}ns"
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    """Cases whose best time is more than ``threshold`` slower than in ``baseline``."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base or not base.get("min"):
+            continue
+        ratio = result["min"] / base["min"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{key}: {_fmt_secs(base['min'])} -> {_fmt_secs(result['min'])} ({(ratio - 1) * 100:+.0f}%)"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    # Registers the cases.
+    from . import bench_balance, bench_embed, bench_matchmaking, bench_store  # noqa: F401
+
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite on synthetic data.")
+    parser.add_argument("--filter", default="*", help="* and ? pattern over case keys, e.g. 'store/*[n=100000]'")
+    parser.add_argument("--quick", action="store_true", help="small inputs only")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--rounds", type=int, help="timing rounds per case (default: per case)")
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per round for fast cases")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown vs the baseline (default: %(default)s)")
+    parser.add_argument("--list", action="store_true", help="list case keys and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for case in CASES:
+            for param in case.params:
+                print(case.key(param))
+        return 0
+
+    print(f"{'case':<48} {'min':>10} {'median':>10}")
+    results = asyncio.run(run_cases(args.filter, args.quick, args.seed, args.rounds, args.min_time))
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "seed": args.seed,
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    if args.out:
+        tmp_path = args.out + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, args.out)
+        print(f"Wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            print("\n".join("  " + line for line in regressions))
+            return 1
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
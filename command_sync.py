@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+
+import discord
+
+from logging_config import setup_logging
+from paths import BOOST_DIR
+
+from .rest_scheduler import REST_WORKERS
+from .sharding import shard_scoped_path
+
+log = setup_logging("boost_bot.command_sync")
+
+COMMAND_SYNC_FILE = os.getenv("BOOST_COMMAND_SYNC_FILE", os.path.join(BOOST_DIR, "command_sync.json"))
+# Guild syncs in flight at once; kept below the REST worker count so syncs never fill every worker.
+SYNC_CONCURRENCY = max(1, min(int(os.getenv("DISCORD_COMMAND_SYNC_CONCURRENCY", "2")), REST_WORKERS - 1))
+# Scheduler bucket shared by every guild's command upload; ``route_key`` maps each
+# guild's PUT here so the rate-limit headers pace the syncs together.
+GUILD_SYNC_ROUTE = "PUT /applications/:id/guilds/:id/commands"
+
+GLOBAL_SCOPE = "global"
+
+
+def command_digest(tree: discord.app_commands.CommandTree, guild: discord.abc.Snowflake | None = None) -> str:
+    """Hash of the commands ``tree.sync(guild=guild)`` would upload."""
+    payload = [cmd.to_dict(tree) for cmd in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CommandSyncState:
+    """Hash of the last command set synced to each scope (``global`` or a guild ID).
+
+    Lets a cold start skip scopes whose commands did not change. Each shard
+    process keeps its own file since it only syncs its own guilds.
+    """
+
+    def __init__(self, file_path: str = COMMAND_SYNC_FILE):
+        self.file_path = file_path
+        self._hashes: dict[str, str] | None = None
+
+    def _load(self) -> dict[str, str]:
+        if self._hashes is None:
+            try:
+                with open(self.file_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._hashes = data if isinstance(data, dict) else {}
+            except FileNotFoundError:
+                self._hashes = {}
+            except ValueError as e:
+                log.warning("Ignoring unreadable %s: %s", self.file_path, e)
+                self._hashes = {}
+        return self._hashes
+
+    def unchanged(self, scope: str, digest: str) -> bool:
+        return self._load().get(scope) == digest
+
+    def mark(self, scope: str, digest: str):
+        self._load()[scope] = digest
+
+    def forget(self, scope: str):
+        self._load().pop(scope, None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._load(), f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.file_path)
+
+
+command_sync_state = CommandSyncState(shard_scoped_path(COMMAND_SYNC_FILE))
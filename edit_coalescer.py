@@ -0,0 +1,105 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable
+
+import discord
+
+from logging_config import setup_logging
+
+from .rest_scheduler import edit_message
+
+log = setup_logging("boost_bot.edit_coalescer")
+
+# Minimum spacing between two edits of the same message.
+EDIT_WINDOW_SECS = float(os.getenv("BOOST_EDIT_COALESCE_SECS", "0.3"))
+
+Render = Callable[[], Awaitable[dict]]
+
+
+class _Slot:
+    __slots__ = ("message", "render", "waiters", "task", "last_edit")
+
+    def __init__(self, message: discord.Message):
+        self.message = message
+        self.render: Render | None = None
+        self.waiters: list[asyncio.Future] = []
+        self.task: asyncio.Task | None = None
+        self.last_edit = 0.0
+
+
+class MessageEditCoalescer:
+    """Merge bursts of edits to one message into as few API calls as possible.
+
+    Each message has at most one edit in flight. A request on an idle message
+    is sent right away; requests that arrive while an edit is in flight, or
+    within ``window`` seconds of the last one, are merged and sent once with
+    the newest ``render`` result. ``render`` is called just before sending, so
+    the edit always reflects the latest state and no update is dropped.
+    """
+
+    def __init__(self, window: float = EDIT_WINDOW_SECS):
+        self.window = window
+        self._slots: dict[int, _Slot] = {}
+        self.requested = 0
+        self.sent = 0
+
+    async def edit(self, message: discord.Message, render: Render):
+        """Queue an edit of ``message`` with ``await render()`` as kwargs.
+
+        Resolves once an edit that includes this request has been sent, and
+        raises whatever that edit raised.
+        """
+        self.requested += 1
+        slot = self._slots.get(message.id)
+        if slot is None:
+            slot = self._slots[message.id] = _Slot(message)
+        slot.message = message
+        slot.render = render
+        waiter = asyncio.get_running_loop().create_future()
+        slot.waiters.append(waiter)
+        if slot.task is None:
+            slot.task = asyncio.create_task(self._drain(message.id, slot))
+        return await waiter
+
+    async def _drain(self, message_id: int, slot: _Slot):
+        try:
+            while True:
+                # After an edit the slot lingers one window, so a request arriving then
+                # waits its turn instead of finding no slot and going out at once.
+                wait = slot.last_edit + self.window - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if slot.render is None:
+                    break
+                render, waiters = slot.render, slot.waiters
+                slot.render, slot.waiters = None, []
+                try:
+                    kwargs = await render()
+                    await edit_message(slot.message, **kwargs)
+                except Exception as e:
+                    for w in waiters:
+                        if not w.done():
+                            w.set_exception(e)
+                else:
+                    for w in waiters:
+                        if not w.done():
+                            w.set_result(slot.message)
+                finally:
+                    # Cancelled mid-edit: nothing else will resolve the requests already popped.
+                    for w in waiters:
+                        if not w.done():
+                            w.cancel()
+                    slot.last_edit = time.monotonic()
+                    self.sent += 1
+        finally:
+            slot.task = None
+            for w in slot.waiters:
+                if not w.done():
+                    w.cancel()
+            if self._slots.get(message_id) is slot:
+                del self._slots[message_id]
+
+
+# Shared by every queue view.
+queue_edits = MessageEditCoalescer()
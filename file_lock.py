@@ -0,0 +1,124 @@
+import asyncio
+import contextlib
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+from logging_config import setup_logging
+
+log = setup_logging("boost_bot.file_lock")
+
+# Waits longer than this are logged as contention warnings.
+SLOW_WAIT_SECS = float(os.getenv("BOOST_LOCK_SLOW_WAIT_SECS", "0.5"))
+
+
+class FileLock:
+    """Advisory ``flock`` on ``<path>`` plus an asyncio lock for this process.
+
+    The Boost webapp should ``flock`` the same ``players.json.lock`` file
+    around its own read-modify-write of ``players.json``.
+
+    Acquiring first tries a non-blocking ``flock``; only when another process
+    holds the lock does the blocking call move to a worker thread, so the
+    event loop never waits on it. Wait and hold times are tracked in
+    :attr:`stats`.
+    """
+
+    _instances: dict[str, "FileLock"] = {}
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = asyncio.Lock()
+        self._fd: int | None = None
+        self.stats = {
+            "acquired": 0,
+            "contended": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "hold_total": 0.0,
+            "hold_max": 0.0,
+        }
+
+    @classmethod
+    def for_path(cls, path: str) -> "FileLock":
+        lock = cls._instances.get(path)
+        if lock is None:
+            lock = cls._instances[path] = cls(path)
+        return lock
+
+    def _open(self) -> int:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    async def _flock(self, shared: bool) -> bool:
+        """Take the OS lock; returns True if we had to wait for another process."""
+        if fcntl is None:
+            return False
+        fd = self._open()
+        mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(fd, mode | fcntl.LOCK_NB)
+            return False
+        except BlockingIOError:
+            waiter = asyncio.ensure_future(asyncio.to_thread(fcntl.flock, fd, mode))
+            try:
+                await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                # The thread still takes the lock eventually. ``_local`` stays held until
+                # it has and the lock is handed back, so no other holder shares the fd meanwhile.
+                waiter.add_done_callback(self._abandoned)
+                raise
+            return True
+
+    def _abandoned(self, waiter: asyncio.Future):
+        try:
+            if not waiter.cancelled() and waiter.exception() is None:
+                self._unflock()
+        finally:
+            self._local.release()
+
+    def _unflock(self):
+        if fcntl is not None and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextlib.asynccontextmanager
+    async def hold(self, shared: bool = False):
+        start = time.perf_counter()
+        contended = self._local.locked()
+        await self._local.acquire()
+        try:
+            contended |= await self._flock(shared)
+        except asyncio.CancelledError:
+            raise  # _abandoned releases _local once the pending flock is undone
+        except BaseException:
+            self._local.release()
+            raise
+        acquired = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._unflock()
+            self._local.release()
+            released = time.perf_counter()
+            self._record(acquired - start, released - acquired, contended)
+
+    def _record(self, waited: float, held: float, contended: bool):
+        s = self.stats
+        s["acquired"] += 1
+        s["contended"] += int(contended)
+        s["wait_total"] += waited
+        s["wait_max"] = max(s["wait_max"], waited)
+        s["hold_total"] += held
+        s["hold_max"] = max(s["hold_max"], held)
+        if waited > SLOW_WAIT_SECS:
+            log.warning("Waited %.2fs for %s", waited, self.path)
+
+
+def lock_stats() -> dict[str, dict]:
+    """Contention counters for every lock used in this process."""
+    return {path: dict(lock.stats) for path, lock in FileLock._instances.items()}
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import re
+import time
+
+from logging_config import setup_logging
+
+from . import stats_store
+from .rank_index import RankIndex
+from .stats_store import open_stats_store
+
+log = setup_logging("boost_bot.global_ladder")
+
+# Seconds a merged view is reused before partitions are checked for changes again.
+GLOBAL_LADDER_MAX_AGE_SECS = float(os.getenv("BOOST_GLOBAL_LADDER_MAX_AGE_SECS", "1.0"))
+
+# `<guild id>.json` or `.sqlite3`, or a file beside it (a journal not yet folded into a first snapshot).
+_PARTITION = re.compile(r"^(\d+)\.(json|sqlite3)(?:[.-].*)?$")
+
+
+class GlobalLadder:
+    """Every guild's ladder merged into one, for ``BOOST_STATS_SCOPE=guild``.
+
+    A player appears once, with the entry from the guild where they have the
+    most points. Partitions are merged one at a time: a pass asks each
+    guild's store for its version, re-reads only the partitions that
+    changed, and re-ranks only the players whose points moved in them.
+
+    Read-only, and shaped like a stats store as far as ``leaderboard_pages``
+    and /rank are concerned (``source``, ``get_version``,
+    ``get_leaderboard_page``, ``get_rank``).
+    """
+
+    def __init__(self, max_age: float = GLOBAL_LADDER_MAX_AGE_SECS):
+        self.max_age = max_age
+        # guild -> uid -> points as last merged, and that guild's stats
+        self._points: dict[int, dict[str, int]] = {}
+        self._entries: dict[int, dict] = {}
+        # uid -> guilds with an entry for them, and the one whose entry counts
+        self._homes: dict[str, set[int]] = {}
+        self._best: dict[str, int] = {}
+        self._versions: dict[int, int] = {}
+        self._ranks = RankIndex()
+        self._synced_at: float | None = None
+        self._lock = asyncio.Lock()
+        self.version = 0
+
+    @property
+    def source(self) -> str:
+        """Identifies the merged view in caches."""
+        return "global:" + stats_store.GUILD_STATS_DIR
+
+    def _partitions(self) -> list[int]:
+        suffix = "sqlite3" if stats_store.STATS_BACKEND == "sqlite" else "json"
+        try:
+            names = os.listdir(stats_store.GUILD_STATS_DIR)
+        except FileNotFoundError:
+            return []
+        return sorted({int(m[1]) for m in map(_PARTITION.match, names) if m and m[2] == suffix})
+
+    def _rerank(self, uid: str):
+        homes = self._homes.get(uid)
+        if not homes:
+            self._homes.pop(uid, None)
+            self._best.pop(uid, None)
+            self._ranks.remove(uid)
+            return
+        best = max(homes, key=lambda gid: (self._points[gid][uid], -gid))
+        self._best[uid] = best
+        self._ranks.update(uid, self._points[best][uid])
+
+    def _merge(self, guild_id: int, stats: dict):
+        old = self._points.get(guild_id, {})
+        new = {uid: int(e.get("points", 1000)) for uid, e in stats.items() if isinstance(e, dict)}
+        self._points[guild_id] = new
+        self._entries[guild_id] = stats
+        for uid in old.keys() - new.keys():
+            self._homes[uid].discard(guild_id)
+            self._rerank(uid)
+        for uid, points in new.items():
+            if old.get(uid) != points:
+                self._homes.setdefault(uid, set()).add(guild_id)
+                self._rerank(uid)
+        if not new:
+            del self._points[guild_id], self._entries[guild_id]
+
+    async def _sync(self, force: bool = False):
+        if not force and self._synced_at is not None and time.monotonic() - self._synced_at < self.max_age:
+            return
+        async with self._lock:
+            changed = 0
+            partitions = self._partitions()
+            for guild_id in self._versions.keys() - set(partitions):
+                # The guild's file was removed.
+                self._merge(guild_id, {})
+                del self._versions[guild_id]
+                changed += 1
+            for guild_id in partitions:
+                store = open_stats_store(guild_id)
+                version = await store.get_version()
+                if self._versions.get(guild_id) == version:
+                    continue
+                self._merge(guild_id, await store.load())
+                self._versions[guild_id] = version
+                changed += 1
+            if changed:
+                self.version += 1
+                log.debug("Merged %d changed guild ladder(s) into the global view", changed)
+            self._synced_at = time.monotonic()
+
+    def _entry(self, uid: str) -> dict:
+        return self._entries[self._best[uid]][uid]
+
+    async def get_version(self) -> int:
+        """A number that changes whenever any guild's ladder does, at most ``max_age`` seconds late."""
+        await self._sync()
+        return self.version
+
+    async def get_leaderboard_page(self, page: int, per_page: int) -> tuple[int, list[tuple[int, str, dict]]]:
+        await self._sync()
+        start = page * per_page + 1
+        rows = self._ranks.slice(start, start + per_page - 1)
+        return len(self._ranks), [(r, uid, self._entry(uid)) for r, uid in rows]
+
+    async def get_rank(self, user_id: int, radius: int = 2) -> tuple[int, int, list[tuple[int, str, dict]]] | None:
+        await self._sync()
+        rank = self._ranks.rank(str(user_id))
+        if rank is None:
+            return None
+        rows = [(r, uid, self._entry(uid)) for r, uid in self._ranks.around(str(user_id), radius)]
+        return rank, len(self._ranks), rows
+
+
+global_ladder = GlobalLadder()
+
+
+def open_ladder(guild_id: int, ladder: str = "guild"):
+    """The ladder /leaderboard and /rank read: the guild's own, or ``global`` for every guild's.
+
+    With the default shared scope there is only one ladder, so both are the same store.
+    """
+    if ladder == "global" and stats_store.STATS_SCOPE == "guild":
+        return global_ladder
+    return open_stats_store(guild_id)
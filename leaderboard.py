@@ -0,0 +1,102 @@
+import math
+import os
+from collections import OrderedDict
+
+# Rows per /leaderboard page; 20 rows of the table stay far below the embed limit.
+LEADERBOARD_PAGE_SIZE = max(1, int(os.getenv("BOOST_LEADERBOARD_PAGE_SIZE", "20")))
+# Rendered pages kept across all stores before the least recently used is dropped.
+LEADERBOARD_CACHE_PAGES = int(os.getenv("BOOST_LEADERBOARD_CACHE_PAGES", "256"))
+
+
+def leaderboard_table(ranked: list[tuple[int, dict]]) -> str:
+    """Render ``(rank, entry)`` pairs as the code-block table used by /leaderboard and /rank."""
+    rows = []
+    for rank, data in ranked:
+        wins = int(data.get("wins", 0))
+        losses = int(data.get("losses", 0))
+        draws = int(data.get("draws", 0))
+        rows.append({
+            "rank": rank,
+            "name": data.get("name", "Unknown"),
+            "elo": data.get("points", 1000),
+            "wins": wins,
+            "loses": losses,
+            "draws": draws,
+        })
+
+    header = f"{'#':<2} | {'Player':<12} | {'Elo':>4} | {'W-D-L':^7} | {'WR':>5}  \n"
+    header += "-" * 44
+
+    lines = [header]
+    for r in rows:
+        name = (r["name"] or "Unknown")[:12]
+        total = r["wins"] + r["loses"]
+        win_rate = (r["wins"] / total * 100) if total > 0 else 0.0
+        record = f"{r['wins']}-{r['draws']}-{r['loses']}"
+        lines.append(
+            f"{r['rank']:<2} | {name.capitalize():<12} | {r['elo']:>4} | {record:^7} | {win_rate:>5.1f}%"
+        )
+
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+class LeaderboardPages:
+    """Rendered /leaderboard pages, reused until the stats change.
+
+    Pages are keyed by store and page number and belong to the store's
+    stats version (see ``get_version``). A new version drops that store's
+    pages, so paging between results only renders each page once and never
+    re-ranks the ladder: a page is one slice of the store's rank order.
+    """
+
+    def __init__(self, page_size: int = LEADERBOARD_PAGE_SIZE, max_pages: int = LEADERBOARD_CACHE_PAGES):
+        self.page_size = page_size
+        self.max_pages = max_pages
+        # (store source, page) -> (table, total players)
+        self._pages: OrderedDict[tuple[str, int], tuple[str, int]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def page_count(self, total: int) -> int:
+        return max(1, math.ceil(total / self.page_size))
+
+    def page_of(self, rank: int) -> int:
+        """0-based page that shows ``rank``."""
+        return (rank - 1) // self.page_size
+
+    def _invalidate(self, source: str):
+        for key in [k for k in self._pages if k[0] == source]:
+            del self._pages[key]
+
+    async def get(self, store, page: int) -> tuple[str, int, int]:
+        """``(table, page, total players)`` for ``page``, clamped to the last page."""
+        source = store.source
+        version = await store.get_version()
+        if self._versions.get(source) != version:
+            self._invalidate(source)
+            self._versions[source] = version
+        page = max(0, page)
+        cached = self._pages.get((source, page))
+        if cached is not None:
+            self.hits += 1
+            self._pages.move_to_end((source, page))
+            return cached[0], page, cached[1]
+
+        self.misses += 1
+        total, rows = await store.get_leaderboard_page(page, self.page_size)
+        last = self.page_count(total) - 1
+        if page > last:
+            # The ladder shrank (or a stale button); show the last page instead.
+            return await self.get(store, last) if total else ("", 0, 0)
+        table = leaderboard_table([(rank, entry) for rank, _, entry in rows])
+        self._pages[(source, page)] = (table, total)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return table, page, total
+
+    def stats(self) -> dict[str, int]:
+        return {"pages": len(self._pages), "hits": self.hits, "misses": self.misses}
+
+
+leaderboard_pages = LeaderboardPages()
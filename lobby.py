@@ -1,21 +1,48 @@
+import asyncio
+import os
+
 import discord
 
+from .member_cache import mentions
+from .sharding import shard_for_guild
+
+# Default queue size; /startqueue can ask for anything up to MAX_LOBBY_PLAYERS.
+DEFAULT_LOBBY_PLAYERS = int(os.getenv("BOOST_LOBBY_PLAYERS", "10"))
+MAX_LOBBY_PLAYERS = 40
+
 
 class Lobby:
     """Represents a game lobby."""
 
-    def __init__(self, host_id: int, title: str = "Queue"):
+    def __init__(self, host_id: int, title: str = "Queue", max_players: int = DEFAULT_LOBBY_PLAYERS):
         self.host_id = host_id
         self.title = title
+        self.max_players = max_players
         self.players = set()
         self.started = False
         self.finished = False
-
+        self.cancelled = False
+        # Match state
+        self.team_a: list[int] = []
+        self.team_b: list[int] = []
+        self.forfeit_votes_a: set[int] = set()
+        self.forfeit_votes_b: set[int] = set()
+        # Where the queue message lives, once posted
+        self.guild_id: int | None = None
+        self.channel_id: int | None = None
+        self.message_id: int | None = None
+        # Held across awaits that must not interleave (start, results)
+        self.lock = asyncio.Lock()
+        # Balancing constraints, see balance.partition_teams_constrained
+        self.together: list[set[int]] = []
+        self.apart: set[frozenset[int]] = set()
+        self.roles: dict[int, str] = {}
+        self.role_caps: dict[str, int] = {}
 
     def add(self, user_id: int):
         if self.started:
             return False
-        if len(self.players) >= 10 and user_id not in self.players:
+        if len(self.players) >= self.max_players and user_id not in self.players:
             return False
         self.players.add(user_id)
         return True
@@ -28,10 +55,169 @@ class Lobby:
             return True
         return False
 
+    @property
+    def active(self) -> bool:
+        return not (self.finished or self.cancelled)
+
+    @property
+    def lobby_id(self) -> int | None:
+        """Lobbies are identified by their queue message."""
+        return self.message_id
+
+    @property
+    def is_open(self) -> bool:
+        return self.active and not self.started
+
+    def to_dict(self) -> dict:
+        return {
+            "host_id": self.host_id,
+            "title": self.title,
+            "max_players": self.max_players,
+            "players": sorted(self.players),
+            "started": self.started,
+            "finished": self.finished,
+            "cancelled": self.cancelled,
+            "team_a": self.team_a,
+            "team_b": self.team_b,
+            "forfeit_votes_a": sorted(self.forfeit_votes_a),
+            "forfeit_votes_b": sorted(self.forfeit_votes_b),
+            "together": [sorted(g) for g in self.together],
+            "apart": [sorted(p) for p in self.apart],
+            "roles": {str(uid): role for uid, role in self.roles.items()},
+            "role_caps": self.role_caps,
+            "guild_id": self.guild_id,
+            "channel_id": self.channel_id,
+            "message_id": self.message_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Lobby":
+        lobby = cls(data["host_id"], data.get("title", "Queue"), data.get("max_players", DEFAULT_LOBBY_PLAYERS))
+        lobby.players = set(data.get("players", []))
+        lobby.started = data.get("started", False)
+        lobby.finished = data.get("finished", False)
+        lobby.cancelled = data.get("cancelled", False)
+        lobby.team_a = list(data.get("team_a", []))
+        lobby.team_b = list(data.get("team_b", []))
+        lobby.forfeit_votes_a = set(data.get("forfeit_votes_a", []))
+        lobby.forfeit_votes_b = set(data.get("forfeit_votes_b", []))
+        lobby.together = [set(g) for g in data.get("together", [])]
+        lobby.apart = {frozenset(p) for p in data.get("apart", [])}
+        lobby.roles = {int(uid): role for uid, role in data.get("roles", {}).items()}
+        lobby.role_caps = dict(data.get("role_caps", {}))
+        lobby.guild_id = data.get("guild_id")
+        lobby.channel_id = data.get("channel_id")
+        lobby.message_id = data.get("message_id")
+        return lobby
+
+    @property
+    def has_constraints(self) -> bool:
+        return bool(self.together or self.apart or (self.roles and self.role_caps))
+
+    def keep_together(self, user_a: int, user_b: int):
+        if user_a == user_b:
+            return
+        self.apart.discard(frozenset((user_a, user_b)))
+        merged = {user_a, user_b}
+        rest = []
+        for group in self.together:
+            if group & merged:
+                merged |= group
+            else:
+                rest.append(group)
+        self.together = rest + [merged]
+
+    def keep_apart(self, user_a: int, user_b: int):
+        if user_a == user_b:
+            return
+        self.apart.add(frozenset((user_a, user_b)))
+
+    def clear_constraints(self):
+        self.together = []
+        self.apart = set()
+        self.roles = {}
+        self.role_caps = {}
+
+
+class LobbyRegistry:
+    """Live lobbies indexed by lobby (queue message) ID and by guild.
+
+    A guild can run any number of lobbies at once; commands pick one by ID
+    or fall back to the guild's newest open lobby. A view discards its lobby
+    when it ends; any finished or cancelled lobby still here is dropped the
+    next time a lobby is added.
+    """
+
+    def __init__(self):
+        self._lobbies: dict[int, Lobby] = {}
+        self._by_guild: dict[int, dict[int, Lobby]] = {}
+        self._messages: dict[int, discord.Message | discord.PartialMessage] = {}
+
+    def __iter__(self):
+        return iter(list(self._lobbies.values()))
+
+    def __len__(self) -> int:
+        return len(self._lobbies)
+
+    def add(self, lobby: Lobby, message: discord.Message | discord.PartialMessage):
+        self.prune()
+        lobby_id = message.id
+        lobby.message_id = lobby_id
+        self._lobbies[lobby_id] = lobby
+        self._by_guild.setdefault(lobby.guild_id, {})[lobby_id] = lobby
+        self._messages[lobby_id] = message
+
+    def discard(self, lobby: Lobby):
+        lobby_id = lobby.lobby_id
+        self._lobbies.pop(lobby_id, None)
+        self._messages.pop(lobby_id, None)
+        in_guild = self._by_guild.get(lobby.guild_id)
+        if in_guild is not None:
+            in_guild.pop(lobby_id, None)
+            if not in_guild:
+                del self._by_guild[lobby.guild_id]
+
+    def prune(self):
+        inactive = [lobby for lobby in self._lobbies.values() if not lobby.active]
+        for lobby in inactive:
+            self.discard(lobby)
+
+    def get(self, lobby_id: int) -> Lobby | None:
+        return self._lobbies.get(lobby_id)
+
+    def message(self, lobby: Lobby) -> discord.Message | discord.PartialMessage | None:
+        return self._messages.get(lobby.lobby_id)
+
+    def in_guild(self, guild_id: int) -> list[Lobby]:
+        return list(self._by_guild.get(guild_id, {}).values())
+
+    def open_in_guild(self, guild_id: int) -> list[Lobby]:
+        return [lobby for lobby in self.in_guild(guild_id) if lobby.is_open]
+
+    def count_by_shard(self, shard_count: int) -> dict[int, int]:
+        """Live lobbies per owning shard."""
+        counts: dict[int, int] = {}
+        for guild_id, in_guild in self._by_guild.items():
+            shard_id = shard_for_guild(guild_id, shard_count)
+            counts[shard_id] = counts.get(shard_id, 0) + len(in_guild)
+        return counts
+
+
+# Live lobbies (any number per guild) and their queue messages
+lobbies = LobbyRegistry()
+
+
+def format_player_mentions(player_ids):
+    return ", ".join(mentions(player_ids)) or "No players yet."
+
 
-def format_player_mentions(guild: discord.Guild | None, player_ids):
-    mentions = []
-    for uid in player_ids:
-        member = guild.get_member(uid) if guild else None
-        mentions.append(member.mention if member else f"<@{uid}>")
-    return ", ".join(mentions) if mentions else "No players yet."
+def format_constraints(lobby: Lobby) -> str | None:
+    lines = []
+    for group in lobby.together:
+        lines.append("🤝 " + format_player_mentions(sorted(group)))
+    for pair in lobby.apart:
+        lines.append("↔️ " + format_player_mentions(sorted(pair)).replace(", ", " / "))
+    for role, cap in sorted(lobby.role_caps.items()):
+        players = sorted(uid for uid, r in lobby.roles.items() if r == role and uid in lobby.players)
+        lines.append(f"🎭 {role} (max {cap}/team): " + format_player_mentions(players))
+    return "\n".join(lines) if lines else None
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import os
+from typing import Callable, Iterable
+
+from logging_config import setup_logging
+from paths import BOOST_DIR
+
+from .lobby import Lobby
+from .sharding import owns_guild, shard_scoped_path
+
+log = setup_logging("boost_bot.lobby_store")
+
+LOBBIES_FILE = os.getenv("BOOST_LOBBIES_FILE", os.path.join(BOOST_DIR, "lobbies.json"))
+# Seconds to wait after a change before writing the checkpoint.
+CHECKPOINT_DELAY_SECS = float(os.getenv("BOOST_LOBBY_CHECKPOINT_SECS", "1.0"))
+
+
+class LobbyCheckpoint:
+    """Debounced snapshot of every live lobby, restored on startup.
+
+    Views call :meth:`mark_dirty` after each state change; at most one write
+    happens per ``CHECKPOINT_DELAY_SECS``. Finished and cancelled lobbies are
+    dropped from the file. Each shard process keeps its own file and only
+    restores lobbies of guilds on its shards.
+    """
+
+    def __init__(self, file_path: str = LOBBIES_FILE):
+        self.file_path = file_path
+        self._source: Callable[[], Iterable[Lobby]] = lambda: ()
+        self._task: asyncio.Task | None = None
+        self._write_lock = asyncio.Lock()
+
+    def attach(self, source: Callable[[], Iterable[Lobby]]):
+        """Tell the checkpoint where to find the lobbies to save."""
+        self._source = source
+
+    def mark_dirty(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        await asyncio.sleep(CHECKPOINT_DELAY_SECS)
+        self._task = None
+        try:
+            await self.save()
+        except Exception as e:
+            log.exception("Failed to checkpoint lobbies: %s", e)
+
+    async def save(self):
+        payload = json.dumps(
+            [lobby.to_dict() for lobby in self._source() if lobby.active and lobby.message_id]
+        )
+        async with self._write_lock:
+            await asyncio.to_thread(self._write_sync, payload)
+
+    def _write_sync(self, payload: str):
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.file_path)
+
+    def load(self) -> list[Lobby]:
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        except ValueError as e:
+            log.error("Ignoring unreadable %s: %s", self.file_path, e)
+            return []
+        lobbies = [Lobby.from_dict(d) for d in data]
+        owned = [lobby for lobby in lobbies if lobby.guild_id is None or owns_guild(lobby.guild_id)]
+        if len(owned) != len(lobbies):
+            log.warning("Dropped %d checkpointed lobby(ies) from guilds on other shards", len(lobbies) - len(owned))
+        return owned
+
+
+lobby_checkpoint = LobbyCheckpoint(shard_scoped_path(LOBBIES_FILE))
@@ -1,15 +1,26 @@
 """Discord bot entrypoint wired to modular helpers."""
 import asyncio
 import os
+import time
 
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
 # from .config import bot
-from .lobby import Lobby
-from .stats_store import PlayerStatsStore
-from .views import JoinView
+from .command_sync import GLOBAL_SCOPE, GUILD_SYNC_ROUTE, SYNC_CONCURRENCY, command_digest, command_sync_state
+from .leaderboard import leaderboard_pages, leaderboard_table
+from .lobby import DEFAULT_LOBBY_PLAYERS, MAX_LOBBY_PLAYERS, Lobby, lobbies
+from .lobby_store import lobby_checkpoint
+from .matchmaking import QueueEntry, match_window, matchmaker
+from .member_cache import member_names
+from .file_lock import lock_stats
+from .global_ladder import open_ladder
+from .metrics import handler_seconds, loop_lag_seconds, metrics, monitor_loop_lag, start_metrics_server, store_seconds, timed_handler
+from .rest_scheduler import Priority, defer, followup, outbound, respond
+from .sharding import SHARD_COUNT, SHARD_IDS, SHARD_PROCESSES, launch_shard_processes, owns_shard, shard_monitor
+from .stats_store import WATCH_INTERVAL_SECS, flush_all_stats, open_stats_store, stats_reloads, watch_stats_files
+from .views import JoinView, LeaderboardView
 from logging_config import setup_logging
 
 log = setup_logging("boost_bot")
@@ -17,21 +28,25 @@ log = setup_logging("boost_bot")
 PRIVILEGED_USER_ID = 368755002824589322
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
+# Help text for the optional `queue` argument on queue-editing commands.
+QUEUE_OPTION_HELP = "Queue to use (defaults to the newest open one)"
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 intents.guild_messages = True
 
-class BoostBot(commands.Bot):
+class BoostBot(commands.AutoShardedBot):
     _app_commands_synced: bool = False
 
-    async def sync_app_commands(self, mode_override: str | None = None) -> None:
+    async def sync_app_commands(self, mode_override: str | None = None, force: bool = False) -> None:
         """
         Register slash commands everywhere.
 
         Discord global commands can take time to appear across guilds.
         This function optionally also syncs guild-scoped commands for fast refresh.
+        Scopes whose command set hashes the same as at their last sync are
+        skipped unless ``force`` is set.
         """
         # `global` = sync global only (slower propagation)
         # `guild`  = sync each guild the bot is in (fast refresh)
@@ -39,46 +54,227 @@ class BoostBot(commands.Bot):
         mode = (mode_override or os.getenv("DISCORD_COMMAND_SYNC_MODE", "both")).strip().lower()
 
         try:
-            if mode in ("global", "both"):
-                synced_global = await self.tree.sync()
-                log.info("Synced %d command(s) globally", len(synced_global))
+            # Global commands are shared; only the process running shard 0 uploads them.
+            if mode in ("global", "both") and owns_shard(0):
+                digest = command_digest(self.tree)
+                if not force and command_sync_state.unchanged(GLOBAL_SCOPE, digest):
+                    log.info("Global commands unchanged; skipping sync")
+                else:
+                    synced_global = await outbound.submit(
+                        Priority.BACKGROUND, "PUT /applications/:id/commands", self.tree.sync
+                    )
+                    command_sync_state.mark(GLOBAL_SCOPE, digest)
+                    log.info("Synced %d command(s) globally", len(synced_global))
 
             if mode in ("guild", "both"):
                 # `@bot.tree.command` registers *global* commands. Guild sync only
                 # uploads guild-scoped commands; without copy_global_to the guild tree
                 # is empty → API returns 0 and slash commands won't show per-guild.
-                guilds = list(self.guilds)
-                log.info("Copying global commands + syncing to %d guild(s)...", len(guilds))
-                sleep_secs = float(os.getenv("DISCORD_COMMAND_SYNC_GUILD_SLEEP_SECS", "0.25"))
-                for g in guilds:
-                    try:
-                        guild_obj = discord.Object(id=g.id)
-                        self.tree.copy_global_to(guild=guild_obj)
-                        synced_guild = await self.tree.sync(guild=guild_obj)
+                pending = []
+                for g in self.guilds:
+                    guild_obj = discord.Object(id=g.id)
+                    self.tree.copy_global_to(guild=guild_obj)
+                    digest = command_digest(self.tree, guild_obj)
+                    if force or not command_sync_state.unchanged(str(g.id), digest):
+                        pending.append((guild_obj, digest))
+                log.info(
+                    "Syncing commands to %d of %d guild(s) (%d unchanged)",
+                    len(pending), len(self.guilds), len(self.guilds) - len(pending),
+                )
+                # Pacing comes from the REST scheduler's shared guild-sync bucket.
+                slots = asyncio.Semaphore(SYNC_CONCURRENCY)
+
+                async def sync_guild(guild_obj: discord.Object, digest: str):
+                    async with slots:
+                        try:
+                            synced_guild = await outbound.submit(
+                                Priority.BACKGROUND,
+                                GUILD_SYNC_ROUTE,
+                                lambda: self.tree.sync(guild=guild_obj),
+                            )
+                        except discord.HTTPException as e:
+                            command_sync_state.forget(str(guild_obj.id))
+                            log.warning("Guild sync failed for %s: %s", guild_obj.id, e)
+                            return
+                        command_sync_state.mark(str(guild_obj.id), digest)
                         log.info(
                             "Synced %d command(s) in guild %s",
                             len(synced_guild),
-                            g.id,
+                            guild_obj.id,
                         )
-                        if sleep_secs > 0:
-                            await asyncio.sleep(sleep_secs)
-                    except discord.HTTPException as e:
-                        log.warning("Guild sync failed for %s: %s", g.id, e)
+
+                await asyncio.gather(*(sync_guild(guild_obj, digest) for guild_obj, digest in pending))
         except Exception as e:
             log.exception("Failed to sync app commands: %s", e)
+        finally:
+            try:
+                command_sync_state.save()
+            except OSError as e:
+                log.warning("Could not save command sync state: %s", e)
 
     async def setup_hook(self):
+        # Re-attach views before the gateway connects so no button click is missed.
+        restore_lobbies(self)
+        self._loop_lag_task = asyncio.create_task(monitor_loop_lag())
+        self._matchmaker_task = asyncio.create_task(matchmaker.run(_open_matched_lobby))
+        if WATCH_INTERVAL_SECS > 0:
+            # The webapp writes players.json too; pick up its saves without re-reading on every call.
+            self._stats_watch_task = asyncio.create_task(watch_stats_files())
+        try:
+            self._metrics_server = await start_metrics_server()
+        except OSError as e:
+            log.error("Could not start metrics endpoint: %s", e)
         # Syncing here can run before `bot.guilds` is populated.
         # We'll sync in `on_ready` instead so guild-scoped syncing works reliably.
         log.info("setup_hook complete; will sync app commands on_ready.")
 
+    async def close(self):
+        # Stats and lobbies are written back lazily; make sure nothing is lost on shutdown.
+        await flush_all_stats()
+        try:
+            await lobby_checkpoint.save()
+        except Exception as e:
+            log.exception("Failed to checkpoint lobbies: %s", e)
+        await super().close()
+
+
+bot = BoostBot(
+    command_prefix="!",
+    intents=intents,
+    sync_commands=False,
+    http_trace=outbound.trace_config(),
+    shard_count=SHARD_COUNT,
+    shard_ids=SHARD_IDS,
+)
+
+lobby_checkpoint.attach(lambda: lobbies)
+
+metrics.gauge("boost_lobbies", "Live lobbies in this process", fn=lambda: len(lobbies))
+metrics.gauge(
+    "boost_open_lobbies", "Lobbies accepting players", fn=lambda: sum(1 for lobby in lobbies if lobby.is_open)
+)
+metrics.gauge("boost_matchmaking_queued", "Players waiting in matchmaking queues", fn=lambda: len(matchmaker))
+metrics.gauge("boost_matchmaking_matches", "Matches formed by the matchmaker", fn=lambda: matchmaker.matched)
+metrics.gauge("boost_stats_reloads", "Players file reloads after outside changes", fn=stats_reloads)
+
+
+@metrics.collector
+def _subsystem_metrics():
+    for path, s in lock_stats().items():
+        lock = os.path.basename(path)
+        yield "boost_file_lock_acquired_total", "counter", {"lock": lock}, s["acquired"]
+        yield "boost_file_lock_contended_total", "counter", {"lock": lock}, s["contended"]
+        yield "boost_file_lock_wait_seconds_total", "counter", {"lock": lock}, s["wait_total"]
+        yield "boost_file_lock_wait_max_seconds", "gauge", {"lock": lock}, s["wait_max"]
+    snap = outbound.snapshot()
+    for field, kind in (("submitted", "counter"), ("completed", "counter"), ("failed", "counter"), ("depth", "gauge")):
+        suffix = "_total" if kind == "counter" else ""
+        for priority, s in snap["priorities"].items():
+            yield f"boost_rest_{field}{suffix}", kind, {"priority": priority}, s[field]
+    yield "boost_rest_throttled_total", "counter", {}, snap["throttled"]
+    for field, value in member_names.stats().items():
+        yield f"boost_member_names_{field}", "gauge", {}, value
+    for field, value in leaderboard_pages.stats().items():
+        yield f"boost_leaderboard_pages_{field}", "gauge", {}, value
+    for shard_id, latency in bot.latencies:
+        if latency == latency:
+            yield "boost_shard_latency_seconds", "gauge", {"shard": shard_id}, latency
+
+
+def restore_lobbies(client: commands.Bot):
+    """Reload checkpointed lobbies and re-attach their views to the queue messages."""
+    restored = 0
+    for lobby in lobby_checkpoint.load():
+        if not lobby.active or not (lobby.guild_id and lobby.channel_id and lobby.message_id):
+            continue
+        view = JoinView(lobby.guild_id, lobby)
+        client.add_view(view, message_id=lobby.message_id)
+        channel = client.get_partial_messageable(lobby.channel_id, guild_id=lobby.guild_id)
+        lobbies.add(lobby, channel.get_partial_message(lobby.message_id))
+        restored += 1
+    if restored:
+        log.info("Restored %d lobby(ies) from checkpoint", restored)
+
+
+async def _queue_autocomplete(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
+    if interaction.guild is None:
+        return []
+    choices = []
+    for lobby in reversed(lobbies.open_in_guild(interaction.guild.id)):
+        name = f"{lobby.title} ({len(lobby.players)}/{lobby.max_players}) #{lobby.lobby_id}"
+        if current.lower() in name.lower():
+            choices.append(discord.app_commands.Choice(name=name[:100], value=str(lobby.lobby_id)))
+    return choices[:25]
+
+
+async def _resolve_lobby(interaction: discord.Interaction, queue: str | None) -> Lobby | None:
+    """Open lobby named by ``queue`` or the guild's newest one; replies with the reason if none."""
+    if queue:
+        lobby = lobbies.get(int(queue)) if queue.isdigit() else None
+        if lobby is None or lobby.guild_id != interaction.guild.id or not lobby.is_open:
+            await respond(interaction, "That queue is not open.", ephemeral=True)
+            return None
+        return lobby
+    open_lobbies = lobbies.open_in_guild(interaction.guild.id)
+    if not open_lobbies:
+        await respond(interaction, "No open queue. Start one first.", ephemeral=True)
+        return None
+    return open_lobbies[-1]
+
+
+@bot.listen("on_interaction")
+async def _count_interaction(interaction: discord.Interaction):
+    shard_monitor.record(interaction.guild.shard_id if interaction.guild else 0)
+
+
+@bot.listen("on_message")
+async def _count_message(message: discord.Message):
+    shard_monitor.record(message.guild.shard_id if message.guild else 0)
+
+
+@bot.listen("on_member_update")
+async def _refresh_member_name(before: discord.Member, after: discord.Member):
+    if before.display_name != after.display_name:
+        member_names.update(after)
+
+
+@bot.listen("on_member_join")
+async def _remember_member_name(member: discord.Member):
+    member_names.update(member)
+
+
+@bot.listen("on_member_remove")
+async def _forget_member_name(member: discord.Member):
+    member_names.invalidate(member.guild.id, member.id)
+    matchmaker.remove(member.guild.id, member.id)
 
-bot = BoostBot(command_prefix="!", intents=intents, sync_commands=False)
 
-# Per-guild lobby state: guild_id -> Lobby
-guild_lobbies: dict[int, Lobby] = {}
-# Per-guild queue message for reuse
-guild_queue_messages: dict[int, discord.Message] = {}
+@bot.listen("on_user_update")
+async def _forget_user_name(before: discord.User, after: discord.User):
+    if before.global_name != after.global_name or before.name != after.name:
+        member_names.invalidate_user(after.id)
+
+
+@bot.listen("on_guild_remove")
+async def _forget_guild_names(guild: discord.Guild):
+    member_names.invalidate(guild.id)
+    matchmaker.drop_guild(guild.id)
+
+
+@bot.event
+async def on_shard_ready(shard_id: int):
+    log.info("Shard %d ready", shard_id)
+
+
+@bot.event
+async def on_shard_resumed(shard_id: int):
+    log.info("Shard %d resumed", shard_id)
+
+
+@bot.event
+async def on_shard_disconnect(shard_id: int):
+    shard_monitor.disconnected(shard_id)
+    log.warning("Shard %d disconnected", shard_id)
 
 
 @bot.event
@@ -95,167 +291,350 @@ async def on_ready():
 
 
 @bot.tree.command(name="startqueue", description="Create a game queue")
-@discord.app_commands.describe(title="Optional title to display at the top of the queue")
-async def startqueue(interaction: discord.Interaction, title: str | None = None):
+@discord.app_commands.describe(
+    title="Optional title to display at the top of the queue",
+    size=f"Maximum players (default {DEFAULT_LOBBY_PLAYERS})",
+)
+@timed_handler("command", "startqueue")
+async def startqueue(
+    interaction: discord.Interaction,
+    title: str | None = None,
+    size: discord.app_commands.Range[int, 2, MAX_LOBBY_PLAYERS] | None = None,
+):
     if interaction.guild is None:
-        return await interaction.response.send_message("Use this in a server.", ephemeral=True)
+        return await respond(interaction, "Use this in a server.", ephemeral=True)
     is_admin = interaction.user.guild_permissions.administrator
     is_privileged = interaction.user.id == PRIVILEGED_USER_ID
     if not (is_admin or is_privileged):
-        return await interaction.response.send_message(
+        return await respond(interaction,
             "Only server admins can start a queue.",
             ephemeral=True
         )
 
     gid = interaction.guild.id
 
-    # Always create a fresh lobby
-    lobby = Lobby(host_id=interaction.user.id, title=title or "Queue")
-    guild_lobbies[gid] = lobby
+    # Always create a fresh lobby; other queues in the guild keep running
+    lobby = Lobby(host_id=interaction.user.id, title=title or "Queue", max_players=size or DEFAULT_LOBBY_PLAYERS)
+    lobby.guild_id = gid
 
-    store = PlayerStatsStore(interaction.guild.id)
+    # Acknowledge first: ensure_users may have to fetch the member from Discord.
+    await defer(interaction)
+    store = open_stats_store(interaction.guild.id)
     await store.ensure_users(interaction.guild, [interaction.user.id])
 
     view = JoinView(gid, lobby)
-    await interaction.response.defer()
     msg = await view.update_queue_message(interaction,
         note="Press Join to enter. Host/Admin can Start or Cancel."
     )
     if msg:
-        guild_queue_messages[gid] = msg
+        lobbies.add(lobby, msg)
+
+
+async def _open_matched_lobby(guild_id: int, entries: list[QueueEntry]):
+    """Matchmaker callback: turn a popped match into a started lobby in the anchor's channel."""
+    players = [entry.user_id for entry in entries]
+    # The longest-waiting player hosts, so they can report the result.
+    lobby = Lobby(host_id=players[0], title="Matchmaking", max_players=len(players))
+    lobby.guild_id = guild_id
+    lobby.players = set(players)
+    channel = bot.get_partial_messageable(entries[0].channel_id, guild_id=guild_id)
+    msg = await JoinView(guild_id, lobby).start_matched(bot.get_guild(guild_id), channel)
+    if msg is None:
+        raise RuntimeError("no balanced split for the matched players")
+    lobbies.add(lobby, msg)
+    spread = max(e.points for e in entries) - min(e.points for e in entries)
+    log.info("Matched %d player(s) in guild %s (spread %d pts)", len(players), guild_id, spread)
+
+
+@bot.tree.command(name="mmjoin", description="Join the matchmaking queue; a match opens when enough players are close in points")
+@timed_handler("command", "mmjoin")
+async def mmjoin(interaction: discord.Interaction):
+    if interaction.guild is None:
+        return await respond(interaction, "Use this in a server.", ephemeral=True)
+    gid, uid = interaction.guild.id, interaction.user.id
+    if uid in matchmaker.queue(gid):
+        return await respond(interaction, "You're already in the matchmaking queue.", ephemeral=True)
+
+    # Acknowledge first: ensure_users may have to fetch the member from Discord.
+    await defer(interaction, ephemeral=True)
+    store = open_stats_store(gid)
+    async with store.transaction() as tx:
+        await tx.ensure_users(interaction.guild, [uid])
+        points = (await tx.get_points_for([uid])).get(str(uid), 1000)
+    matchmaker.enqueue(gid, uid, points, interaction.channel_id)
+    await followup(interaction,
+        f"You're in the matchmaking queue at {points} points ({len(matchmaker.queue(gid))} waiting). "
+        "You'll be pinged here when a match is found.",
+        ephemeral=True
+    )
+
+
+@bot.tree.command(name="mmleave", description="Leave the matchmaking queue")
+@timed_handler("command", "mmleave")
+async def mmleave(interaction: discord.Interaction):
+    if interaction.guild is None:
+        return await respond(interaction, "Use this in a server.", ephemeral=True)
+    if matchmaker.remove(interaction.guild.id, interaction.user.id):
+        return await respond(interaction, "You left the matchmaking queue.", ephemeral=True)
+    await respond(interaction, "You're not in the matchmaking queue.", ephemeral=True)
+
+
+@bot.tree.command(name="mmstatus", description="Show the matchmaking queue")
+@timed_handler("command", "mmstatus")
+async def mmstatus(interaction: discord.Interaction):
+    if interaction.guild is None:
+        return await respond(interaction, "Use this in a server.", ephemeral=True)
+    queue = matchmaker.queue(interaction.guild.id)
+    text = f"{len(queue)} player(s) waiting; matches have {matchmaker.size} players."
+    entry = queue.get(interaction.user.id)
+    if entry is not None:
+        waited = time.monotonic() - entry.enqueued_at
+        text += (
+            f"\nYou: #{queue.position(entry.user_id)} in line, {entry.points} pts, waiting {waited:.0f}s, "
+            f"matching within ±{match_window(waited):.0f} pts."
+        )
+    await respond(interaction, text, ephemeral=True)
 
 
-@bot.tree.command(name="kickfromqueue", description="Remove a mentioned user from the current queue")
-@discord.app_commands.describe(user="User to remove from the queue")
-async def kickfromqueue(interaction: discord.Interaction, user: discord.Member):
+@bot.tree.command(name="kickfromqueue", description="Remove a mentioned user from a queue")
+@discord.app_commands.describe(user="User to remove from the queue", queue=QUEUE_OPTION_HELP)
+@discord.app_commands.autocomplete(queue=_queue_autocomplete)
+@timed_handler("command", "kickfromqueue")
+async def kickfromqueue(interaction: discord.Interaction, user: discord.Member, queue: str | None = None):
     if interaction.guild is None:
-        return await interaction.response.send_message("Use this in a server.", ephemeral=True)
+        return await respond(interaction, "Use this in a server.", ephemeral=True)
 
     gid = interaction.guild.id
-    lobby = guild_lobbies.get(gid)
-    if not lobby or lobby.started:
-        return await interaction.response.send_message("No open queue. Start one first.", ephemeral=True)
+    lobby = await _resolve_lobby(interaction, queue)
+    if lobby is None:
+        return
 
     is_admin = interaction.user.guild_permissions.administrator if interaction.guild else False
     is_privileged = interaction.user.id == PRIVILEGED_USER_ID
     if interaction.user.id != lobby.host_id and not (is_admin or is_privileged):
-        return await interaction.response.send_message("Only the host or a server admin can kick players.", ephemeral=True)
+        return await respond(interaction, "Only the host or a server admin can kick players.", ephemeral=True)
 
     removed = lobby.remove(user.id)
     if not removed:
-        return await interaction.response.send_message("Could not remove user (not in queue or queue started).", ephemeral=True)
+        return await respond(interaction, "Could not remove user (not in queue or queue started).", ephemeral=True)
 
     view = JoinView(gid, lobby)
-    msg = guild_queue_messages.get(gid)
+    msg = lobbies.message(lobby)
     if msg:
-        await msg.edit(embed=None, view=view)
+        await respond(interaction, f"{user.display_name} removed from the queue.", ephemeral=True)
         await view.update_queue_message(interaction,
             note=f"{user.display_name} was kicked by {interaction.user.display_name}.",
             target_message=msg
         )
-        await interaction.response.send_message(f"{user.display_name} removed from the queue.", ephemeral=True)
         return
 
-    await interaction.response.send_message("Could not update queue message. Please try again.", ephemeral=True)
+    await respond(interaction, "Could not update queue message. Please try again.", ephemeral=True)
 
 
-@bot.tree.command(name="addtoqueue", description="Add a mentioned user to the current queue")
-@discord.app_commands.describe(user="User to add to the queue")
-async def addtoqueue(interaction: discord.Interaction, user: discord.Member):
+@bot.tree.command(name="addtoqueue", description="Add a mentioned user to a queue")
+@discord.app_commands.describe(user="User to add to the queue", queue=QUEUE_OPTION_HELP)
+@discord.app_commands.autocomplete(queue=_queue_autocomplete)
+@timed_handler("command", "addtoqueue")
+async def addtoqueue(interaction: discord.Interaction, user: discord.Member, queue: str | None = None):
     if interaction.guild is None:
-        return await interaction.response.send_message("Use this in a server.", ephemeral=True)
+        return await respond(interaction, "Use this in a server.", ephemeral=True)
 
     gid = interaction.guild.id
-    lobby = guild_lobbies.get(gid)
-    if not lobby or lobby.started:
-        return await interaction.response.send_message("No open queue. Start one first.", ephemeral=True)
+    lobby = await _resolve_lobby(interaction, queue)
+    if lobby is None:
+        return
 
     is_admin = interaction.user.guild_permissions.administrator if interaction.guild else False
     is_privileged = interaction.user.id == PRIVILEGED_USER_ID
     if interaction.user.id != lobby.host_id and not (is_admin or is_privileged):
-        return await interaction.response.send_message("Only the host or a server admin can add players.", ephemeral=True)
+        return await respond(interaction, "Only the host or a server admin can add players.", ephemeral=True)
 
     added = lobby.add(user.id)
     if not added:
-        return await interaction.response.send_message("Could not add user (queue may have started).", ephemeral=True)
+        return await respond(interaction, "Could not add user (queue may have started).", ephemeral=True)
 
-    store = PlayerStatsStore(interaction.guild.id)
-    await store.ensure_users(interaction.guild, [user.id])
-
-    view = JoinView(gid, lobby)
+    msg = lobbies.message(lobby)
+    # Acknowledge first: ensure_users may fetch the member, and the queue edit may be coalesced.
+    if msg:
+        await respond(interaction, f"{user.display_name} added to the queue.", ephemeral=True)
+    else:
+        await respond(interaction, "Could not update queue message. Please try again.", ephemeral=True)
 
-    msg = guild_queue_messages.get(gid)
+    store = open_stats_store(interaction.guild.id)
+    await store.ensure_users(interaction.guild, [user.id])
     if msg:
-        # Try to edit the existing queue message directly
-        # try:
-        await msg.edit(embed=None, view=view)
-        # Update embed inline
+        view = JoinView(gid, lobby)
         await view.update_queue_message(interaction,
             note=f"{user.display_name} was added by {interaction.user.display_name}.",
             target_message=msg
         )
-        await interaction.response.send_message(f"{user.display_name} added to the queue.", ephemeral=True)
+
+
+async def _constraint_target(interaction: discord.Interaction, queue: str | None) -> Lobby | None:
+    """Open lobby the caller may edit constraints for; replies with the reason if none."""
+    if interaction.guild is None:
+        await respond(interaction, "Use this in a server.", ephemeral=True)
+        return None
+    lobby = await _resolve_lobby(interaction, queue)
+    if lobby is None:
+        return None
+    is_admin = interaction.user.guild_permissions.administrator
+    is_privileged = interaction.user.id == PRIVILEGED_USER_ID
+    if interaction.user.id != lobby.host_id and not (is_admin or is_privileged):
+        await respond(interaction,
+            "Only the host or a server admin can change team constraints.", ephemeral=True
+        )
+        return None
+    return lobby
+
+
+async def _refresh_queue(interaction: discord.Interaction, lobby: Lobby, note: str):
+    gid = interaction.guild.id
+    await respond(interaction, note, ephemeral=True)
+    msg = lobbies.message(lobby)
+    if msg:
+        await JoinView(gid, lobby).update_queue_message(interaction, note=note, target_message=msg)
+
+
+@bot.tree.command(name="queuepair", description="Keep two players on the same team")
+@discord.app_commands.describe(user="First player", other="Second player", queue=QUEUE_OPTION_HELP)
+@discord.app_commands.autocomplete(queue=_queue_autocomplete)
+@timed_handler("command", "queuepair")
+async def queuepair(
+    interaction: discord.Interaction, user: discord.Member, other: discord.Member, queue: str | None = None
+):
+    lobby = await _constraint_target(interaction, queue)
+    if lobby is None:
+        return
+    lobby.keep_together(user.id, other.id)
+    await _refresh_queue(interaction, lobby, f"{user.display_name} and {other.display_name} will play together.")
+
+
+@bot.tree.command(name="queuesplit", description="Keep two players on opposite teams")
+@discord.app_commands.describe(user="First player", other="Second player", queue=QUEUE_OPTION_HELP)
+@discord.app_commands.autocomplete(queue=_queue_autocomplete)
+@timed_handler("command", "queuesplit")
+async def queuesplit(
+    interaction: discord.Interaction, user: discord.Member, other: discord.Member, queue: str | None = None
+):
+    lobby = await _constraint_target(interaction, queue)
+    if lobby is None:
+        return
+    if any(user.id in group and other.id in group for group in lobby.together):
+        return await respond(interaction,
+            "Those players are paired; clear constraints first.", ephemeral=True
+        )
+    lobby.keep_apart(user.id, other.id)
+    await _refresh_queue(interaction, lobby, f"{user.display_name} and {other.display_name} will be split.")
+
+
+@bot.tree.command(name="queuerole", description="Set a player's role for team balancing")
+@discord.app_commands.describe(user="Player", role="Role name, e.g. tank or sniper", queue=QUEUE_OPTION_HELP)
+@discord.app_commands.autocomplete(queue=_queue_autocomplete)
+@timed_handler("command", "queuerole")
+async def queuerole(interaction: discord.Interaction, user: discord.Member, role: str, queue: str | None = None):
+    lobby = await _constraint_target(interaction, queue)
+    if lobby is None:
+        return
+    lobby.roles[user.id] = role.strip().lower()
+    await _refresh_queue(interaction, lobby, f"{user.display_name} plays {lobby.roles[user.id]}.")
+
+
+@bot.tree.command(name="queuerolecap", description="Limit how many players of a role each team gets")
+@discord.app_commands.describe(role="Role name", cap="Maximum per team (0 removes the limit)", queue=QUEUE_OPTION_HELP)
+@discord.app_commands.autocomplete(queue=_queue_autocomplete)
+@timed_handler("command", "queuerolecap")
+async def queuerolecap(
+    interaction: discord.Interaction,
+    role: str,
+    cap: discord.app_commands.Range[int, 0, MAX_LOBBY_PLAYERS // 2],
+    queue: str | None = None,
+):
+    lobby = await _constraint_target(interaction, queue)
+    if lobby is None:
         return
-        # except Exception as e:
-        #     print(f"Failed to edit existing queue message: {e}")
-        #     pass
+    role = role.strip().lower()
+    if cap:
+        lobby.role_caps[role] = cap
+        note = f"Each team gets at most {cap} {role}."
+    else:
+        lobby.role_caps.pop(role, None)
+        note = f"No limit on {role}."
+    await _refresh_queue(interaction, lobby, note)
+
+
+@bot.tree.command(name="queueclearconstraints", description="Remove all team constraints from the queue")
+@discord.app_commands.describe(queue=QUEUE_OPTION_HELP)
+@discord.app_commands.autocomplete(queue=_queue_autocomplete)
+@timed_handler("command", "queueclearconstraints")
+async def queueclearconstraints(interaction: discord.Interaction, queue: str | None = None):
+    lobby = await _constraint_target(interaction, queue)
+    if lobby is None:
+        return
+    lobby.clear_constraints()
+    await _refresh_queue(interaction, lobby, "Team constraints cleared.")
+
 
-    # Fallback if message not found
-    await interaction.response.send_message("Could not update queue message. Please try again.", ephemeral=True)
+LADDER_CHOICES = [
+    discord.app_commands.Choice(name="This server", value="guild"),
+    discord.app_commands.Choice(name="All servers", value="global"),
+]
 
 
 @bot.tree.command(name="leaderboard", description="Show all players ranked by points")
-async def leaderboard(interaction: discord.Interaction):
+@discord.app_commands.describe(page="Page to open (default 1)", ladder="Which ladder to show (default: this server)")
+@discord.app_commands.choices(ladder=LADDER_CHOICES)
+@timed_handler("command", "leaderboard")
+async def leaderboard(
+    interaction: discord.Interaction,
+    page: discord.app_commands.Range[int, 1] | None = None,
+    ladder: str | None = None,
+):
     if interaction.guild is None:
-        return await interaction.response.send_message("Use this in a server.", ephemeral=True)
+        return await respond(interaction, "Use this in a server.", ephemeral=True)
 
-    store = PlayerStatsStore(interaction.guild.id)
-    stats = await store.load()
+    view = LeaderboardView(interaction.guild.id, interaction.user.id, ladder=ladder or "guild")
+    embed = await view.render((page or 1) - 1)
+    if embed is None:
+        return await respond(interaction, "No stats available.", ephemeral=True)
+    await respond(interaction, embed=embed, view=view, ephemeral=True)
 
-    if not stats:
-        return await interaction.response.send_message("No stats available.", ephemeral=True)
 
-    rows = []
-    for _, data in stats.items():
-        if not isinstance(data, dict):
-            continue
-        wins = int(data.get("wins", 0))
-        losses = int(data.get("losses", 0))
-        draws = int(data.get("draws", 0))
-        rows.append({
-            "name": data.get("name", "Unknown"),
-            "elo": data.get("points", 1000),
-            "wins": wins,
-            "loses": losses,
-            "draws": draws,
-        })
-
-    rows.sort(key=lambda r: r["elo"], reverse=True)
-
-    header = f"{'#':<2} | {'Player':<12} | {'Elo':>4} | {'W-D-L':^7} | {'WR':>5}  \n"
-    header += "-" * 44
-
-    lines = [header]
-    for i, r in enumerate(rows, start=1):
-        name = (r["name"] or "Unknown")[:12]
-        total = r["wins"] + r["loses"]
-        win_rate = (r["wins"] / total * 100) if total > 0 else 0.0
-        record = f"{r['wins']}-{r['draws']}-{r['loses']}"
-        lines.append(
-            f"{i:<2} | {name.capitalize():<12} | {r['elo']:>4} | {record:^7} | {win_rate:>5.1f}%"
+@bot.tree.command(name="rank", description="Show a player's rank, Elo and nearby players")
+@discord.app_commands.describe(user="Player to look up (defaults to you)", ladder="Which ladder to rank in (default: this server)")
+@discord.app_commands.choices(ladder=LADDER_CHOICES)
+@timed_handler("command", "rank")
+async def rank(interaction: discord.Interaction, user: discord.Member | None = None, ladder: str | None = None):
+    if interaction.guild is None:
+        return await respond(interaction, "Use this in a server.", ephemeral=True)
+
+    target = user or interaction.user
+    store = open_ladder(interaction.guild.id, ladder or "guild")
+    result = await store.get_rank(target.id)
+    if result is None:
+        return await respond(interaction,
+            f"{target.display_name} has no recorded games yet.", ephemeral=True
         )
 
-    table_text = "```\n" + "\n".join(lines) + "\n```"
+    position, total, rows = result
+    entry = next(data for r, _, data in rows if r == position)
+    wins = int(entry.get("wins", 0))
+    losses = int(entry.get("losses", 0))
+    draws = int(entry.get("draws", 0))
 
     embed = discord.Embed(
-        title="🏆 Leaderboard",
-        description=table_text,
+        title=f"📈 {target.display_name}",
+        description=leaderboard_table([(r, data) for r, _, data in rows]),
         color=discord.Color.gold()
     )
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    embed.add_field(name="Rank", value=f"#{position} of {total}", inline=True)
+    embed.add_field(name="Elo", value=str(entry.get("points", 1000)), inline=True)
+    embed.add_field(name="W-D-L", value=f"{wins}-{draws}-{losses}", inline=True)
+    await respond(interaction, embed=embed, ephemeral=True)
 
 
 @bot.command(name="synccommands")
+@timed_handler("prefix", "synccommands")
 async def synccommands(ctx: commands.Context, mode: str | None = None):
     """
     Force a slash-command sync now (admin-only).
@@ -271,14 +650,74 @@ async def synccommands(ctx: commands.Context, mode: str | None = None):
         return await ctx.send("Only server admins can sync commands.")
 
     await ctx.send("Syncing slash commands...")
-    await bot.sync_app_commands(mode_override=mode)
+    await bot.sync_app_commands(mode_override=mode, force=True)
     await ctx.send("Done. Check the command list in your server.")
 
 
+@bot.command(name="shards")
+@timed_handler("prefix", "shards")
+async def shards(ctx: commands.Context):
+    """Per-shard latency, event rate and lobby count for this process (admin-only)."""
+    is_admin = getattr(ctx.author, "guild_permissions", None) and ctx.author.guild_permissions.administrator
+    if not (is_admin or ctx.author.id == PRIVILEGED_USER_ID):
+        return await ctx.send("Only server admins can view shard status.")
+
+    shard_count = bot.shard_count or 1
+    lobby_counts = lobbies.count_by_shard(shard_count)
+    guild_counts: dict[int, int] = {}
+    for g in bot.guilds:
+        guild_counts[g.shard_id] = guild_counts.get(g.shard_id, 0) + 1
+
+    lines = [f"{'Shard':<5} | {'Ping':>6} | {'Ev/min':>7} | {'Guilds':>6} | {'Lobbies':>7} | {'Drops':>5}"]
+    lines.append("-" * 52)
+    for row in shard_monitor.snapshot(bot.latencies):
+        sid = row["shard_id"]
+        ping = f"{row['latency_ms']:.0f}ms" if row["latency_ms"] is not None else "-"
+        lines.append(
+            f"{sid:<5} | {ping:>6} | {row['events_per_min']:>7.1f} | {guild_counts.get(sid, 0):>6} | "
+            f"{lobby_counts.get(sid, 0):>7} | {row['reconnects']:>5}"
+        )
+    await ctx.send(f"Shards {len(bot.latencies)}/{shard_count} in this process\n```\n" + "\n".join(lines) + "\n```")
+
+
+def _format_timings(histogram, label: str) -> list[str]:
+    rows = sorted(histogram.summary(), key=lambda r: -r[1])
+    lines = []
+    for key, count, mean, p50, p95 in rows:
+        labels = dict(key)
+        name = labels.get(label, "?")
+        if "kind" in labels and label != "kind":
+            name = f"{labels['kind']}:{name}"
+        lines.append(f"{name[:24]:<24} {count:>7} {mean * 1000:>8.1f} {(p95 or 0) * 1000:>8.1f}")
+    return lines
+
+
+@bot.command(name="stats")
+@timed_handler("prefix", "stats")
+async def stats(ctx: commands.Context):
+    """Handler, storage and event-loop timings for this process (admin-only)."""
+    is_admin = getattr(ctx.author, "guild_permissions", None) and ctx.author.guild_permissions.administrator
+    if not (is_admin or ctx.author.id == PRIVILEGED_USER_ID):
+        return await ctx.send("Only server admins can view bot stats.")
+
+    header = f"{'':<24} {'calls':>7} {'avg ms':>8} {'p95 ms':>8}"
+    lines = [header, "-- handlers"] + _format_timings(handler_seconds, "name")[:12]
+    lines += ["-- store"] + _format_timings(store_seconds, "op")[:10]
+    p95 = loop_lag_seconds.quantile(0.95)
+    lines.append("")
+    lines.append(f"loop lag p95: {(p95 or 0) * 1000:.1f} ms  lobbies: {len(lobbies)} "
+                 f"(open {sum(1 for lobby in lobbies if lobby.is_open)})")
+    snap = outbound.snapshot()
+    depth = ", ".join(f"{p}={s['depth']}" for p, s in snap["priorities"].items())
+    lines.append(f"rest queue: {depth}  throttled: {snap['throttled']}")
+    await ctx.send("```\n" + "\n".join(lines)[:1900] + "\n```")
+
 
 def run_bot():
     if not TOKEN:
         log.error("Set DISCORD_TOKEN environment variable with your bot token.")
+    elif SHARD_PROCESSES > 1 and SHARD_IDS is None:
+        launch_shard_processes()
     else:
         bot.run(TOKEN)
 
@@ -0,0 +1,204 @@
+import asyncio
+import bisect
+import heapq
+import itertools
+import os
+import time
+from typing import Awaitable, Callable
+
+from logging_config import setup_logging
+
+from .lobby import DEFAULT_LOBBY_PLAYERS, MAX_LOBBY_PLAYERS
+
+log = setup_logging("boost_bot.matchmaking")
+
+# Players per auto-formed match (even, at most MAX_LOBBY_PLAYERS).
+MATCH_SIZE = min(MAX_LOBBY_PLAYERS, max(2, int(os.getenv("BOOST_MATCH_SIZE", str(DEFAULT_LOBBY_PLAYERS))) // 2 * 2))
+# Seconds between matcher passes.
+MATCH_TICK_SECS = float(os.getenv("BOOST_MATCH_TICK_SECS", "2.0"))
+# Points either side of a player that count as a fair match right after queueing...
+MATCH_WINDOW_BASE = float(os.getenv("BOOST_MATCH_WINDOW_BASE", "50"))
+# ...widening by this many points per second of waiting...
+MATCH_WINDOW_GROWTH = float(os.getenv("BOOST_MATCH_WINDOW_GROWTH", "5"))
+# ...up to this.
+MATCH_WINDOW_MAX = float(os.getenv("BOOST_MATCH_WINDOW_MAX", "600"))
+# Longest-waiting players tried as match anchors per pass; bounds the cost of a pass.
+MATCH_ANCHORS_PER_TICK = int(os.getenv("BOOST_MATCH_ANCHORS_PER_TICK", "64"))
+
+
+def match_window(waited: float) -> float:
+    """Points either side of a player who has waited ``waited`` seconds."""
+    return min(MATCH_WINDOW_MAX, MATCH_WINDOW_BASE + MATCH_WINDOW_GROWTH * max(0.0, waited))
+
+
+class QueueEntry:
+    __slots__ = ("user_id", "points", "channel_id", "enqueued_at")
+
+    def __init__(self, user_id: int, points: int, channel_id: int | None, enqueued_at: float):
+        self.user_id = user_id
+        self.points = points
+        self.channel_id = channel_id
+        self.enqueued_at = enqueued_at
+
+    @property
+    def key(self) -> tuple[int, float, int]:
+        return (self.points, self.enqueued_at, self.user_id)
+
+
+class MatchmakingQueue:
+    """Players waiting for a match in one guild, indexed by points and by wait time.
+
+    ``_entries`` is in enqueue order (oldest first) and ``_by_points`` is a
+    sorted list of ``(points, enqueued_at, uid)``. A pass takes the
+    longest-waiting players as anchors; for each, two bisects find everyone
+    inside the anchor's window and the ``size`` players closest to the
+    anchor's points form the match. A pass does O(k log n) comparisons for
+    k anchors and matched players; adding or removing a player also shifts
+    the tail of ``_by_points`` (a memmove, O(n) but cheap at queue sizes).
+    """
+
+    def __init__(self):
+        self._entries: dict[int, QueueEntry] = {}
+        self._by_points: list[tuple[int, float, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._entries
+
+    def get(self, user_id: int) -> QueueEntry | None:
+        return self._entries.get(user_id)
+
+    def add(self, entry: QueueEntry) -> bool:
+        if entry.user_id in self._entries:
+            return False
+        self._entries[entry.user_id] = entry
+        bisect.insort(self._by_points, entry.key)
+        return True
+
+    def restore(self, entries: list[QueueEntry]):
+        """Put matched players back in the queue at their original place in wait order."""
+        def waited(entry):
+            return entry.enqueued_at
+
+        waiting = list(self._entries.values())
+        added = sorted((entry for entry in entries if self.add(entry)), key=waited)
+        if waiting and added and added[0].enqueued_at < waiting[-1].enqueued_at:
+            # add() appended them; merge the two sorted runs so the oldest still come first as anchors.
+            self._entries = {entry.user_id: entry for entry in heapq.merge(waiting, added, key=waited)}
+
+    def remove(self, user_id: int) -> QueueEntry | None:
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            i = bisect.bisect_left(self._by_points, entry.key)
+            del self._by_points[i]
+        return entry
+
+    def position(self, user_id: int) -> int | None:
+        """1-based place in wait order."""
+        for i, uid in enumerate(self._entries, start=1):
+            if uid == user_id:
+                return i
+        return None
+
+    def _closest(self, anchor: QueueEntry, lo: int, hi: int, size: int) -> list[int]:
+        """Indexes into ``_by_points[lo:hi]`` of the ``size`` players nearest ``anchor``, anchor included."""
+        i = bisect.bisect_left(self._by_points, anchor.key)
+        picked = [i]
+        left, right = i - 1, i + 1
+        while len(picked) < size:
+            take_left = left >= lo and (
+                right >= hi or anchor.points - self._by_points[left][0] <= self._by_points[right][0] - anchor.points
+            )
+            if take_left:
+                picked.append(left)
+                left -= 1
+            else:
+                picked.append(right)
+                right += 1
+        return picked
+
+    def pop_matches(self, now: float, size: int = MATCH_SIZE, anchors: int = MATCH_ANCHORS_PER_TICK) -> list[list[QueueEntry]]:
+        """Remove and return every match a pass finds, each ordered anchor first."""
+        matches = []
+        for uid in list(itertools.islice(self._entries, anchors)):
+            if len(self._entries) < size:
+                break
+            anchor = self._entries.get(uid)
+            if anchor is None:
+                continue  # taken by an earlier match this pass
+            window = match_window(now - anchor.enqueued_at)
+            lo = bisect.bisect_left(self._by_points, (anchor.points - window,))
+            hi = bisect.bisect_right(self._by_points, (anchor.points + window, float("inf")))
+            if hi - lo < size:
+                continue
+            group = [self._by_points[j][2] for j in self._closest(anchor, lo, hi, size)]
+            matches.append([self.remove(member) for member in group])
+        return matches
+
+
+class Matchmaker:
+    """Per-guild matchmaking queues and the background task that pops matches.
+
+    The task calls ``on_match(guild_id, entries)`` for every match found;
+    if that raises, the players go back into the queue with their original
+    wait time.
+    """
+
+    def __init__(self, size: int = MATCH_SIZE, interval: float = MATCH_TICK_SECS):
+        self.size = size
+        self.interval = interval
+        self._queues: dict[int, MatchmakingQueue] = {}
+        self.matched = 0
+
+    def queue(self, guild_id: int) -> MatchmakingQueue:
+        q = self._queues.get(guild_id)
+        if q is None:
+            q = self._queues[guild_id] = MatchmakingQueue()
+        return q
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def enqueue(self, guild_id: int, user_id: int, points: int, channel_id: int | None = None) -> bool:
+        return self.queue(guild_id).add(QueueEntry(user_id, points, channel_id, time.monotonic()))
+
+    def remove(self, guild_id: int, user_id: int) -> bool:
+        q = self._queues.get(guild_id)
+        return q is not None and q.remove(user_id) is not None
+
+    def drop_guild(self, guild_id: int):
+        self._queues.pop(guild_id, None)
+
+    def requeue(self, guild_id: int, entries: list[QueueEntry]):
+        self.queue(guild_id).restore(entries)
+
+    def tick(self, now: float | None = None) -> list[tuple[int, list[QueueEntry]]]:
+        now = time.monotonic() if now is None else now
+        found = []
+        for guild_id, q in list(self._queues.items()):
+            for group in q.pop_matches(now, self.size):
+                found.append((guild_id, group))
+            if not q:
+                del self._queues[guild_id]
+        self.matched += len(found)
+        return found
+
+    async def _launch(self, on_match, guild_id: int, entries: list[QueueEntry]):
+        try:
+            await on_match(guild_id, entries)
+        except Exception as e:
+            log.exception("Could not open a match in guild %s; requeueing %d player(s): %s", guild_id, len(entries), e)
+            self.requeue(guild_id, entries)
+
+    async def run(self, on_match: Callable[[int, list[QueueEntry]], Awaitable[None]]):
+        """Pop matches every ``interval`` seconds, forever."""
+        while True:
+            await asyncio.sleep(self.interval)
+            found = self.tick()
+            if found:
+                await asyncio.gather(*(self._launch(on_match, gid, entries) for gid, entries in found))
+
+
+matchmaker = Matchmaker()
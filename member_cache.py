@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+
+import discord
+
+from logging_config import setup_logging
+
+log = setup_logging("boost_bot.member_cache")
+
+# How long a resolved display name is trusted without a member update event.
+NAME_TTL_SECS = float(os.getenv("BOOST_MEMBER_NAME_TTL_SECS", "600"))
+# Members that could not be found are not asked for again before this.
+MISS_TTL_SECS = float(os.getenv("BOOST_MEMBER_MISS_TTL_SECS", "60"))
+# Gateway limit for user_ids in one member chunk request.
+QUERY_CHUNK = 100
+
+
+def mention(uid: int) -> str:
+    """Discord renders this client-side, so it never needs the member object."""
+    return f"<@{uid}>"
+
+
+def mentions(user_ids) -> list[str]:
+    return [mention(uid) for uid in user_ids]
+
+
+class MemberNameCache:
+    """Display names per guild with a TTL, filled from the member cache or one chunk request.
+
+    ``name`` is a synchronous lookup for render paths. ``resolve`` also asks
+    the gateway for members missing from discord.py's cache, up to
+    ``QUERY_CHUNK`` users per request. Entries are refreshed by
+    :meth:`update` from ``on_member_update`` and dropped by :meth:`invalidate`.
+    """
+
+    def __init__(self, ttl: float = NAME_TTL_SECS, miss_ttl: float = MISS_TTL_SECS):
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        # guild_id -> uid -> (name or None for a miss, expires_at)
+        self._names: dict[int, dict[int, tuple[str | None, float]]] = {}
+        self._fetch_locks: dict[int, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.fetched = 0
+
+    @staticmethod
+    def _member_name(member) -> str | None:
+        return getattr(member, "display_name", None) or getattr(member, "name", None)
+
+    def _store(self, guild_id: int, uid: int, name: str | None):
+        ttl = self.ttl if name else self.miss_ttl
+        self._names.setdefault(guild_id, {})[uid] = (name, time.monotonic() + ttl)
+
+    def _cached(self, guild_id: int, uid: int) -> tuple[bool, str | None]:
+        entry = self._names.get(guild_id, {}).get(uid)
+        if entry is None or entry[1] <= time.monotonic():
+            return False, None
+        return True, entry[0]
+
+    def name(self, guild: discord.Guild | None, uid: int) -> str | None:
+        """Cached display name, else discord.py's member cache; never hits the API."""
+        if guild is None:
+            return None
+        found, name = self._cached(guild.id, uid)
+        if found:
+            self.hits += 1
+            return name
+        self.misses += 1
+        member = guild.get_member(uid)
+        if member is None:
+            return None
+        name = self._member_name(member)
+        self._store(guild.id, uid, name)
+        return name
+
+    async def resolve(self, guild: discord.Guild | None, user_ids) -> dict[int, str]:
+        """Display names for ``user_ids``; unknown members are fetched in chunk requests."""
+        if guild is None:
+            return {}
+        names: dict[int, str] = {}
+        missing: list[int] = []
+        for uid in dict.fromkeys(int(u) for u in user_ids):
+            found, name = self._cached(guild.id, uid)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+                member = guild.get_member(uid)
+                if member is None:
+                    missing.append(uid)
+                    continue
+                name = self._member_name(member)
+                self._store(guild.id, uid, name)
+            if name:
+                names[uid] = name
+        if missing:
+            names.update(await self._fetch(guild, missing))
+        return names
+
+    async def _fetch(self, guild: discord.Guild, user_ids: list[int]) -> dict[int, str]:
+        lock = self._fetch_locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            # Another caller may have fetched some of these while we waited.
+            names: dict[int, str] = {}
+            todo = []
+            for uid in user_ids:
+                found, name = self._cached(guild.id, uid)
+                if not found:
+                    todo.append(uid)
+                elif name:
+                    names[uid] = name
+            for i in range(0, len(todo), QUERY_CHUNK):
+                chunk = todo[i:i + QUERY_CHUNK]
+                try:
+                    members = await guild.query_members(user_ids=chunk, limit=len(chunk), cache=True)
+                except (asyncio.TimeoutError, discord.ClientException) as e:
+                    log.warning("Member chunk request for %d user(s) in %s failed: %s", len(chunk), guild.id, e)
+                    continue
+                self.fetched += len(members)
+                for member in members:
+                    name = self._member_name(member)
+                    self._store(guild.id, member.id, name)
+                    if name:
+                        names[member.id] = name
+                for uid in set(chunk) - {m.id for m in members}:
+                    self._store(guild.id, uid, None)
+            return names
+
+    def update(self, member: discord.Member):
+        """Refresh one member's name (``on_member_update``/``on_member_join``)."""
+        self._store(member.guild.id, member.id, self._member_name(member))
+
+    def invalidate(self, guild_id: int, uid: int | None = None):
+        if uid is None:
+            self._names.pop(guild_id, None)
+            self._fetch_locks.pop(guild_id, None)
+        else:
+            self._names.get(guild_id, {}).pop(uid, None)
+
+    def invalidate_user(self, uid: int):
+        """Drop ``uid`` in every guild (``on_user_update`` changes the global name)."""
+        for names in self._names.values():
+            names.pop(uid, None)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "guilds": len(self._names),
+            "entries": sum(len(n) for n in self._names.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetched": self.fetched,
+        }
+
+
+member_names = MemberNameCache()
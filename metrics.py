@@ -0,0 +1,312 @@
+import asyncio
+import bisect
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+from logging_config import setup_logging
+
+log = setup_logging("boost_bot.metrics")
+
+# Serve Prometheus text on this port (localhost only by default); 0 disables the endpoint.
+METRICS_PORT = int(os.getenv("BOOST_METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("BOOST_METRICS_HOST", "127.0.0.1")
+# How often the event-loop lag probe wakes up.
+LOOP_LAG_INTERVAL_SECS = float(os.getenv("BOOST_LOOP_LAG_INTERVAL_SECS", "0.5"))
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _key(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        self.inc_key(_key(labels), amount)
+
+    def inc_key(self, key: Labels, amount: float = 1):
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.values.items():
+            yield f"{self.name}{_fmt_labels(key)} {value}"
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str = "", fn: Callable[[], float] | None = None):
+        self.name = name
+        self.help = help
+        self.values: dict[Labels, float] = {}
+        self.fn = fn
+
+    def set(self, value: float, **labels):
+        self.values[_key(labels)] = value
+
+    def get(self, **labels) -> float:
+        if self.fn is not None and not labels:
+            return self.fn()
+        return self.values.get(_key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        if self.fn is not None:
+            yield f"{self.name} {self.fn()}"
+        for key, value in self.values.items():
+            yield f"{self.name}{_fmt_labels(key)} {value}"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram; ``observe`` is one bisect and three adds."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self.values: dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels):
+        self.observe_key(_key(labels), value)
+
+    def observe_key(self, key: Labels, value: float):
+        """``observe`` with labels already turned into a key (see :func:`timed`)."""
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self.values.get(_key(labels))
+        return series[2] if series else 0
+
+    def quantile(self, q: float, **labels) -> float | None:
+        """Approximate quantile, interpolated inside the bucket it falls in."""
+        series = self.values.get(_key(labels))
+        return self._quantile(series, q) if series else None
+
+    def _quantile(self, series: list, q: float) -> float | None:
+        counts, _, total = series
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lo + (hi - lo) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def summary(self) -> list[tuple[Labels, int, float, float | None, float | None]]:
+        """``(labels, count, mean, p50, p95)`` per series."""
+        return [
+            (key, s[2], s[1] / s[2] if s[2] else 0.0, self._quantile(s, 0.5), self._quantile(s, 0.95))
+            for key, s in self.values.items()
+        ]
+
+    def samples(self) -> Iterable[str]:
+        for key, (counts, total, n) in self.values.items():
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                yield f"{self.name}_bucket{_fmt_labels(key, le)} {cumulative}"
+            yield f"{self.name}_sum{_fmt_labels(key)} {total}"
+            yield f"{self.name}_count{_fmt_labels(key)} {n}"
+
+
+class MetricsRegistry:
+    """Process-wide metrics, rendered as Prometheus text.
+
+    Metrics are created on first use by name. Subsystems that already keep
+    their own counters (file locks, REST scheduler, member cache) register a
+    collector instead; collectors run only when the metrics are read.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self._collectors: list[Callable[[], Iterable[tuple[str, str, dict, float]]]] = []
+
+    def _get(self, cls, name: str, help: str, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help, **kwargs)
+        return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "", fn: Callable[[], float] | None = None) -> Gauge:
+        gauge = self._get(Gauge, name, help)
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(self, name: str, help: str = "", buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def collector(self, fn: Callable[[], Iterable[tuple[str, str, dict, float]]]):
+        """Register ``fn`` yielding ``(name, kind, labels, value)`` at read time."""
+        self._collectors.append(fn)
+        return fn
+
+    def __iter__(self):
+        return iter(self._metrics.values())
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        declared = set(self._metrics)
+        for collect in self._collectors:
+            try:
+                rows = list(collect())
+            except Exception as e:
+                log.warning("Metrics collector %r failed: %s", collect, e)
+                continue
+            for name, kind, labels, value in rows:
+                if name not in declared:
+                    lines.append(f"# TYPE {name} {kind}")
+                    declared.add(name)
+                lines.append(f"{name}{_fmt_labels(_key(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+handler_seconds = metrics.histogram("boost_handler_seconds", "Slash command and button handler latency")
+handler_errors = metrics.counter("boost_handler_errors_total", "Handlers that raised")
+store_seconds = metrics.histogram("boost_store_seconds", "Stats store operation latency")
+balance_seconds = metrics.histogram("boost_balance_seconds", "Team balancing latency")
+queue_edit_seconds = metrics.histogram("boost_queue_edit_seconds", "Queue message update latency")
+loop_lag_seconds = metrics.histogram(
+    "boost_event_loop_lag_seconds", "Extra delay of a sleep on the event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+loop_lag_gauge = metrics.gauge("boost_event_loop_lag_last_seconds", "Most recent event loop lag sample")
+
+
+@contextmanager
+def timer(histogram: Histogram, errors: Counter | None = None, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        if errors is not None:
+            errors.inc(**labels)
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+def timed(histogram: Histogram, errors: Counter | None = None, **labels):
+    """Decorator: observe the call's duration in ``histogram`` (sync or async).
+
+    Labels are resolved once here, so a call costs two clock reads and one
+    bucket increment.
+    """
+    key = _key(labels)
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except BaseException:
+                    if errors is not None:
+                        errors.inc_key(key)
+                    raise
+                finally:
+                    histogram.observe_key(key, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except BaseException:
+                if errors is not None:
+                    errors.inc_key(key)
+                raise
+            finally:
+                histogram.observe_key(key, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def timed_handler(kind: str, name: str):
+    """:func:`timed` for a slash command, prefix command or button callback."""
+    return timed(handler_seconds, handler_errors, kind=kind, name=name)
+
+
+async def monitor_loop_lag(interval: float = LOOP_LAG_INTERVAL_SECS):
+    """Sleep ``interval`` forever and record how late each wake-up is."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        loop_lag_seconds.observe(lag)
+        loop_lag_gauge.set(lag)
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/metrics", "/"):
+            status, body = "200 OK", metrics.render().encode("utf-8")
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> asyncio.AbstractServer | None:
+    """Serve ``GET /metrics`` in Prometheus text format; no-op when ``port`` is 0."""
+    if not port:
+        return None
+    server = await asyncio.start_server(_handle_http, host, port)
+    log.info("Serving metrics on http://%s:%d/metrics", host, port)
+    return server
@@ -0,0 +1,67 @@
+import bisect
+
+
+class RankIndex:
+    """Players kept sorted by points for O(log n) rank lookups.
+
+    Updates are a bisect plus a list insert/delete (a memmove), so re-ranking
+    the handful of players in a match never re-sorts the whole ladder.
+
+    Keys are ``(-points, uid)`` so the list runs from highest to lowest
+    points with ties broken by user ID; rank is the 1-based list position.
+    """
+
+    def __init__(self):
+        self._keys: list[tuple[int, str]] = []
+        self._points: dict[str, int] = {}
+
+    @classmethod
+    def from_stats(cls, stats: dict) -> "RankIndex":
+        index = cls()
+        for uid, entry in stats.items():
+            if isinstance(entry, dict):
+                index._points[uid] = int(entry.get("points", 1000))
+        index._keys = sorted((-pts, uid) for uid, pts in index._points.items())
+        return index
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, uid: str) -> bool:
+        return uid in self._points
+
+    def update(self, uid: str, points: int):
+        """Insert ``uid`` or move it to its new position for ``points``."""
+        old = self._points.get(uid)
+        if old == points:
+            return
+        if old is not None:
+            i = bisect.bisect_left(self._keys, (-old, uid))
+            del self._keys[i]
+        self._points[uid] = points
+        bisect.insort(self._keys, (-points, uid))
+
+    def remove(self, uid: str):
+        points = self._points.pop(uid, None)
+        if points is not None:
+            del self._keys[bisect.bisect_left(self._keys, (-points, uid))]
+
+    def rank(self, uid: str) -> int | None:
+        points = self._points.get(uid)
+        if points is None:
+            return None
+        return bisect.bisect_left(self._keys, (-points, uid)) + 1
+
+    def slice(self, start: int, stop: int) -> list[tuple[int, str]]:
+        """``(rank, uid)`` pairs for 1-based ranks ``start`` to ``stop`` inclusive."""
+        start = max(start, 1)
+        return [(start + i, uid) for i, (_, uid) in enumerate(self._keys[start - 1:stop])]
+
+    def top(self, limit: int | None = None) -> list[tuple[int, str]]:
+        return self.slice(1, len(self._keys) if limit is None else limit)
+
+    def around(self, uid: str, radius: int) -> list[tuple[int, str]]:
+        rank = self.rank(uid)
+        if rank is None:
+            return []
+        return self.slice(rank - radius, rank + radius)
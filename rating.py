@@ -0,0 +1,194 @@
+import math
+import os
+
+from logging_config import setup_logging
+
+log = setup_logging("boost_bot.rating")
+
+# `elo` (default), `glicko2`, or `fixed` for the old flat +/-25.
+RATING_ENGINE = os.getenv("BOOST_RATING_ENGINE", "elo").strip().lower()
+FIXED_DELTA = int(os.getenv("BOOST_FIXED_DELTA", "25"))
+ELO_K = float(os.getenv("BOOST_ELO_K", "32"))
+# Players with fewer games than this move twice as fast until their rating settles.
+ELO_PROVISIONAL_GAMES = int(os.getenv("BOOST_ELO_PROVISIONAL_GAMES", "10"))
+GLICKO_TAU = float(os.getenv("BOOST_GLICKO_TAU", "0.5"))
+
+DEFAULT_POINTS = 1000
+GLICKO_DEFAULT_RD = 350.0
+GLICKO_MIN_RD = 30.0
+GLICKO_DEFAULT_VOL = 0.06
+_GLICKO_SCALE = 173.7178
+
+
+def _points(entry: dict) -> float:
+    return float(entry.get("points", DEFAULT_POINTS))
+
+
+def _games(entry: dict) -> int:
+    return int(entry.get("wins", 0)) + int(entry.get("losses", 0)) + int(entry.get("draws", 0))
+
+
+class RatingEngine:
+    """Turns a match result into per-player rating changes.
+
+    ``rate`` gets the stats entries of both teams and team A's score (1 win,
+    0.5 draw, 0 loss) and returns one change per player, in order: a dict
+    with an integer ``delta`` for ``points`` plus any extra fields the engine
+    keeps on the entry (Glicko-2 stores ``rd`` and ``vol``).
+    """
+
+    name = "base"
+
+    def rate(self, team_a: list[dict], team_b: list[dict], score_a: float) -> tuple[list[dict], list[dict]]:
+        raise NotImplementedError
+
+
+class FixedEngine(RatingEngine):
+    """Flat ``delta`` to every winner and from every loser; draws change nothing."""
+
+    name = "fixed"
+
+    def __init__(self, delta: int = FIXED_DELTA):
+        self.delta = delta
+
+    def rate(self, team_a, team_b, score_a):
+        step = round(self.delta * (2 * score_a - 1))
+        return [{"delta": step} for _ in team_a], [{"delta": -step} for _ in team_b]
+
+
+class TeamEloEngine(RatingEngine):
+    """Elo on team averages: every player moves by ``K * (score - expected)``.
+
+    The expected score comes from the two teams' mean points, so beating a
+    stronger team pays more than beating a weaker one. Provisional players
+    (fewer than ``ELO_PROVISIONAL_GAMES``) use ``2 * K``.
+    """
+
+    name = "elo"
+
+    def __init__(self, k: float = ELO_K, provisional_games: int = ELO_PROVISIONAL_GAMES):
+        self.k = k
+        self.provisional_games = provisional_games
+
+    def expected(self, team_a: list[dict], team_b: list[dict]) -> float:
+        mean_a = sum(map(_points, team_a)) / max(1, len(team_a))
+        mean_b = sum(map(_points, team_b)) / max(1, len(team_b))
+        return 1.0 / (1.0 + 10 ** ((mean_b - mean_a) / 400.0))
+
+    def _k(self, entry: dict) -> float:
+        return self.k * 2 if _games(entry) < self.provisional_games else self.k
+
+    def rate(self, team_a, team_b, score_a):
+        surprise = score_a - self.expected(team_a, team_b)
+        return (
+            [{"delta": round(self._k(e) * surprise)} for e in team_a],
+            [{"delta": round(-self._k(e) * surprise)} for e in team_b],
+        )
+
+
+class Glicko2Engine(RatingEngine):
+    """Glicko-2 with each match as one rating period against a composite opponent.
+
+    The opponent has the other team's mean rating and the root-mean-square of
+    its rating deviations. Uncertain players (high ``rd``) move further and
+    their ``rd`` shrinks as they play; ``vol`` tracks how erratic results are.
+    """
+
+    name = "glicko2"
+
+    def __init__(self, tau: float = GLICKO_TAU):
+        self.tau = tau
+
+    @staticmethod
+    def _g(phi: float) -> float:
+        return 1.0 / math.sqrt(1.0 + 3.0 * phi * phi / (math.pi * math.pi))
+
+    @staticmethod
+    def _composite(team: list[dict]) -> tuple[float, float]:
+        n = max(1, len(team))
+        mu = sum((_points(e) - 1500.0) / _GLICKO_SCALE for e in team) / n
+        phi = math.sqrt(sum((float(e.get("rd") or GLICKO_DEFAULT_RD) / _GLICKO_SCALE) ** 2 for e in team) / n)
+        return mu, phi
+
+    def _volatility(self, phi: float, sigma: float, v: float, delta: float) -> float:
+        """New volatility by the Illinois iteration from the Glicko-2 paper."""
+        a = math.log(sigma * sigma)
+        tau2 = self.tau * self.tau
+
+        def f(x):
+            ex = math.exp(x)
+            d = phi * phi + v + ex
+            return ex * (delta * delta - d) / (2 * d * d) - (x - a) / tau2
+
+        lo = a
+        if delta * delta > phi * phi + v:
+            hi = math.log(delta * delta - phi * phi - v)
+        else:
+            k = 1
+            while f(a - k * self.tau) < 0:
+                k += 1
+            hi = a - k * self.tau
+        f_lo, f_hi = f(lo), f(hi)
+        for _ in range(100):
+            if abs(hi - lo) <= 1e-6:
+                break
+            mid = lo + (lo - hi) * f_lo / (f_hi - f_lo)
+            f_mid = f(mid)
+            if f_mid * f_hi <= 0:
+                lo, f_lo = hi, f_hi
+            else:
+                f_lo /= 2
+            hi, f_hi = mid, f_mid
+        return math.exp(lo / 2)
+
+    def _update(self, entry: dict, opp_mu: float, opp_phi: float, score: float) -> dict:
+        rating = _points(entry)
+        mu = (rating - 1500.0) / _GLICKO_SCALE
+        phi = float(entry.get("rd") or GLICKO_DEFAULT_RD) / _GLICKO_SCALE
+        sigma = float(entry.get("vol") or GLICKO_DEFAULT_VOL)
+        g = self._g(opp_phi)
+        expected = 1.0 / (1.0 + math.exp(-g * (mu - opp_mu)))
+        v = 1.0 / (g * g * expected * (1 - expected))
+        delta = v * g * (score - expected)
+        sigma = self._volatility(phi, sigma, v, delta)
+        phi_star = math.sqrt(phi * phi + sigma * sigma)
+        phi = 1.0 / math.sqrt(1.0 / (phi_star * phi_star) + 1.0 / v)
+        mu += phi * phi * g * (score - expected)
+        new_rating = mu * _GLICKO_SCALE + 1500.0
+        return {
+            "delta": round(new_rating) - round(rating),
+            "rd": round(max(GLICKO_MIN_RD, phi * _GLICKO_SCALE), 3),
+            "vol": round(sigma, 6),
+        }
+
+    def rate(self, team_a, team_b, score_a):
+        mu_a, phi_a = self._composite(team_a)
+        mu_b, phi_b = self._composite(team_b)
+        return (
+            [self._update(e, mu_b, phi_b, score_a) for e in team_a],
+            [self._update(e, mu_a, phi_a, 1.0 - score_a) for e in team_b],
+        )
+
+
+ENGINES = {cls.name: cls for cls in (FixedEngine, TeamEloEngine, Glicko2Engine)}
+
+
+def get_engine(name: str | None = None) -> RatingEngine:
+    name = (name or RATING_ENGINE).strip().lower()
+    cls = ENGINES.get(name)
+    if cls is None:
+        log.error("Unknown BOOST_RATING_ENGINE %r; using elo", name)
+        cls = TeamEloEngine
+    return cls()
+
+
+rating_engine = get_engine()
+
+
+def rate_teams(
+    team_a: dict[str, dict], team_b: dict[str, dict], score_a: float, engine: RatingEngine | None = None
+) -> dict[str, dict]:
+    """``uid -> change`` for a match between two ``uid -> stats entry`` teams."""
+    engine = engine or rating_engine
+    changes_a, changes_b = engine.rate(list(team_a.values()), list(team_b.values()), score_a)
+    return {**dict(zip(team_a, changes_a)), **dict(zip(team_b, changes_b))}
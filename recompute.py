@@ -0,0 +1,256 @@
+"""Offline rating recomputation from the match history.
+
+Replays ``<players file>.history`` and its rotated files (plus anything still
+in the journals) through a rating engine, writes the result as a new
+snapshot and prints how it differs from the current one. The bot only
+records history with ``BOOST_STATS_HISTORY=1``. Run while tuning rating parameters or to
+backfill a season::
+
+    python -m boost_bot.recompute --engine glicko2 --out /tmp/players.glicko.json
+    BOOST_ELO_K=24 python -m boost_bot.recompute --base season-start.json --apply
+
+Players rated before the history was kept are rebuilt from 1000 unless a
+``--base`` snapshot from when recording started holds their earlier
+results, so ``--apply`` requires one.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+
+from logging_config import setup_logging
+from paths import BOOST_PLAYERS_FILE
+
+from .rating import ENGINES, get_engine
+from .stats_store import _StatsCache, _apply_event, _ensure_entry
+
+log = setup_logging("boost_bot.recompute")
+
+
+def _read_ndjson(path: str, journal: str | None = None) -> list[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line for line in f.read().splitlines() if line.strip()]
+    except FileNotFoundError:
+        return []
+    try:
+        # One parse of the whole file is much faster than one per line.
+        events = json.loads("[" + ",".join(lines) + "]")
+    except ValueError:
+        events = []
+        for line in lines:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                log.warning("Skipping unreadable line in %s", path)
+    if journal is not None:
+        for event in events:
+            event.setdefault("journal", journal)
+    return events
+
+
+def read_history(players_file: str = BOOST_PLAYERS_FILE, include_journals: bool = True) -> list[dict]:
+    """Every recorded event in time order, each once.
+
+    Events are identified by ``(journal, seq)``, so lines repeated by a crash
+    during compaction or still present in a journal are counted once.
+    """
+    history = players_file + ".history"
+    sources = [_read_ndjson(path) for path in sorted(glob.glob(glob.escape(history) + ".*"))]
+    sources.append(_read_ndjson(history))
+    if include_journals:
+        prefix = players_file + ".journal"
+        for path in sorted(glob.glob(glob.escape(prefix) + "*")):
+            if path.endswith((".state", ".tmp")):
+                continue
+            sources.append(_read_ndjson(path, path[len(prefix):].lstrip(".")))
+    seen: set[tuple[str, int]] = set()
+    events = []
+    for source in sources:
+        for event in source:
+            key = (event.get("journal", ""), int(event.get("seq", 0)))
+            if key in seen:
+                continue
+            seen.add(key)
+            events.append(event)
+    events.sort(key=lambda e: (float(e.get("ts", 0)), e.get("journal", ""), int(e.get("seq", 0))))
+    return events
+
+
+def replay(events: list[dict], engine_name: str | None = None, base: dict | None = None) -> dict:
+    """Stats produced by running ``events`` through ``engine_name`` from ``base`` (or from scratch).
+
+    Results are rated exactly as ``PlayerStatsStore`` would have rated them
+    live, without building a journal event per match.
+    """
+    rate = get_engine(engine_name).rate
+    stats: dict = json.loads(json.dumps(base)) if base else {}
+
+    def entries(uids, names):
+        team = []
+        for uid in uids:
+            entry = stats.get(uid)
+            if not isinstance(entry, dict) or len(entry) < 5:
+                _ensure_entry(stats, uid, names.get(uid))
+                entry = stats[uid]
+            team.append(entry)
+        return team
+
+    for event in events:
+        kind = event.get("type")
+        if kind == "match":
+            side_a, side_b, score_a = event["winners"], event["losers"], 1.0
+            counter_a, counter_b = "wins", "losses"
+        elif kind == "draw":
+            side_a, side_b, score_a = event["team_a"], event["team_b"], 0.5
+            counter_a = counter_b = "draws"
+        else:
+            _apply_event(stats, event)
+            continue
+        names = event.get("names") or {}
+        team_a, team_b = entries(side_a, names), entries(side_b, names)
+        changes_a, changes_b = rate(team_a, team_b, score_a)
+        for team, changes, counter in ((team_a, changes_a, counter_a), (team_b, changes_b, counter_b)):
+            for entry, change in zip(team, changes):
+                entry["points"] = int(entry.get("points", 1000)) + change["delta"]
+                entry[counter] = int(entry.get(counter, 0)) + 1
+                if len(change) > 1:
+                    entry.update((k, v) for k, v in change.items() if k != "delta")
+    return stats
+
+
+def predates_history(events: list[dict], current: dict, base: dict | None = None) -> list[str]:
+    """Players in the history whose ``current`` record has games the history and ``base`` don't explain.
+
+    Those games were played before the history was kept, so a replay drops them.
+    """
+    games: dict[str, int] = {}
+    for event in events:
+        kind = event.get("type")
+        if kind == "match":
+            players = event["winners"] + event["losers"]
+        elif kind == "draw":
+            players = event["team_a"] + event["team_b"]
+        else:
+            continue
+        for uid in players:
+            games[uid] = games.get(uid, 0) + 1
+
+    def played(stats, uid):
+        entry = (stats or {}).get(uid)
+        if not isinstance(entry, dict):
+            return 0
+        return sum(int(entry.get(k, 0)) for k in ("wins", "losses", "draws"))
+
+    return sorted(uid for uid, n in games.items() if played(current, uid) > n + played(base, uid))
+
+
+def diff_stats(old: dict, new: dict, limit: int = 20) -> list[str]:
+    """Human-readable summary of how ``new`` differs from ``old``."""
+    def points(stats, uid):
+        entry = stats.get(uid)
+        if isinstance(entry, int):
+            return entry
+        return int(entry.get("points", 1000)) if isinstance(entry, dict) else None
+
+    def ranking(stats):
+        order = sorted(stats, key=lambda uid: (-(points(stats, uid) or 0), uid))
+        return {uid: i for i, uid in enumerate(order, start=1)}
+
+    old_rank, new_rank = ranking(old), ranking(new)
+    changed = []
+    for uid in new:
+        before, after = points(old, uid), points(new, uid)
+        if before != after:
+            changed.append((abs((after or 0) - (before or 0)), uid, before, after))
+    changed.sort(reverse=True)
+
+    lines = [
+        f"players: {len(old)} -> {len(new)}",
+        f"points changed: {len(changed)}",
+        f"only in current snapshot: {len(set(old) - set(new))}",
+    ]
+    if changed:
+        lines.append(f"{'player':<20} {'points':>13} {'rank':>11}")
+        for _, uid, before, after in changed[:limit]:
+            entry = new.get(uid) if isinstance(new.get(uid), dict) else {}
+            name = (entry.get("name") or uid)[:20]
+            lines.append(
+                f"{name:<20} {str(before):>5} -> {after:<5} {old_rank.get(uid, '-')!s:>4} -> {new_rank[uid]!s:<4}"
+            )
+    return lines
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Recompute player ratings from the recorded match history.")
+    parser.add_argument("--engine", choices=sorted(ENGINES), help="rating engine (default: BOOST_RATING_ENGINE)")
+    parser.add_argument("--players", default=BOOST_PLAYERS_FILE, help="live players file (default: %(default)s)")
+    parser.add_argument("--base", help="snapshot to start from instead of everyone at 1000, e.g. a season start")
+    parser.add_argument("--out", help="where to write the result (default: <players>.recomputed.json)")
+    parser.add_argument("--apply", action="store_true", help="replace the live snapshot; stop the bot first")
+    parser.add_argument("--no-journals", action="store_true", help="ignore events not yet compacted")
+    parser.add_argument("--top", type=int, default=20, help="largest changes to list")
+    args = parser.parse_args(argv)
+    if args.apply and not args.base:
+        parser.error("--apply needs --base: without it, players' results from before the history are lost")
+
+    started = time.perf_counter()
+    events = read_history(args.players, include_journals=not args.no_journals)
+    read_secs = time.perf_counter() - started
+    if not events:
+        print(f"No history found next to {args.players} (is BOOST_STATS_HISTORY=1 set?)", file=sys.stderr)
+        return 1
+
+    base = None
+    if args.base:
+        with open(args.base, "r", encoding="utf-8") as f:
+            base = json.load(f)
+    try:
+        with open(args.players, "r", encoding="utf-8") as f:
+            current = json.load(f)
+    except FileNotFoundError:
+        current = {}
+
+    early = predates_history(events, current, base)
+    if early:
+        print(
+            f"warning: {len(early)} player(s) had games before the first recorded event; "
+            "the replay restarts them from 1000 without those results. Pass --base with a "
+            "snapshot from when the history began to keep them.",
+            file=sys.stderr,
+        )
+
+    started = time.perf_counter()
+    stats = replay(events, args.engine, base)
+    replay_secs = time.perf_counter() - started
+    # Players the history never mentions (e.g. from before it was kept) stay as they are.
+    for uid, entry in current.items():
+        if uid not in stats:
+            stats[uid] = entry
+        elif isinstance(entry, dict) and entry.get("name") and isinstance(stats[uid], dict):
+            stats[uid]["name"] = entry["name"]
+
+    results = sum(1 for e in events if e.get("type") in ("match", "draw"))
+    print(f"Replayed {results} result(s) from {len(events)} event(s) in {replay_secs:.2f}s (read {read_secs:.2f}s)")
+    print("\n".join(diff_stats(current, stats, args.top)))
+
+    if args.apply:
+        async def _apply():
+            await _StatsCache.for_path(args.players).replace(stats)
+        asyncio.run(_apply())
+        print(f"Replaced {args.players}")
+    else:
+        out = args.out or os.path.splitext(args.players)[0] + ".recomputed.json"
+        tmp_path = out + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+        os.replace(tmp_path, out)
+        print(f"Wrote {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
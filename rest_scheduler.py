@@ -0,0 +1,284 @@
+import asyncio
+import enum
+import itertools
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable
+
+import aiohttp
+import discord
+
+from logging_config import setup_logging
+
+log = setup_logging("boost_bot.rest_scheduler")
+
+REST_WORKERS = int(os.getenv("BOOST_REST_WORKERS", "4"))
+# Extra workers that only run ACK jobs, so throttled edits or syncs can never starve acknowledgements.
+ACK_WORKERS = max(1, int(os.getenv("BOOST_REST_ACK_WORKERS", "1")))
+
+
+class Priority(enum.IntEnum):
+    ACK = 0         # interaction responses, deferrals and follow-ups
+    STATE = 1       # user-visible message edits
+    BACKGROUND = 2  # command sync and other housekeeping
+
+
+_SNOWFLAKE = re.compile(r"^\d{15,21}$")
+_MAJOR_PARAMS = ("channels", "guilds", "webhooks")
+
+
+def route_key(method: str, path: str) -> str:
+    """Normalise a REST path the way Discord buckets it.
+
+    The ID after ``channels``/``guilds``/``webhooks`` (the major parameter)
+    is kept; every other snowflake and interaction token is replaced, so
+    ``PATCH /channels/1/messages/2`` and ``.../messages/3`` share a bucket.
+    Application command routes are limited per application, so the guild ID
+    under ``/applications`` is replaced too and every guild's sync shares one.
+    """
+    parts = [p for p in path.split("?")[0].split("/") if p]
+    if "api" in parts:
+        parts = parts[parts.index("api") + 2:]  # drop "api/v10"
+    major = () if parts[:1] == ["applications"] else _MAJOR_PARAMS
+    out = []
+    for i, part in enumerate(parts):
+        if _SNOWFLAKE.match(part) and not (i and parts[i - 1] in major):
+            out.append(":id")
+        elif i >= 2 and parts[i - 2] in ("webhooks", "interactions"):
+            out.append(":token")
+        else:
+            out.append(part)
+    return f"{method.upper()} /" + "/".join(out)
+
+
+def message_route(message: discord.Message | discord.PartialMessage) -> str:
+    return route_key("PATCH", f"/channels/{message.channel.id}/messages/{message.id}")
+
+
+class _Bucket:
+    """Token bucket fed by Discord's ``X-RateLimit-*`` response headers."""
+
+    __slots__ = ("limit", "remaining", "reset_at", "window")
+
+    def __init__(self):
+        self.limit: int | None = None  # unknown until the first response
+        self.remaining = 1
+        self.reset_at = 0.0
+        self.window = 1.0
+
+    def delay(self, now: float) -> float:
+        if self.limit is None or now >= self.reset_at:
+            return 0.0
+        return 0.0 if self.remaining > 0 else self.reset_at - now
+
+    def take(self, now: float):
+        if self.limit is None:
+            return
+        if now >= self.reset_at:
+            # Assume the next window looks like the last one until headers say otherwise.
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        self.remaining -= 1
+
+    def update(self, headers, now: float):
+        try:
+            self.limit = int(headers["X-RateLimit-Limit"])
+            self.remaining = int(headers["X-RateLimit-Remaining"])
+            self.window = float(headers["X-RateLimit-Reset-After"])
+            self.reset_at = now + self.window
+        except (KeyError, ValueError):
+            pass
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "route", "factory", "future", "enqueued", "generation", "claimed")
+
+    def __init__(self, priority: Priority, seq: int, route: str, factory, future):
+        self.priority = priority
+        self.seq = seq
+        self.route = route
+        self.factory = factory
+        self.future = future
+        self.enqueued = time.monotonic()
+        # ACK jobs sit in two queues; the first worker to pop the current entry claims the job.
+        self.generation = 0
+        self.claimed = False
+
+
+def _worker_cancelled() -> bool:
+    """True if the running worker task itself is being cancelled (not just a job raising CancelledError)."""
+    cancelling = getattr(asyncio.current_task(), "cancelling", None)  # Python 3.11+
+    return cancelling() > 0 if cancelling is not None else True
+
+
+class RestScheduler:
+    """Central queue for outbound Discord REST calls.
+
+    Jobs run highest priority first on a few workers. Each route has a token
+    bucket kept up to date from rate-limit headers (see :meth:`trace_config`);
+    a job whose bucket is empty is parked until the reset instead of holding
+    a worker, so an ephemeral reply never queues behind throttled edits.
+
+    A 429 that discord.py retries still sleeps inside the job, so on top of
+    the shared pool ``ack_workers`` workers only take ACK jobs: even with
+    every shared worker stuck, acknowledgements keep moving.
+    """
+
+    def __init__(self, workers: int = REST_WORKERS, ack_workers: int = ACK_WORKERS):
+        self.workers = workers
+        self.ack_workers = ack_workers
+        self._queue: asyncio.PriorityQueue | None = None
+        self._ack_queue: asyncio.PriorityQueue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._ack_tasks: list[asyncio.Task] = []
+        self._counter = itertools.count()
+        self._buckets: dict[str, _Bucket] = {}
+        self.stats = {
+            p.name: {"submitted": 0, "completed": 0, "failed": 0, "depth": 0, "wait_total": 0.0, "wait_max": 0.0}
+            for p in Priority
+        }
+        self.throttled = 0
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+            self._ack_queue = asyncio.PriorityQueue()
+        self._tasks = self._fill(self._tasks, self.workers, self._queue)
+        self._ack_tasks = self._fill(self._ack_tasks, self.ack_workers, self._ack_queue)
+
+    def _fill(self, tasks: list[asyncio.Task], count: int, queue: asyncio.PriorityQueue) -> list[asyncio.Task]:
+        """``tasks`` minus dead workers, topped back up to ``count`` workers on ``queue``."""
+        tasks = [t for t in tasks if not t.done()]
+        while len(tasks) < count:
+            tasks.append(asyncio.create_task(self._worker(queue)))
+        return tasks
+
+    async def submit(self, priority: Priority, route: str, factory: Callable[[], Awaitable[Any]]):
+        """Run ``await factory()`` when its turn comes and return its result."""
+        self._ensure_started()
+        job = _Job(priority, next(self._counter), route, factory, asyncio.get_running_loop().create_future())
+        self.stats[priority.name]["submitted"] += 1
+        self._put(job)
+        return await job.future
+
+    def _put(self, job: _Job):
+        self.stats[job.priority.name]["depth"] += 1
+        job.generation += 1
+        job.claimed = False
+        # Parked jobs keep their original sequence number, so order within a priority holds.
+        entry = (job.priority, job.seq, job.generation, job)
+        self._queue.put_nowait(entry)
+        if job.priority == Priority.ACK:
+            self._ack_queue.put_nowait(entry)
+
+    async def _park(self, job: _Job, delay: float):
+        await asyncio.sleep(delay)
+        self._put(job)
+
+    async def _worker(self, queue: asyncio.PriorityQueue):
+        while True:
+            _, _, generation, job = await queue.get()
+            if job.claimed or generation != job.generation:
+                continue  # the other queue's worker took it, or it was parked and re-queued
+            job.claimed = True
+            s = self.stats[job.priority.name]
+            s["depth"] -= 1
+            if job.future.done():  # caller went away
+                continue
+            now = time.monotonic()
+            bucket = self._buckets.setdefault(job.route, _Bucket())
+            delay = bucket.delay(now)
+            if delay > 0:
+                self.throttled += 1
+                asyncio.create_task(self._park(job, delay))
+                continue
+            bucket.take(now)
+            waited = now - job.enqueued
+            s["wait_total"] += waited
+            s["wait_max"] = max(s["wait_max"], waited)
+            try:
+                result = await job.factory()
+            except BaseException as e:
+                s["failed"] += 1
+                if not job.future.done():
+                    if isinstance(e, asyncio.CancelledError):
+                        job.future.cancel()
+                    else:
+                        job.future.set_exception(e)
+                if isinstance(e, asyncio.CancelledError) and _worker_cancelled():
+                    raise
+                if not isinstance(e, (Exception, asyncio.CancelledError)):
+                    raise  # KeyboardInterrupt, SystemExit
+            else:
+                s["completed"] += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """aiohttp hook that feeds every response's rate-limit headers into the buckets.
+
+        Pass to the client as ``http_trace=``.
+        """
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_end(session, ctx, params: aiohttp.TraceRequestEndParams):
+            headers = params.response.headers
+            if "X-RateLimit-Limit" not in headers:
+                return
+            key = route_key(params.method, params.url.path)
+            self._buckets.setdefault(key, _Bucket()).update(headers, time.monotonic())
+
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+    def snapshot(self) -> dict:
+        return {
+            "priorities": {name: dict(s) for name, s in self.stats.items()},
+            "routes": len(self._buckets),
+            "throttled": self.throttled,
+        }
+
+
+outbound = RestScheduler()
+
+
+async def respond(interaction: discord.Interaction, *args, **kwargs):
+    """``interaction.response.send_message`` at acknowledgement priority."""
+    return await outbound.submit(
+        Priority.ACK, "POST /interactions/:id/:token/callback",
+        lambda: interaction.response.send_message(*args, **kwargs),
+    )
+
+
+async def defer(interaction: discord.Interaction, **kwargs):
+    return await outbound.submit(
+        Priority.ACK, "POST /interactions/:id/:token/callback",
+        lambda: interaction.response.defer(**kwargs),
+    )
+
+
+async def update(interaction: discord.Interaction, **kwargs):
+    """``interaction.response.edit_message``: acknowledge a component click by editing its message."""
+    return await outbound.submit(
+        Priority.ACK, "POST /interactions/:id/:token/callback",
+        lambda: interaction.response.edit_message(**kwargs),
+    )
+
+
+async def followup(interaction: discord.Interaction, *args, **kwargs):
+    return await outbound.submit(
+        Priority.ACK, route_key("POST", f"/webhooks/{interaction.application_id}/{interaction.token}"),
+        lambda: interaction.followup.send(*args, **kwargs),
+    )
+
+
+async def edit_message(message: discord.Message | discord.PartialMessage, **kwargs):
+    return await outbound.submit(Priority.STATE, message_route(message), lambda: message.edit(**kwargs))
+
+
+async def send(channel: discord.abc.Messageable, *args, **kwargs):
+    """``channel.send`` for messages not tied to an interaction (e.g. a matchmade lobby)."""
+    return await outbound.submit(
+        Priority.STATE, route_key("POST", f"/channels/{channel.id}/messages"), lambda: channel.send(*args, **kwargs)
+    )
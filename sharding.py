@@ -0,0 +1,215 @@
+import collections
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from logging_config import setup_logging
+
+log = setup_logging("boost_bot.sharding")
+
+
+def parse_shard_ids(spec: str | None) -> list[int] | None:
+    """Parse ``"0-3,6"`` into ``[0, 1, 2, 3, 6]``; empty means every shard."""
+    if not spec or not spec.strip():
+        return None
+    ids: set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            ids.update(range(int(lo), int(hi) + 1))
+        else:
+            ids.add(int(part))
+    return sorted(ids)
+
+
+def format_shard_ids(ids: list[int]) -> str:
+    """Inverse of :func:`parse_shard_ids`, collapsing runs into ranges."""
+    parts = []
+    start = prev = None
+    for sid in sorted(ids):
+        if prev is not None and sid == prev + 1:
+            prev = sid
+            continue
+        if start is not None:
+            parts.append(str(start) if start == prev else f"{start}-{prev}")
+        start = prev = sid
+    if start is not None:
+        parts.append(str(start) if start == prev else f"{start}-{prev}")
+    return ",".join(parts)
+
+
+# Total shards across all processes; unset lets discord.py pick the recommended count.
+SHARD_COUNT = int(os.getenv("BOOST_SHARD_COUNT", "0")) or None
+# Shards this process runs, e.g. `0-3`; unset means all of them.
+SHARD_IDS = parse_shard_ids(os.getenv("BOOST_SHARD_IDS"))
+# >1 makes run_bot start that many child processes, each with a slice of the shards.
+SHARD_PROCESSES = max(1, int(os.getenv("BOOST_SHARD_PROCESSES", "1")))
+# Delay before a crashed shard process is started again.
+SHARD_RESTART_SECS = float(os.getenv("BOOST_SHARD_RESTART_SECS", "5.0"))
+# Window for the per-shard event rate shown by !shards.
+SHARD_RATE_WINDOW_SECS = 60
+
+if SHARD_IDS is not None and SHARD_COUNT is None:
+    raise RuntimeError("BOOST_SHARD_IDS requires BOOST_SHARD_COUNT")
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """The shard Discord routes ``guild_id`` to."""
+    return (guild_id >> 22) % shard_count
+
+
+def owns_guild(guild_id: int) -> bool:
+    """True if this process runs the shard for ``guild_id``."""
+    if SHARD_IDS is None:
+        return True
+    return shard_for_guild(guild_id, SHARD_COUNT) in SHARD_IDS
+
+
+def owns_shard(shard_id: int) -> bool:
+    return SHARD_IDS is None or shard_id in SHARD_IDS
+
+
+def process_tag() -> str:
+    """Name for files only this process writes; empty when unsharded."""
+    if SHARD_IDS is None:
+        return ""
+    return "shards" + format_shard_ids(SHARD_IDS).replace(",", "_")
+
+
+def shard_scoped_path(path: str) -> str:
+    """``lobbies.json`` -> ``lobbies.shards0-3.json`` in a shard process."""
+    tag = process_tag()
+    if not tag:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{tag}{ext}"
+
+
+class ShardMonitor:
+    """Per-shard event counts, event rate and gateway reconnects."""
+
+    def __init__(self, window: float = SHARD_RATE_WINDOW_SECS):
+        self.window = window
+        self.events: collections.Counter[int] = collections.Counter()
+        self.reconnects: collections.Counter[int] = collections.Counter()
+        # shard_id -> deque of [second, count] buckets inside the window
+        self._recent: dict[int, collections.deque] = collections.defaultdict(collections.deque)
+
+    def record(self, shard_id: int):
+        self.events[shard_id] += 1
+        now = int(time.monotonic())
+        buckets = self._recent[shard_id]
+        if buckets and buckets[-1][0] == now:
+            buckets[-1][1] += 1
+        else:
+            buckets.append([now, 1])
+        self._trim(buckets, now)
+
+    def disconnected(self, shard_id: int):
+        self.reconnects[shard_id] += 1
+
+    def _trim(self, buckets: collections.deque, now: int):
+        while buckets and buckets[0][0] <= now - self.window:
+            buckets.popleft()
+
+    def rate(self, shard_id: int) -> float:
+        """Events per minute over the last ``window`` seconds."""
+        buckets = self._recent.get(shard_id)
+        if not buckets:
+            return 0.0
+        self._trim(buckets, int(time.monotonic()))
+        return sum(n for _, n in buckets) * 60.0 / self.window
+
+    def snapshot(self, latencies: list[tuple[int, float]]) -> list[dict]:
+        return [
+            {
+                "shard_id": shard_id,
+                "latency_ms": latency * 1000 if latency == latency else None,
+                "events": self.events[shard_id],
+                "events_per_min": self.rate(shard_id),
+                "reconnects": self.reconnects[shard_id],
+            }
+            for shard_id, latency in sorted(latencies)
+        ]
+
+
+shard_monitor = ShardMonitor()
+
+
+def split_shards(shard_count: int, processes: int) -> list[list[int]]:
+    """Split ``range(shard_count)`` into ``processes`` contiguous, near-equal slices."""
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    slices, start = [], 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        slices.append(list(range(start, end)))
+        start = end
+    return slices
+
+
+def launch_shard_processes(shard_count: int | None = None, processes: int = SHARD_PROCESSES):
+    """Run the bot as ``processes`` child processes, each owning a slice of the shards.
+
+    Children get ``BOOST_SHARD_COUNT``/``BOOST_SHARD_IDS`` in their environment
+    and are restarted after ``SHARD_RESTART_SECS`` if they crash. SIGINT and
+    SIGTERM are forwarded so every child flushes its state on shutdown.
+    """
+    shard_count = shard_count or SHARD_COUNT or processes
+    package = __package__ or "boost_bot"
+    code = f"from {package} import run_bot; run_bot()"
+    base_env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+
+    slices = split_shards(shard_count, processes)
+    children: dict[int, subprocess.Popen] = {}
+    stopping = False
+
+    def spawn(i: int) -> subprocess.Popen:
+        env = dict(
+            base_env,
+            BOOST_SHARD_COUNT=str(shard_count),
+            BOOST_SHARD_IDS=format_shard_ids(slices[i]),
+            BOOST_SHARD_PROCESSES="1",
+        )
+        proc = subprocess.Popen([sys.executable, "-c", code], env=env)
+        log.info("Started shard process %d (pid %d) for shards %s", i, proc.pid, env["BOOST_SHARD_IDS"])
+        return proc
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for proc in children.values():
+            if proc.poll() is None:
+                proc.send_signal(signum)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for i in range(len(slices)):
+        children[i] = spawn(i)
+    restart_at: dict[int, float] = {}
+    while True:
+        alive = 0
+        for i, proc in children.items():
+            status = proc.poll()
+            if status is None:
+                alive += 1
+            elif stopping or status == 0:
+                continue
+            elif i not in restart_at:
+                log.error("Shard process %d exited with %d; restarting in %.0fs", i, status, SHARD_RESTART_SECS)
+                restart_at[i] = time.monotonic() + SHARD_RESTART_SECS
+                alive += 1
+            else:
+                if time.monotonic() >= restart_at[i]:
+                    del restart_at[i]
+                    children[i] = spawn(i)
+                alive += 1
+        if not alive:
+            break
+        time.sleep(0.5)
@@ -0,0 +1,359 @@
+import asyncio
+import contextlib
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import discord
+
+from logging_config import setup_logging
+from paths import BOOST_PLAYERS_FILE, BOOST_DIR
+
+from .metrics import store_seconds, timed
+from .stats_store import StatsTransaction
+
+log = setup_logging("boost_bot.stats_sqlite")
+
+BOOST_STATS_DB = os.getenv("BOOST_STATS_DB", os.path.join(BOOST_DIR, "players.sqlite3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    user_id TEXT PRIMARY KEY,
+    name    TEXT    NOT NULL DEFAULT '',
+    points  INTEGER NOT NULL DEFAULT 1000,
+    wins    INTEGER NOT NULL DEFAULT 0,
+    losses  INTEGER NOT NULL DEFAULT 0,
+    draws   INTEGER NOT NULL DEFAULT 0
+);
+DROP INDEX IF EXISTS idx_players_points;
+CREATE INDEX IF NOT EXISTS idx_players_rank ON players (points DESC, user_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_COLUMNS = ("points", "wins", "losses", "draws", "name")
+# Added after the first release; created on open if missing. NULL = engine default.
+_RATING_COLUMNS = (("rd", "REAL"), ("vol", "REAL"))
+# Bound parameters per ``IN (...)`` lookup; old SQLite builds cap a statement at 999.
+_IN_CHUNK = 500
+
+
+class _Database:
+    """One SQLite connection per file, used from a dedicated worker thread.
+
+    Every query runs on the single-thread executor so the event loop never
+    blocks on disk and a connection is never used from two threads at once.
+    The thread is shared by every database, so per-guild ladders do not
+    cost a thread each.
+    """
+
+    _instances: dict[str, "_Database"] = {}
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="boost-sqlite")
+
+    def __init__(self, db_path: str, import_json: bool = True):
+        self.db_path = db_path
+        self.import_json = import_json
+        self._conn: sqlite3.Connection | None = None
+        # Bumped after our own writes and when `PRAGMA data_version` shows someone else's.
+        self.version = 0
+        self._data_version: int | None = None
+
+    @classmethod
+    def for_path(cls, db_path: str, import_json: bool = True) -> "_Database":
+        db = cls._instances.get(db_path)
+        if db is None:
+            db = cls._instances[db_path] = cls(db_path, import_json)
+        return db
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            existing = {r["name"] for r in conn.execute("PRAGMA table_info(players)")}
+            for column, kind in _RATING_COLUMNS:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE players ADD COLUMN {column} {kind}")
+            self._conn = conn
+            if self.import_json:
+                self._import_json(conn)
+        return self._conn
+
+    def _import_json(self, conn: sqlite3.Connection):
+        """Copy ``BOOST_PLAYERS_FILE`` into the database once."""
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'imported_json'").fetchone():
+            return
+        stats = {}
+        try:
+            with open(BOOST_PLAYERS_FILE, "r", encoding="utf-8") as f:
+                data = f.read()
+                stats = json.loads(data) if data else {}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning("Could not import %s: %s", BOOST_PLAYERS_FILE, e)
+            return
+        rows = [_row_from_entry(k, v) for k, v in stats.items()]
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR IGNORE INTO players (user_id, points, wins, losses, draws, name) VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.execute("INSERT INTO meta (key, value) VALUES ('imported_json', ?)", (BOOST_PLAYERS_FILE,))
+        conn.execute("COMMIT")
+        log.info("Imported %d player(s) from %s", len(rows), BOOST_PLAYERS_FILE)
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, args)
+
+    def _call(self, fn, args):
+        conn = self._connect()
+        try:
+            return fn(conn, *args)
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+
+def _row_from_entry(key: str, value) -> tuple:
+    if isinstance(value, int):
+        return (key, value, 0, 0, 0, "")
+    value = value if isinstance(value, dict) else {}
+    return (
+        key,
+        int(value.get("points", 1000)),
+        int(value.get("wins", 0)),
+        int(value.get("losses", 0)),
+        int(value.get("draws", 0)),
+        value.get("name") or "",
+    )
+
+
+def _entry_from_row(row: sqlite3.Row) -> dict:
+    return {c: row[c] for c in _COLUMNS}
+
+
+class SqlitePlayerStatsStore:
+    """``PlayerStatsStore`` backed by SQLite instead of one JSON blob.
+
+    Selected with ``BOOST_STATS_BACKEND=sqlite``. On first use the existing
+    ``players.json`` is imported into the shared database; after that the
+    database is the source of truth and the JSON file is no longer written.
+    Per-guild databases (``BOOST_STATS_SCOPE=guild``) start empty.
+    """
+
+    def __init__(self, guild_id: int, db_path: str | None = None):
+        self.guild_id = guild_id
+        self.db_path = db_path or BOOST_STATS_DB
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._db = _Database.for_path(self.db_path, import_json=self.db_path == BOOST_STATS_DB)
+
+    @timed(store_seconds, backend="sqlite", op="load")
+    async def load(self) -> dict:
+        def _q(conn):
+            return {r["user_id"]: _entry_from_row(r) for r in conn.execute("SELECT * FROM players")}
+        return await self._db.run(_q)
+
+    @timed(store_seconds, backend="sqlite", op="save")
+    async def save(self, stats: dict):
+        rows = [_row_from_entry(k, v) for k, v in stats.items()]
+
+        def _q(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO players (user_id, points, wins, losses, draws, name) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET points = excluded.points, wins = excluded.wins, "
+                "losses = excluded.losses, draws = excluded.draws, name = excluded.name",
+                rows,
+            )
+            conn.execute("COMMIT")
+        await self._db.run(_q)
+        self._db.version += 1
+
+    async def flush(self):
+        """Writes are committed immediately; nothing to flush."""
+
+    @property
+    def source(self) -> str:
+        """Where the stats live; identifies the store in caches."""
+        return self.db_path
+
+    async def get_version(self) -> int:
+        """A number that changes whenever the stats do, including writes by other processes."""
+        def _q(conn):
+            return conn.execute("PRAGMA data_version").fetchone()[0]
+        data_version = await self._db.run(_q)
+        if data_version != self._db._data_version:
+            if self._db._data_version is not None:
+                self._db.version += 1
+            self._db._data_version = data_version
+        return self._db.version
+
+    @staticmethod
+    def _select(conn: sqlite3.Connection, keys: list[str]) -> dict[str, dict]:
+        """Full rows for ``keys`` (rating columns included, NULLs left out)."""
+        out = {}
+        for i in range(0, len(keys), _IN_CHUNK):
+            chunk = keys[i:i + _IN_CHUNK]
+            rows = conn.execute(f"SELECT * FROM players WHERE user_id IN ({','.join('?' * len(chunk))})", chunk)
+            out.update(
+                (r["user_id"], {k: r[k] for k in r.keys() if k != "user_id" and r[k] is not None}) for r in rows
+            )
+        return out
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        """Batch reads and changes into one SQLite write transaction; see ``StatsTransaction``."""
+        tx = StatsTransaction(self)
+        yield tx
+        await tx.commit()
+
+    async def _read_entries(self, keys: list[str]) -> dict[str, dict]:
+        return await self._db.run(self._select, keys)
+
+    @timed(store_seconds, backend="sqlite", op="commit")
+    async def _commit(self, tx: StatsTransaction):
+        def _q(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            # Writers are locked out from here, so the rows checked are the rows written over.
+            tx.validate(self._select(conn, tx.keys))
+            rows = [
+                _row_from_entry(key, entry) + (entry.get("rd"), entry.get("vol"))
+                for key, entry in tx.changed_entries().items()
+            ]
+            conn.executemany(
+                "INSERT INTO players (user_id, points, wins, losses, draws, name, rd, vol) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET points = excluded.points, wins = excluded.wins, "
+                "losses = excluded.losses, draws = excluded.draws, name = excluded.name, "
+                "rd = excluded.rd, vol = excluded.vol",
+                rows,
+            )
+            conn.execute("COMMIT")
+            return bool(rows)
+        if await self._db.run(_q):
+            self._db.version += 1
+
+    @timed(store_seconds, backend="sqlite", op="ensure_users")
+    async def ensure_users(self, guild: discord.Guild | None, user_ids: list[int] | set[int]):
+        """
+        Ensure all user IDs have entries in the stats store, creating them if necessary.
+        """
+        async with self.transaction() as tx:
+            await tx.ensure_users(guild, user_ids)
+
+    @timed(store_seconds, backend="sqlite", op="record_match")
+    async def record_match(
+        self, guild: discord.Guild | None, winners: list[int], losers: list[int], delta: int | None = None
+    ) -> dict[int, int]:
+        """
+        Record the results of a match, updating points, wins, and losses.
+
+        Points move by the configured rating engine, or by a flat ``delta``
+        if one is given. Returns each player's points change.
+        """
+        async with self.transaction() as tx:
+            deltas = await tx.record_match(guild, winners, losers, delta)
+        return deltas
+
+    @timed(store_seconds, backend="sqlite", op="record_draw")
+    async def record_draw(self, guild: discord.Guild | None, team_a: list[int], team_b: list[int]) -> dict[int, int]:
+        """
+        Record a draw, updating draws count for all players.
+
+        Returns each player's points change (non-zero when the teams were uneven).
+        """
+        async with self.transaction() as tx:
+            deltas = await tx.record_draw(guild, team_a, team_b)
+        return deltas
+
+    @timed(store_seconds, backend="sqlite", op="get_points_map")
+    async def get_points_map(self) -> dict[str, int]:
+        """
+        Get a mapping of user IDs to their current points.
+        """
+        def _q(conn):
+            return {r[0]: r[1] for r in conn.execute("SELECT user_id, points FROM players")}
+        return await self._db.run(_q)
+
+    @timed(store_seconds, backend="sqlite", op="get_entries")
+    async def get_entries(self, user_ids) -> dict[str, dict]:
+        """
+        Get the entries of just ``user_ids``, keyed by user ID string.
+        Unknown players are left out. Primary-key lookups only.
+        """
+        async with self.transaction() as tx:
+            return await tx.get_entries(user_ids)
+
+    @timed(store_seconds, backend="sqlite", op="get_points_for")
+    async def get_points_for(self, user_ids) -> dict[str, int]:
+        """
+        Like ``get_points_map`` restricted to ``user_ids``; unknown players are left out.
+        """
+        async with self.transaction() as tx:
+            return await tx.get_points_for(user_ids)
+
+    @timed(store_seconds, backend="sqlite", op="get_leaderboard")
+    async def get_leaderboard(self, limit: int | None = None) -> list[tuple[str, dict]]:
+        """
+        Get ``(user_id, entry)`` pairs ordered by points, highest first.
+        """
+        def _q(conn):
+            rows = conn.execute(
+                "SELECT * FROM players ORDER BY points DESC, user_id LIMIT ?",
+                (-1 if limit is None else limit,),
+            )
+            return [(r["user_id"], _entry_from_row(r)) for r in rows]
+        return await self._db.run(_q)
+
+    @timed(store_seconds, backend="sqlite", op="get_leaderboard_page")
+    async def get_leaderboard_page(self, page: int, per_page: int) -> tuple[int, list[tuple[int, str, dict]]]:
+        """
+        Get ``(total players, rows)`` for the 0-based ``page``, where ``rows``
+        are ``(rank, user_id, entry)``. Walks the rank index from the page start.
+        """
+        offset = page * per_page
+
+        def _q(conn):
+            total = conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+            rows = conn.execute(
+                "SELECT * FROM players ORDER BY points DESC, user_id LIMIT ? OFFSET ?", (per_page, offset)
+            )
+            return total, [(offset + i + 1, r["user_id"], _entry_from_row(r)) for i, r in enumerate(rows)]
+        return await self._db.run(_q)
+
+    @timed(store_seconds, backend="sqlite", op="get_rank")
+    async def get_rank(self, user_id: int, radius: int = 2) -> tuple[int, int, list[tuple[int, str, dict]]] | None:
+        """
+        Get ``(rank, total players, rows)`` for a player, where ``rows`` are
+        ``(rank, user_id, entry)`` for the player and up to ``radius`` neighbours
+        on each side. Returns None for unknown players.
+        """
+        key = str(user_id)
+
+        def _q(conn):
+            row = conn.execute("SELECT points FROM players WHERE user_id = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            points = row[0]
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM players WHERE points > ? OR (points = ? AND user_id < ?)",
+                (points, points, key),
+            ).fetchone()[0]
+            total = conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+            start = max(ahead - radius, 0)
+            rows = conn.execute(
+                "SELECT * FROM players ORDER BY points DESC, user_id LIMIT ? OFFSET ?",
+                (ahead - start + radius + 1, start),
+            )
+            return ahead + 1, total, [
+                (start + i + 1, r["user_id"], _entry_from_row(r)) for i, r in enumerate(rows)
+            ]
+        return await self._db.run(_q)
@@ -1,107 +1,809 @@
+import asyncio
+import contextlib
+import hashlib
 import json
 import os
+import time
+from typing import Callable
 
-import aiofiles
 import discord
 
+from logging_config import setup_logging
 from paths import BOOST_PLAYERS_FILE, BOOST_DIR
 
+from .file_lock import FileLock
+from .member_cache import member_names
+from .metrics import store_seconds, timed
+from .rank_index import RankIndex
+from .rating import FixedEngine, rate_teams
+from .sharding import process_tag
+
+log = setup_logging("boost_bot.stats_store")
+
+# Seconds to wait after the first journaled change before compacting into the snapshot.
+FLUSH_DELAY_SECS = float(os.getenv("BOOST_STATS_FLUSH_SECS", "2.0"))
+# `json` = shared players.json (default), `sqlite` = see stats_sqlite.py
+STATS_BACKEND = os.getenv("BOOST_STATS_BACKEND", "json").strip().lower()
+# `1` = keep every folded event in `<file>.history` for offline recomputation (see recompute.py).
+# Off by default since it grows with every result; past BOOST_STATS_HISTORY_ROTATE_MB the file
+# is renamed to `<file>.history.<UTC time>`, which recompute also reads and which can be
+# archived or deleted once no longer needed (e.g. after a season's --base snapshot).
+KEEP_HISTORY = os.getenv("BOOST_STATS_HISTORY", "0").strip() != "0"
+HISTORY_ROTATE_BYTES = int(float(os.getenv("BOOST_STATS_HISTORY_ROTATE_MB", "64")) * 1024 * 1024)
+# `global` = one ladder shared by every guild (players.json, the one the webapp shows);
+# `guild` = a separate ladder per guild under GUILD_STATS_DIR, plus a merged global view.
+STATS_SCOPE = os.getenv("BOOST_STATS_SCOPE", "global").strip().lower()
+# Per-guild ladders for BOOST_STATS_SCOPE=guild: one `<guild id>.json` (or `.sqlite3`) each.
+GUILD_STATS_DIR = os.getenv("BOOST_GUILD_STATS_DIR", os.path.join(BOOST_DIR, "guilds"))
+# Seconds between checks for players files changed by someone else (the webapp); 0 = never.
+WATCH_INTERVAL_SECS = float(os.getenv("BOOST_STATS_WATCH_SECS", "2.0"))
+
+
+def _ensure_entry(stats: dict, uid, name: str | None = None) -> bool:
+    """Create or fill in the entry for ``uid``. Returns True if anything changed."""
+    key = str(uid)
+    if key not in stats or isinstance(stats[key], int):
+        stats[key] = {
+            "points": stats.get(key, 1000),
+            "wins": 0,
+            "losses": 0,
+            "draws": 0,
+            "name": name or "",
+        }
+        return True
+    elif isinstance(stats[key], dict):
+        entry = stats[key]
+        before = len(entry)
+        entry.setdefault("points", 1000)
+        entry.setdefault("wins", 0)
+        entry.setdefault("losses", 0)
+        entry.setdefault("draws", 0)
+        entry.setdefault("name", name or "Undefined")
+        return len(entry) != before
+    return False
+
+
+def _entry_complete(stats: dict, uid) -> bool:
+    entry = stats.get(str(uid))
+    return isinstance(entry, dict) and all(
+        k in entry for k in ("points", "wins", "losses", "draws", "name")
+    )
+
+
+def _apply_event(stats: dict, event: dict):
+    """Apply one journal event to ``stats`` in place."""
+    names = event.get("names") or {}
+    kind = event.get("type")
+    if kind == "ensure":
+        for uid in event["users"]:
+            _ensure_entry(stats, uid, names.get(uid))
+    elif kind == "match":
+        if "deltas" in event:
+            deltas = event["deltas"]
+        else:
+            # Journals written before per-player ratings carry one flat delta.
+            delta = int(event["delta"])
+            deltas = {**{uid: delta for uid in event["winners"]}, **{uid: -delta for uid in event["losers"]}}
+        for uid in event["winners"] + event["losers"]:
+            _ensure_entry(stats, uid, names.get(uid))
+        _apply_ratings(stats, deltas, event.get("ratings"))
+        for uid in event["winners"]:
+            entry = stats[uid]
+            entry["wins"] = int(entry.get("wins", 0)) + 1
+        for uid in event["losers"]:
+            entry = stats[uid]
+            entry["losses"] = int(entry.get("losses", 0)) + 1
+    elif kind == "draw":
+        for uid in event["team_a"] + event["team_b"]:
+            _ensure_entry(stats, uid, names.get(uid))
+        _apply_ratings(stats, event.get("deltas") or {}, event.get("ratings"))
+        for uid in event["team_a"] + event["team_b"]:
+            entry = stats[uid]
+            entry["draws"] = int(entry.get("draws", 0)) + 1
+    else:
+        log.warning("Skipping unknown journal event type %r", kind)
+
+
+def _apply_ratings(stats: dict, deltas: dict, ratings: dict | None):
+    for uid, delta in deltas.items():
+        entry = stats[uid]
+        entry["points"] = int(entry.get("points", 1000)) + int(delta)
+    for uid, extra in (ratings or {}).items():
+        stats[uid].update(extra)
+
+
+def _rating_changes(
+    stats: dict, team_a: list[str], team_b: list[str], score_a: float, engine=None
+) -> tuple[dict, dict]:
+    """Per-player ``(deltas, ratings)`` event fields for a result, from the current ``stats``."""
+    def entries(team):
+        return {uid: stats[uid] if isinstance(stats.get(uid), dict) else {} for uid in team}
+
+    changes = rate_teams(entries(team_a), entries(team_b), score_a, engine)
+    deltas = {uid: change.pop("delta") for uid, change in changes.items()}
+    ratings = {uid: change for uid, change in changes.items() if change}
+    return deltas, ratings
+
+
+def _event_uids(event: dict) -> list[str]:
+    kind = event.get("type")
+    if kind == "ensure":
+        return list(event["users"])
+    if kind == "match":
+        return event["winners"] + event["losers"]
+    if kind == "draw":
+        return event["team_a"] + event["team_b"]
+    return []
+
+
+def _encode_snapshot(stats: dict) -> bytes:
+    # No indentation: it roughly doubles both the encode time and the file size.
+    return json.dumps(stats).encode("utf-8")
+
+
+def _file_signature(path: str) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class _StatsCache:
+    """Process-wide parsed copy of a players file backed by an append-only journal.
+
+    Every change is appended to ``<file>.journal`` as one NDJSON event and
+    fsynced before it is applied in memory, so a result costs O(match) on disk.
+    ``FLUSH_DELAY_SECS`` after the first event (and on shutdown) the compactor
+    writes the in-memory state to a temp file and renames it over the snapshot,
+    then drops the folded events from the journal.
+
+    ``<file>.journal.state`` records the last folded sequence number together
+    with the hash of the snapshot it went into. On startup events up to that
+    number are skipped only if the snapshot still has that hash, so a crash
+    between the rename and the journal trim neither loses nor repeats events.
+
+    With ``BOOST_STATS_HISTORY=1`` folded events are also appended to
+    ``<file>.history`` (rotated by size), the input of the offline recompute tool.
+
+    If the snapshot on disk changes underneath us (the webapp saved it), the
+    watcher (see ``watch_stats_files``) or, failing that, the compactor
+    re-reads it and replays the pending events on top instead of
+    overwriting it. Between changes reads never touch the disk. An unreadable
+    snapshot is never overwritten.
+
+    Snapshot reads and compaction hold ``<file>.lock`` (see ``FileLock``) so
+    they never interleave with the webapp's own read-modify-write. Journal
+    appends only need the in-process lock.
+
+    In a multi-process shard deployment each process appends to its own
+    ``<file>.journal.<tag>`` (see ``sharding.process_tag``) and the shared state
+    file keeps one folded sequence number per journal, so processes fold their
+    events into the one snapshot without replaying or dropping each other's.
+    Journals are only folded by the process that owns them; change the process
+    layout after a clean shutdown, when every journal is empty.
+    """
+
+    _instances: dict[str, "_StatsCache"] = {}
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.journal_id = process_tag()
+        self.journal_path = file_path + ".journal" + (f".{self.journal_id}" if self.journal_id else "")
+        self.state_path = file_path + ".journal.state"
+        self.history_path = file_path + ".history"
+        self.data: dict | None = None
+        # Bumped on every change to ``data``; keys caches of derived views (leaderboard pages).
+        self.version = 0
+        # Times the snapshot was re-read because someone else changed it.
+        self.reloads = 0
+        self._ranks: RankIndex | None = None
+        self._pending: list[dict] = []
+        self._seq = 0
+        self._applied_seq = 0
+        self._snapshot_hash: str | None = None
+        self._snapshot_sig: tuple | None = None
+        self._snapshot_corrupt = False
+        self._load_lock = asyncio.Lock()
+        self._append_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+        self._file_lock = FileLock.for_path(file_path + ".lock")
+
+    @classmethod
+    def for_path(cls, file_path: str) -> "_StatsCache":
+        cache = cls._instances.get(file_path)
+        if cache is None:
+            cache = cls._instances[file_path] = cls(file_path)
+        return cache
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._pending)
+
+    async def get(self) -> dict:
+        if self.data is not None:
+            return self.data
+        async with self._load_lock:
+            if self.data is None:
+                async with self._file_lock.hold(shared=True):
+                    await asyncio.to_thread(self._recover)
+                if self._pending:
+                    self._schedule_flush()
+        return self.data
+
+    # -- reading -------------------------------------------------------------
+
+    def _read_snapshot(self) -> dict:
+        """Read the snapshot file; on a parse error keep it untouched and return {}."""
+        self._snapshot_sig = _file_signature(self.file_path)
+        self._snapshot_hash = None
+        try:
+            with open(self.file_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            self._snapshot_corrupt = False
+            return {}
+        try:
+            stats = json.loads(raw) if raw.strip() else {}
+            if not isinstance(stats, dict):
+                raise ValueError("top-level value is not an object")
+        except ValueError as e:
+            log.error(
+                "%s is unreadable (%s); it will not be overwritten until fixed", self.file_path, e
+            )
+            self._snapshot_corrupt = True
+            return {}
+        self._snapshot_corrupt = False
+        self._snapshot_hash = hashlib.sha256(raw).hexdigest()
+        return stats
+
+    def _read_journal(self) -> list[dict]:
+        events = []
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for lineno, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        # Only a torn final line is expected after a crash.
+                        log.warning("Ignoring unreadable journal line %d in %s", lineno, self.journal_path)
+        except FileNotFoundError:
+            pass
+        return events
+
+    def _read_state(self) -> dict:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _folded_seq(self, state: dict) -> int:
+        """Last sequence number of our journal recorded in ``state``."""
+        if not self.journal_id:
+            return int(state.get("seq", 0))
+        return int((state.get("journals") or {}).get(self.journal_id, 0))
+
+    @timed(store_seconds, backend="json", op="recover")
+    def _recover(self):
+        """Rebuild state from the snapshot plus the journal tail."""
+        stats = self._read_snapshot()
+        state = self._read_state()
+        last_folded = self._folded_seq(state)
+        folded = last_folded
+        if state.get("snapshot_sha256") != self._snapshot_hash:
+            # The snapshot is not the one the journal was folded into.
+            folded = 0
+        events = self._read_journal()
+        pending = [e for e in events if int(e.get("seq", 0)) > folded]
+        for event in pending:
+            _apply_event(stats, event)
+        self._pending = pending
+        self._seq = max([last_folded] + [int(e.get("seq", 0)) for e in events])
+        self._applied_seq = self._seq
+        self.data = stats
+        self._ranks = None
+        self.version += 1
+        if pending:
+            log.info("Replayed %d journaled event(s) onto %s", len(pending), self.file_path)
+
+    # -- writing -------------------------------------------------------------
+
+    def _append_sync(self, lines: str):
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def append(self, *events: dict):
+        """Durably journal ``events``, then apply them to the in-memory state."""
+        if not events:
+            return
+        await self.get()
+        async with self._append_lock:
+            await self._append_locked(events)
+        self._schedule_flush()
+
+    @timed(store_seconds, backend="json", op="journal_append")
+    async def _append_locked(self, events):
+        for event in events:
+            self._seq += 1
+            event["seq"] = self._seq
+            event.setdefault("ts", time.time())
+        lines = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in events)
+        await asyncio.to_thread(self._append_sync, lines)
+        for event in events:
+            _apply_event(self.data, event)
+            self._pending.append(event)
+            if self._ranks is not None:
+                for uid in _event_uids(event):
+                    self._ranks.update(uid, int(self.data[uid].get("points", 1000)))
+        self._applied_seq = self._seq
+        self.version += 1
+
+    async def replace(self, stats: dict):
+        """Overwrite the whole snapshot with ``stats`` right away."""
+        await self.get()
+        async with self._flush_lock:
+            self.data = stats
+            self._ranks = None
+            self.version += 1
+            self._snapshot_corrupt = False
+            await self._compact(rebase=False)
+
+    async def ranks(self) -> RankIndex:
+        """The rank index, built on first use and kept current by :meth:`append`."""
+        stats = await self.get()
+        if self._ranks is None:
+            self._ranks = RankIndex.from_stats(stats)
+        return self._ranks
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(FLUSH_DELAY_SECS)
+        # Clear first so events journaled during the write schedule another flush.
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            log.exception("Failed to compact %s: %s", self.file_path, e)
+
+    async def flush(self):
+        """Fold journaled events into the snapshot."""
+        async with self._flush_lock:
+            if self.data is None or not self._pending:
+                return
+            await self._compact(rebase=True)
+
+    @property
+    def changed_on_disk(self) -> bool:
+        """True if the snapshot's inode, size or mtime differ from what we last read or wrote."""
+        return _file_signature(self.file_path) != self._snapshot_sig
+
+    async def _rebase(self):
+        """Re-read the snapshot someone else saved and replay our pending events onto it.
+
+        Callers hold ``_flush_lock`` and the file lock.
+        """
+        stats = await asyncio.to_thread(self._read_snapshot)
+        # No await from here on, so appends land either before (in _pending) or after the swap.
+        for event in self._pending:
+            _apply_event(stats, event)
+        self.data = stats
+        self._ranks = None
+        self.version += 1
+        self.reloads += 1
+        log.info("Reloaded %s; rebased %d pending event(s)", self.file_path, len(self._pending))
+
+    async def refresh(self) -> bool:
+        """Pick up a snapshot changed by someone else. Returns True if it was re-read.
+
+        Costs one ``stat`` when nothing changed. Does nothing before the first load.
+        """
+        if self.data is None or not self.changed_on_disk:
+            return False
+        async with self._flush_lock:
+            async with self._file_lock.hold(shared=True):
+                if not self.changed_on_disk:
+                    return False  # our own compaction got there first
+                await self._rebase()
+        return True
+
+    async def _serialize(self) -> tuple[int, bytes]:
+        """The applied sequence number and the snapshot bytes for it, encoded off the loop.
+
+        Entries are copied first (appends update them in place), so the thread
+        encodes exactly the state at that sequence number.
+        """
+        seq = self._applied_seq
+        data = {uid: dict(e) if isinstance(e, dict) else e for uid, e in self.data.items()}
+        return seq, await asyncio.to_thread(_encode_snapshot, data)
+
+    @timed(store_seconds, backend="json", op="compact")
+    async def _compact(self, rebase: bool):
+        """Write the snapshot and trim the journal. Callers hold ``_flush_lock``.
+
+        Encoding happens before the exclusive file lock is taken, so the lock
+        only covers the history append, the write and the rename.
+        """
+        if rebase and self.changed_on_disk:
+            async with self._file_lock.hold(shared=True):
+                await self._rebase()
+        if self._snapshot_corrupt:
+            log.error("Not compacting: %s is unreadable; events stay in the journal", self.file_path)
+            return
+        folded_seq, payload = await self._serialize()
+        async with self._file_lock.hold():
+            if rebase and self.changed_on_disk:
+                # Saved by someone else while we encoded: rebase onto it and encode again.
+                await self._rebase()
+                if self._snapshot_corrupt:
+                    log.error("Not compacting: %s is unreadable; events stay in the journal", self.file_path)
+                    return
+                folded_seq, payload = await self._serialize()
+            if KEEP_HISTORY:
+                # Archived before the snapshot; a crash in between only repeats lines, which
+                # readers drop by (journal, seq).
+                folded = [e for e in self._pending if e["seq"] <= folded_seq]
+                await asyncio.to_thread(self._archive_sync, folded)
+            await asyncio.to_thread(self._write_snapshot_sync, payload, folded_seq)
+            async with self._append_lock:
+                await asyncio.to_thread(self._trim_journal_sync, folded_seq)
+        self._pending = [e for e in self._pending if e["seq"] > folded_seq]
+
+    def _write_snapshot_sync(self, payload: bytes, folded_seq: int):
+        digest = hashlib.sha256(payload).hexdigest()
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        # Other processes' entries stay valid: we rebased onto their last snapshot.
+        state = self._read_state()
+        if self.journal_id:
+            state.setdefault("journals", {})[self.journal_id] = folded_seq
+        else:
+            state["seq"] = folded_seq
+        state["snapshot_sha256"] = digest
+        state_tmp = self.state_path + ".tmp"
+        with open(state_tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(state_tmp, self.state_path)
+        os.replace(tmp_path, self.file_path)
+        self._snapshot_sig = _file_signature(self.file_path)
+        self._snapshot_hash = digest
+
+    def _archive_sync(self, events: list[dict]):
+        if not events:
+            return
+        lines = "".join(
+            json.dumps({"journal": self.journal_id, **e}, separators=(",", ":")) + "\n" for e in events
+        )
+        with open(self.history_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        if size >= HISTORY_ROTATE_BYTES:
+            # Callers hold the exclusive file lock, so no other process is appending.
+            rotated = stamp = f"{self.history_path}.{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}"
+            n = 0
+            while os.path.exists(rotated):
+                n += 1
+                rotated = f"{stamp}-{n}"
+            os.replace(self.history_path, rotated)
+
+    def _trim_journal_sync(self, folded_seq: int):
+        keep = [e for e in self._read_journal() if int(e.get("seq", 0)) > folded_seq]
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(e, separators=(",", ":")) + "\n" for e in keep)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+
+async def flush_all_stats():
+    """Compact every stats journal into its snapshot (call on shutdown)."""
+    for cache in list(_StatsCache._instances.values()):
+        try:
+            await cache.flush()
+        except Exception as e:
+            log.exception("Failed to flush %s: %s", cache.file_path, e)
+
+
+def stats_reloads() -> int:
+    """Snapshot reloads caused by outside changes, across every players file."""
+    return sum(cache.reloads for cache in _StatsCache._instances.values())
+
+
+async def watch_stats_files(interval: float = WATCH_INTERVAL_SECS):
+    """Poll every loaded players file for outside changes, forever.
+
+    Changes are detected by inode, size and mtime, so a rename-over save by
+    the webapp is caught and an idle file costs one ``stat`` per pass.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        for cache in list(_StatsCache._instances.values()):
+            try:
+                await cache.refresh()
+            except Exception as e:
+                log.exception("Failed to reload %s: %s", cache.file_path, e)
+
+
+def _copy_entry(value):
+    return dict(value) if isinstance(value, dict) else value
+
+
+class StatsTransaction:
+    """A batch of stats reads and changes that the store commits with one write.
+
+    Use ``async with store.transaction() as tx``. Reads and staged changes
+    work on private copies of just the entries they touch, fetched from the
+    store once, so later steps see earlier ones. Leaving the block commits
+    every staged event together; an exception discards them.
+
+    Concurrency is optimistic. The commit compares the entries the
+    transaction read with the store's current ones, under the store's write
+    lock. If any differ, every staged change is rebuilt from the current
+    entries before anything is written, so ratings are never computed from
+    stale points. Mappings returned by ``record_match``/``record_draw`` are
+    refilled when that happens; read them after the block.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        # Entries as fetched (None = unknown player) and the working copies.
+        self._base: dict[str, dict | int | None] = {}
+        self._view: dict[str, dict | int] = {}
+        self._ops: list[tuple[Callable[[dict], dict | None], dict | None]] = []
+        self.events: list[dict] = []
+        self.retries = 0
+
+    @property
+    def keys(self) -> list[str]:
+        """Every user ID the transaction has read."""
+        return list(self._base)
+
+    async def _fetch(self, keys):
+        missing = [k for k in dict.fromkeys(keys) if k not in self._base]
+        if not missing:
+            return
+        found = await self._store._read_entries(missing)
+        for key in missing:
+            value = found.get(key)
+            self._base[key] = _copy_entry(value)
+            if value is not None:
+                self._view[key] = _copy_entry(value)
+
+    def _run(self, build, result: dict | None):
+        event = build(self._view)
+        if event is None:
+            return
+        _apply_event(self._view, event)
+        self.events.append(event)
+        if result is not None:
+            result.clear()
+            result.update((int(uid), d) for uid, d in event["deltas"].items())
+
+    def _stage(self, build, result: dict | None = None):
+        self._ops.append((build, result))
+        self._run(build, result)
+
+    def validate(self, current: dict[str, dict | int | None]) -> bool:
+        """Rebuild the staged events if ``current`` differs from what was read. True if rebuilt.
+
+        Stores call this while holding their write lock, right before writing ``events``.
+        """
+        if all(current.get(key) == value for key, value in self._base.items()):
+            return False
+        self.retries += 1
+        self._base = {key: _copy_entry(current.get(key)) for key in self._base}
+        self._view = {key: _copy_entry(value) for key, value in self._base.items() if value is not None}
+        self.events = []
+        for build, result in self._ops:
+            self._run(build, result)
+        return True
+
+    def changed_entries(self) -> dict[str, dict]:
+        """Final entries of every player a staged event touched."""
+        keys = dict.fromkeys(uid for event in self.events for uid in _event_uids(event))
+        return {key: self._view[key] for key in keys}
+
+    async def _names(self, guild: discord.Guild | None, keys: list[str]) -> dict[str, str]:
+        resolved = await member_names.resolve(guild, [int(k) for k in keys])
+        return {str(uid): name for uid, name in resolved.items()}
+
+    def _event(self, kind: str, **fields) -> dict:
+        return {"type": kind, "guild": self._store.guild_id, **fields}
+
+    async def get_entries(self, user_ids) -> dict[str, dict]:
+        """Entries of ``user_ids`` as this transaction sees them; unknown players are left out."""
+        keys = [str(uid) for uid in user_ids]
+        await self._fetch(keys)
+        out: dict[str, dict] = {}
+        for key in keys:
+            value = self._view.get(key)
+            if isinstance(value, dict):
+                out[key] = value
+            elif isinstance(value, int):
+                out[key] = {"points": value}
+        return out
+
+    async def get_points_for(self, user_ids) -> dict[str, int]:
+        return {k: int(v.get("points", 1000)) for k, v in (await self.get_entries(user_ids)).items()}
+
+    async def ensure_users(self, guild: discord.Guild | None, user_ids):
+        keys = [str(uid) for uid in user_ids]
+        await self._fetch(keys)
+        missing = [k for k in keys if not _entry_complete(self._view, k)]
+        if not missing:
+            return
+        names = await self._names(guild, missing)
+
+        def build(stats: dict) -> dict | None:
+            users = [k for k in keys if not _entry_complete(stats, k)]
+            if not users:
+                return None
+            return self._event("ensure", users=users, names={k: names[k] for k in users if k in names})
+
+        self._stage(build)
+
+    async def record_match(
+        self, guild: discord.Guild | None, winners: list[int], losers: list[int], delta: int | None = None
+    ) -> dict[int, int]:
+        winner_ids = [str(uid) for uid in winners]
+        loser_ids = [str(uid) for uid in losers]
+        await self._fetch(winner_ids + loser_ids)
+        names = await self._names(guild, winner_ids + loser_ids)
+        engine = FixedEngine(delta) if delta is not None else None
+
+        def build(stats: dict) -> dict:
+            deltas, ratings = _rating_changes(stats, winner_ids, loser_ids, 1.0, engine)
+            return self._event(
+                "match", winners=winner_ids, losers=loser_ids, deltas=deltas, ratings=ratings, names=names
+            )
+
+        deltas: dict[int, int] = {}
+        self._stage(build, deltas)
+        return deltas
+
+    async def record_draw(self, guild: discord.Guild | None, team_a: list[int], team_b: list[int]) -> dict[int, int]:
+        a_ids = [str(uid) for uid in team_a]
+        b_ids = [str(uid) for uid in team_b]
+        await self._fetch(a_ids + b_ids)
+        names = await self._names(guild, a_ids + b_ids)
+
+        def build(stats: dict) -> dict:
+            deltas, ratings = _rating_changes(stats, a_ids, b_ids, 0.5)
+            return self._event("draw", team_a=a_ids, team_b=b_ids, deltas=deltas, ratings=ratings, names=names)
+
+        deltas: dict[int, int] = {}
+        self._stage(build, deltas)
+        return deltas
+
+    async def commit(self):
+        """Write the staged events with one store write. Called when the ``async with`` block exits."""
+        if self._ops:
+            await self._store._commit(self)
+        self._ops = []
+
 
 class PlayerStatsStore:
     """Async read/write for player stats shared with the Boost webapp.
 
-    Data lives in ``data/boost/players.json`` (Discord user ID strings as keys).
-    The ``guild_id`` argument is kept for call-site compatibility but does not
-    select a separate file; all guilds share the same leaderboard as the web UI.
+    Data lives in ``data/boost/players.json`` (Discord user ID strings as keys),
+    so all guilds share the same leaderboard as the web UI. With
+    ``BOOST_STATS_SCOPE=guild``, ``open_stats_store`` gives each guild its own
+    file instead (see ``guild_stats_path``); the webapp keeps showing the
+    shared file, which the bot then no longer writes.
+
+    All instances share one in-memory copy of the file (see ``_StatsCache``).
+    Changes are journaled as events and folded into the file shortly after.
 
     Legacy per-guild files under ``data/boost_bot/points/`` are no longer used.
     """
 
-    def __init__(self, guild_id: int):
+    def __init__(self, guild_id: int, file_path: str | None = None):
         self.guild_id = guild_id
         try:
             os.makedirs(BOOST_DIR, exist_ok=True)
         except FileNotFoundError:
             os.makedirs(os.path.dirname(BOOST_DIR), exist_ok=True)
             os.makedirs(BOOST_DIR, exist_ok=True)
-        self.file_path = BOOST_PLAYERS_FILE
+        self.file_path = file_path or BOOST_PLAYERS_FILE
+        if file_path:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self._cache = _StatsCache.for_path(self.file_path)
 
+    @timed(store_seconds, backend="json", op="load")
     async def load(self) -> dict:
-        try:
-            async with aiofiles.open(self.file_path, mode="r", encoding="utf-8") as f:
-                data = await f.read()
-                return json.loads(data) if data else {}
-        except Exception:
-            return {}
+        """Return the shared stats dict. Treat it as read-only."""
+        return await self._cache.get()
 
+    @timed(store_seconds, backend="json", op="save")
     async def save(self, stats: dict):
-        async with aiofiles.open(self.file_path, mode="w", encoding="utf-8") as f:
-            await f.write(json.dumps(stats, indent=2))
-
-    def _ensure_entry(self, stats: dict, uid: int, name: str | None = None):
-        key = str(uid)
-        if key not in stats:
-            stats[key] = {
-                "points": 1000,
-                "wins": 0,
-                "losses": 0,
-                "draws": 0,
-                "name": name or "",
-            }
-            return
-        elif isinstance(stats[key], dict):
-            stats[key].setdefault("points", 1000)
-            stats[key].setdefault("wins", 0)
-            stats[key].setdefault("losses", 0)
-            stats[key].setdefault("draws", 0)
-            stats[key].setdefault("name", name or "Undefined")
-
-    def _get_member_name(self, guild: discord.Guild | None, uid: int) -> str | None:
-        if not guild:
-            return None
-        member = guild.get_member(uid)
-        if not member:
-            return None
-        return getattr(member, "display_name", None) or getattr(member, "name", None)
+        await self._cache.replace(stats)
+
+    async def flush(self):
+        await self._cache.flush()
+
+    @property
+    def source(self) -> str:
+        """Where the stats live; identifies the store in caches."""
+        return self.file_path
+
+    async def get_version(self) -> int:
+        """A number that changes whenever the stats do."""
+        await self._cache.get()
+        return self._cache.version
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        """Batch reads and changes into one journal write; see ``StatsTransaction``."""
+        tx = StatsTransaction(self)
+        yield tx
+        await tx.commit()
+
+    async def _read_entries(self, keys: list[str]) -> dict[str, dict | int]:
+        stats = await self.load()
+        return {k: stats[k] for k in keys if k in stats}
+
+    @timed(store_seconds, backend="json", op="commit")
+    async def _commit(self, tx: StatsTransaction):
+        cache = self._cache
+        await cache.get()
+        async with cache._append_lock:
+            if tx.validate({k: cache.data.get(k) for k in tx.keys}):
+                log.debug("Stats changed under a transaction; rebuilt %d event(s)", len(tx.events))
+            if not tx.events:
+                return
+            await cache._append_locked(tx.events)
+        cache._schedule_flush()
 
+    @timed(store_seconds, backend="json", op="ensure_users")
     async def ensure_users(self, guild: discord.Guild | None, user_ids: list[int] | set[int]):
         """
         Ensure all user IDs have entries in the stats store, creating them if necessary.
         """
-        stats = await self.load()
-        for uid in user_ids:
-            self._ensure_entry(stats, uid, self._get_member_name(guild, uid))
-        await self.save(stats)
+        async with self.transaction() as tx:
+            await tx.ensure_users(guild, user_ids)
 
-    async def record_match(self, guild: discord.Guild | None, winners: list[int], losers: list[int], delta: int):
+    @timed(store_seconds, backend="json", op="record_match")
+    async def record_match(
+        self, guild: discord.Guild | None, winners: list[int], losers: list[int], delta: int | None = None
+    ) -> dict[int, int]:
         """
         Record the results of a match, updating points, wins, and losses.
+
+        Points move by the configured rating engine, or by a flat ``delta``
+        if one is given. Returns each player's points change.
         """
-        stats = await self.load()
-        for uid in list(winners) + list(losers):
-            self._ensure_entry(stats, uid, self._get_member_name(guild, uid))
-        for uid in winners:
-            entry = stats[str(uid)]
-            entry["points"] = int(entry.get("points", 1000)) + delta
-            entry["wins"] = int(entry.get("wins", 0)) + 1
-        for uid in losers:
-            entry = stats[str(uid)]
-            entry["points"] = int(entry.get("points", 1000)) - delta
-            entry["losses"] = int(entry.get("losses", 0)) + 1
-        await self.save(stats)
+        async with self.transaction() as tx:
+            deltas = await tx.record_match(guild, winners, losers, delta)
+        return deltas
 
-    async def record_draw(self, guild: discord.Guild | None, team_a: list[int], team_b: list[int]):
+    @timed(store_seconds, backend="json", op="record_draw")
+    async def record_draw(self, guild: discord.Guild | None, team_a: list[int], team_b: list[int]) -> dict[int, int]:
         """
         Record a draw, updating draws count for all players.
+
+        Returns each player's points change (non-zero when the teams were uneven).
         """
-        stats = await self.load()
-        for uid in list(team_a) + list(team_b):
-            self._ensure_entry(stats, uid, self._get_member_name(guild, uid))
-        for uid in list(team_a) + list(team_b):
-            entry = stats[str(uid)]
-            entry["draws"] = int(entry.get("draws", 0)) + 1
-        await self.save(stats)
+        async with self.transaction() as tx:
+            deltas = await tx.record_draw(guild, team_a, team_b)
+        return deltas
 
+    @timed(store_seconds, backend="json", op="get_points_map")
     async def get_points_map(self) -> dict[str, int]:
         """
         Get a mapping of user IDs to their current points.
@@ -114,3 +816,69 @@ class PlayerStatsStore:
             elif isinstance(v, dict):
                 out[k] = int(v.get("points", 1000))
         return out
+
+    @timed(store_seconds, backend="json", op="get_entries")
+    async def get_entries(self, user_ids) -> dict[str, dict]:
+        """
+        Get the entries of just ``user_ids``, keyed by user ID string.
+        Unknown players are left out. Costs O(len(user_ids)), not O(players).
+        """
+        async with self.transaction() as tx:
+            return await tx.get_entries(user_ids)
+
+    @timed(store_seconds, backend="json", op="get_points_for")
+    async def get_points_for(self, user_ids) -> dict[str, int]:
+        """
+        Like ``get_points_map`` restricted to ``user_ids``; unknown players are left out.
+        """
+        async with self.transaction() as tx:
+            return await tx.get_points_for(user_ids)
+
+    @timed(store_seconds, backend="json", op="get_leaderboard")
+    async def get_leaderboard(self, limit: int | None = None) -> list[tuple[str, dict]]:
+        """
+        Get ``(user_id, entry)`` pairs ordered by points, highest first.
+        """
+        stats = await self.load()
+        ranks = await self._cache.ranks()
+        return [(uid, stats[uid]) for _, uid in ranks.top(limit)]
+
+    @timed(store_seconds, backend="json", op="get_leaderboard_page")
+    async def get_leaderboard_page(self, page: int, per_page: int) -> tuple[int, list[tuple[int, str, dict]]]:
+        """
+        Get ``(total players, rows)`` for the 0-based ``page``, where ``rows``
+        are ``(rank, user_id, entry)``. Slices the rank index; nothing is sorted.
+        """
+        stats = await self.load()
+        ranks = await self._cache.ranks()
+        start = page * per_page + 1
+        return len(ranks), [(r, uid, stats[uid]) for r, uid in ranks.slice(start, start + per_page - 1)]
+
+    @timed(store_seconds, backend="json", op="get_rank")
+    async def get_rank(self, user_id: int, radius: int = 2) -> tuple[int, int, list[tuple[int, str, dict]]] | None:
+        """
+        Get ``(rank, total players, rows)`` for a player, where ``rows`` are
+        ``(rank, user_id, entry)`` for the player and up to ``radius`` neighbours
+        on each side. Returns None for unknown players.
+        """
+        stats = await self.load()
+        ranks = await self._cache.ranks()
+        rank = ranks.rank(str(user_id))
+        if rank is None:
+            return None
+        rows = [(r, uid, stats[uid]) for r, uid in ranks.around(str(user_id), radius)]
+        return rank, len(ranks), rows
+
+
+def guild_stats_path(guild_id: int, suffix: str = ".json") -> str:
+    """Where ``guild_id``'s own ladder lives when ``BOOST_STATS_SCOPE=guild``."""
+    return os.path.join(GUILD_STATS_DIR, f"{guild_id}{suffix}")
+
+
+def open_stats_store(guild_id: int):
+    """Return the stats store for ``guild_id`` using the configured backend and scope."""
+    per_guild = STATS_SCOPE == "guild"
+    if STATS_BACKEND == "sqlite":
+        from .stats_sqlite import SqlitePlayerStatsStore
+        return SqlitePlayerStatsStore(guild_id, db_path=guild_stats_path(guild_id, ".sqlite3") if per_guild else None)
+    return PlayerStatsStore(guild_id, file_path=guild_stats_path(guild_id) if per_guild else None)
@@ -0,0 +1,6 @@
+"""Unit tests for the parts of the bot that run without Discord.
+
+Run from the directory that contains the package::
+
+    python -m unittest discover -s boost_bot/tests -t .
+"""
@@ -0,0 +1,111 @@
+import itertools
+import random
+import time
+import unittest
+
+from ..balance import partition_teams, partition_teams_constrained
+
+
+def _gap(points: dict[int, int], team_a, team_b) -> int:
+    return abs(sum(points[uid] for uid in team_a) - sum(points[uid] for uid in team_b))
+
+
+def _brute_force(player_points, together=(), apart=(), roles=None, role_caps=None) -> int | None:
+    """Smallest gap over every equal split that meets the constraints, or None."""
+    points = dict(player_points)
+    uids = list(points)
+    roles = roles or {}
+    role_caps = role_caps or {}
+    best = None
+    for team_a in itertools.combinations(uids, len(uids) // 2):
+        a = set(team_a)
+        b = set(uids) - a
+        if any(0 < len(group & a) < len(group) for group in together):
+            continue
+        if any(len(pair & a) != 1 for pair in apart):
+            continue
+        if any(
+            sum(1 for uid in team if roles.get(uid) == role) > cap
+            for team in (a, b) for role, cap in role_caps.items()
+        ):
+            continue
+        gap = _gap(points, a, b)
+        if best is None or gap < best:
+            best = gap
+    return best
+
+
+def _lobby(rng: random.Random, size: int) -> list[tuple[int, int]]:
+    return [(uid, rng.randint(600, 1800)) for uid in range(1, size + 1)]
+
+
+class PartitionTeamsTest(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(1)
+        for size in (2, 4, 6, 8, 10, 12):
+            for _ in range(20):
+                lobby = _lobby(rng, size)
+                team_a, team_b = partition_teams(lobby)
+                self.assertEqual(len(team_a), len(team_b))
+                self.assertEqual(sorted(team_a + team_b), sorted(uid for uid, _ in lobby))
+                self.assertEqual(_gap(dict(lobby), team_a, team_b), _brute_force(lobby))
+
+    def test_odd_lobby_leaves_last_player_out(self):
+        team_a, team_b = partition_teams([(1, 1000), (2, 1100), (3, 900)])
+        self.assertEqual(sorted(team_a + team_b), [1, 2])
+
+    def test_empty(self):
+        self.assertEqual(partition_teams([]), ([], []))
+
+
+class PartitionTeamsConstrainedTest(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(2)
+        for size in (4, 6, 8, 10, 12):
+            for _ in range(15):
+                lobby = _lobby(rng, size)
+                uids = [uid for uid, _ in lobby]
+                rng.shuffle(uids)
+                together = [set(uids[:2])]
+                apart = {frozenset(uids[2:4])}
+                roles = {uid: rng.choice(("tank", "healer", "dps")) for uid in uids}
+                role_caps = {"tank": max(1, size // 4)}
+                expected = _brute_force(lobby, together, apart, roles, role_caps)
+
+                result = partition_teams_constrained(lobby, together, apart, roles, role_caps)
+                if expected is None:
+                    self.assertIsNone(result)
+                    continue
+                team_a, team_b = result
+                a, b = set(team_a), set(team_b)
+                self.assertEqual(len(a), len(b))
+                self.assertTrue(together[0] <= a or together[0] <= b)
+                self.assertEqual(len(next(iter(apart)) & a), 1)
+                for team in (a, b):
+                    self.assertLessEqual(sum(1 for uid in team if roles[uid] == "tank"), role_caps["tank"])
+                self.assertEqual(_gap(dict(lobby), a, b), expected)
+
+    def test_without_constraints_is_unconstrained_optimum(self):
+        lobby = _lobby(random.Random(3), 10)
+        team_a, team_b = partition_teams_constrained(lobby)
+        self.assertEqual(_gap(dict(lobby), team_a, team_b), _brute_force(lobby))
+
+    def test_infeasible_returns_none_quickly(self):
+        lobby = _lobby(random.Random(4), 40)
+        cases = [
+            # Three players who must all be on different teams.
+            {"apart": {frozenset((1, 2)), frozenset((2, 3)), frozenset((1, 3))}},
+            # More players of a role than two teams can hold.
+            {"roles": {1: "tank", 2: "tank", 3: "tank"}, "role_caps": {"tank": 1}},
+            # A keep-together group larger than a team.
+            {"together": [set(range(1, 22))]},
+        ]
+        for kwargs in cases:
+            with self.subTest(**{k: str(v)[:40] for k, v in kwargs.items()}):
+                started = time.perf_counter()
+                self.assertIsNone(partition_teams_constrained(lobby, **kwargs))
+                self.assertLess(time.perf_counter() - started, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import random
+import unittest
+
+from ..matchmaking import Matchmaker, MatchmakingQueue, QueueEntry, match_window
+
+
+def _queue(rng: random.Random, count: int) -> MatchmakingQueue:
+    queue = MatchmakingQueue()
+    for uid in range(count):
+        queue.add(QueueEntry(uid, int(rng.gauss(1000, 200)), None, float(uid)))
+    return queue
+
+
+class MatchmakingQueueTest(unittest.TestCase):
+    def test_matches_stay_inside_the_anchor_window(self):
+        rng = random.Random(6)
+        queue = _queue(rng, 500)
+        now = 30.0
+        matches = queue.pop_matches(now, size=10, anchors=500)
+        self.assertTrue(matches)
+        for group in matches:
+            anchor = group[0]
+            self.assertEqual(len({e.user_id for e in group}), 10)
+            window = match_window(now - anchor.enqueued_at)
+            for entry in group:
+                self.assertLessEqual(abs(entry.points - anchor.points), window)
+                self.assertNotIn(entry.user_id, queue)
+
+    def test_match_takes_the_closest_players(self):
+        queue = MatchmakingQueue()
+        for uid, points in enumerate((1000, 1300, 1010, 990, 650)):
+            queue.add(QueueEntry(uid, points, None, float(uid)))
+        [group] = queue.pop_matches(1000.0, size=4, anchors=1)
+        self.assertEqual(group[0].user_id, 0)
+        self.assertEqual(sorted(e.user_id for e in group), [0, 1, 2, 3])
+
+    def test_no_match_outside_the_window(self):
+        queue = MatchmakingQueue()
+        queue.add(QueueEntry(1, 1000, None, 0.0))
+        queue.add(QueueEntry(2, 1500, None, 0.0))
+        self.assertEqual(queue.pop_matches(0.0, size=2), [])
+        self.assertEqual(len(queue), 2)
+
+    def test_restore_keeps_wait_order(self):
+        queue = _queue(random.Random(7), 20)
+        popped = [queue.remove(uid) for uid in (3, 11, 0)]
+        queue.restore(popped)
+        self.assertEqual([queue.position(uid) for uid in range(20)], list(range(1, 21)))
+        self.assertEqual(len(queue._by_points), 20)
+
+    def test_matcher_requeues_when_opening_the_match_fails(self):
+        matcher = Matchmaker(size=2)
+        matcher.enqueue(1, 10, 1000)
+        matcher.enqueue(1, 11, 1000)
+        [(guild_id, group)] = matcher.tick()
+        self.assertEqual(len(matcher), 0)
+        matcher.requeue(guild_id, group)
+        self.assertEqual([matcher.queue(1).position(uid) for uid in (10, 11)], [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import random
+import unittest
+
+from ..rank_index import RankIndex
+
+
+def _reference(points: dict[str, int]) -> list[str]:
+    return [uid for _, uid in sorted((-pts, uid) for uid, pts in points.items())]
+
+
+class RankIndexTest(unittest.TestCase):
+    def test_matches_full_sort_under_random_updates(self):
+        rng = random.Random(5)
+        points = {str(uid): rng.randint(800, 1200) for uid in range(200)}
+        index = RankIndex.from_stats({uid: {"points": pts} for uid, pts in points.items()})
+        for step in range(2000):
+            uid = str(rng.randrange(250))
+            if step % 7 == 0 and uid in points:
+                del points[uid]
+                index.remove(uid)
+            else:
+                points[uid] = rng.randint(800, 1200)
+                index.update(uid, points[uid])
+            if step % 100 == 0:
+                order = _reference(points)
+                self.assertEqual(len(index), len(points))
+                self.assertEqual([uid for _, uid in index.top()], order)
+                for rank, uid in enumerate(order, start=1):
+                    self.assertEqual(index.rank(uid), rank)
+
+    def test_ties_break_by_user_id(self):
+        index = RankIndex.from_stats({"b": {"points": 1000}, "a": {"points": 1000}, "c": {"points": 1100}})
+        self.assertEqual(index.top(), [(1, "c"), (2, "a"), (3, "b")])
+
+    def test_slice_and_around(self):
+        index = RankIndex.from_stats({str(uid): {"points": 1000 + uid} for uid in range(10)})
+        self.assertEqual(index.slice(2, 3), [(2, "8"), (3, "7")])
+        self.assertEqual(index.around("9", 2), [(1, "9"), (2, "8"), (3, "7")])
+        self.assertEqual(index.around("missing", 2), [])
+        self.assertIsNone(index.rank("missing"))
+
+    def test_from_stats_reads_legacy_int_entries_as_missing(self):
+        index = RankIndex.from_stats({"1": 1200, "2": {"points": 900}})
+        self.assertNotIn("1", index)
+        self.assertEqual(index.rank("2"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
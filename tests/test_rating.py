@@ -0,0 +1,57 @@
+import unittest
+
+from ..rating import ENGINES, FixedEngine, Glicko2Engine, TeamEloEngine, rate_teams
+
+
+def _player(points: int, games: int = 20, **extra) -> dict:
+    return {"points": points, "wins": games, "losses": 0, "draws": 0, **extra}
+
+
+class RatingEngineTest(unittest.TestCase):
+    def test_winners_gain_and_losers_lose(self):
+        for name, cls in ENGINES.items():
+            with self.subTest(engine=name):
+                changes_a, changes_b = cls().rate([_player(1000)] * 3, [_player(1000)] * 3, 1.0)
+                self.assertTrue(all(c["delta"] > 0 for c in changes_a))
+                self.assertTrue(all(c["delta"] < 0 for c in changes_b))
+
+    def test_draw_between_equal_teams_moves_nothing(self):
+        for name, cls in ENGINES.items():
+            with self.subTest(engine=name):
+                changes_a, changes_b = cls().rate([_player(1000)] * 2, [_player(1000)] * 2, 0.5)
+                self.assertTrue(all(c["delta"] == 0 for c in changes_a + changes_b))
+
+    def test_fixed(self):
+        changes_a, changes_b = FixedEngine(25).rate([_player(900)], [_player(1500)], 1.0)
+        self.assertEqual((changes_a, changes_b), ([{"delta": 25}], [{"delta": -25}]))
+
+    def test_elo_upset_pays_more_and_is_zero_sum(self):
+        elo = TeamEloEngine(k=32, provisional_games=10)
+        [upset], [favourite] = elo.rate([_player(900)], [_player(1300)], 1.0)
+        [expected], _ = elo.rate([_player(1300)], [_player(900)], 1.0)
+        self.assertGreater(upset["delta"], expected["delta"])
+        self.assertEqual(upset["delta"], -favourite["delta"])
+
+    def test_elo_provisional_players_move_twice_as_far(self):
+        elo = TeamEloEngine(k=32, provisional_games=10)
+        [new, settled], _ = elo.rate([_player(1000, games=0), _player(1000)], [_player(1000)] * 2, 1.0)
+        self.assertEqual(new["delta"], 2 * settled["delta"])
+
+    def test_glicko2_shrinks_rating_deviation(self):
+        [change], _ = Glicko2Engine().rate([_player(1000, rd=350.0, vol=0.06)], [_player(1000, rd=350.0)], 1.0)
+        self.assertLess(change["rd"], 350.0)
+        self.assertGreater(change["vol"], 0)
+
+    def test_glicko2_uncertain_players_move_further(self):
+        [uncertain, settled], _ = Glicko2Engine().rate(
+            [_player(1000, rd=300.0), _player(1000, rd=60.0)], [_player(1000, rd=100.0)] * 2, 1.0
+        )
+        self.assertGreater(uncertain["delta"], settled["delta"])
+
+    def test_rate_teams_keys_changes_by_user(self):
+        changes = rate_teams({"1": _player(1000)}, {"2": _player(1000)}, 1.0, FixedEngine(10))
+        self.assertEqual(changes, {"1": {"delta": 10}, "2": {"delta": -10}})
+
+
+if __name__ == "__main__":
+    unittest.main()
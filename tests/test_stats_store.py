@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from ..stats_store import PlayerStatsStore, _StatsCache
+
+
+def _entry(points: int = 1000, wins: int = 0, losses: int = 0) -> dict:
+    return {"points": points, "wins": wins, "losses": losses, "draws": 0, "name": ""}
+
+
+def _match(winners: list[str], losers: list[str], delta: int = 10) -> dict:
+    deltas = {**{uid: delta for uid in winners}, **{uid: -delta for uid in losers}}
+    return {"type": "match", "winners": winners, "losers": losers, "deltas": deltas}
+
+
+class _StoreTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.path = os.path.join(self._dir.name, "players.json")
+        self._caches: list[_StatsCache] = []
+
+    async def asyncTearDown(self):
+        for cache in self._caches:
+            if cache._flush_task is not None:
+                cache._flush_task.cancel()
+        _StatsCache._instances.pop(self.path, None)
+
+    def write_snapshot(self, stats: dict):
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(stats, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def read_snapshot(self) -> dict:
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def journal_lines(self) -> list[str]:
+        try:
+            with open(self.path + ".journal", "r", encoding="utf-8") as f:
+                return [line for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def cache(self) -> _StatsCache:
+        """A fresh cache on the same files, as a restarted process would have."""
+        cache = _StatsCache(self.path)
+        self._caches.append(cache)
+        return cache
+
+
+class JournalRecoveryTest(_StoreTestCase):
+    async def test_unfolded_events_survive_a_restart(self):
+        self.write_snapshot({"1": _entry(), "2": _entry()})
+        first = self.cache()
+        await first.append(_match(["1"], ["2"]))
+
+        recovered = await self.cache().get()
+        self.assertEqual(recovered, first.data)
+        self.assertEqual(recovered["1"], _entry(1010, wins=1))
+
+    async def test_compaction_folds_and_trims_the_journal(self):
+        self.write_snapshot({"1": _entry(), "2": _entry()})
+        cache = self.cache()
+        await cache.append(_match(["1"], ["2"]), _match(["2"], ["1"]))
+        await cache.flush()
+
+        self.assertEqual(self.journal_lines(), [])
+        self.assertEqual(self.read_snapshot(), cache.data)
+        self.assertEqual(await self.cache().get(), cache.data)
+
+    async def test_crash_before_journal_trim_does_not_repeat_events(self):
+        self.write_snapshot({"1": _entry(), "2": _entry()})
+        cache = self.cache()
+        await cache.append(_match(["1"], ["2"]))
+        journal = self.journal_lines()
+        await cache.flush()
+        # The snapshot and state were written but the process died before trimming.
+        with open(self.path + ".journal", "w", encoding="utf-8") as f:
+            f.writelines(journal)
+
+        self.assertEqual((await self.cache().get())["1"], _entry(1010, wins=1))
+
+    async def test_crash_before_snapshot_rename_replays_events(self):
+        self.write_snapshot({"1": _entry(), "2": _entry()})
+        with open(self.path, "rb") as f:
+            old_snapshot = f.read()
+        cache = self.cache()
+        await cache.append(_match(["1"], ["2"]))
+        journal = self.journal_lines()
+        await cache.flush()
+        # The state file already names the new snapshot, but the rename never happened.
+        with open(self.path, "wb") as f:
+            f.write(old_snapshot)
+        with open(self.path + ".journal", "w", encoding="utf-8") as f:
+            f.writelines(journal)
+
+        self.assertEqual((await self.cache().get())["1"], _entry(1010, wins=1))
+
+    async def test_events_replay_onto_a_snapshot_changed_after_folding(self):
+        self.write_snapshot({"1": _entry(), "2": _entry()})
+        cache = self.cache()
+        await cache.append(_match(["1"], ["2"]))
+        await cache.flush()
+        await cache.append(_match(["1"], ["2"]))
+        # The webapp rewrites the snapshot; its hash no longer matches the state file.
+        self.write_snapshot({"1": _entry(1500, wins=5), "2": _entry(), "3": _entry()})
+
+        stats = await self.cache().get()
+        self.assertEqual(stats["1"], _entry(1510, wins=6))
+        self.assertIn("3", stats)
+
+    async def test_torn_last_journal_line_is_ignored(self):
+        self.write_snapshot({"1": _entry(), "2": _entry()})
+        await self.cache().append(_match(["1"], ["2"]))
+        with open(self.path + ".journal", "a", encoding="utf-8") as f:
+            f.write('{"type": "match", "winn')
+
+        with self.assertLogs("boost_bot.stats_store", "WARNING"):
+            stats = await self.cache().get()
+        self.assertEqual(stats["1"], _entry(1010, wins=1))
+
+    async def test_compaction_rebases_onto_an_outside_change(self):
+        self.write_snapshot({"1": _entry(), "2": _entry()})
+        cache = self.cache()
+        await cache.get()
+        await cache.append(_match(["1"], ["2"]))
+        self.write_snapshot({"1": _entry(1200, wins=2), "2": _entry(), "4": _entry()})
+        await cache.flush()
+
+        snapshot = self.read_snapshot()
+        self.assertEqual(snapshot["1"], _entry(1210, wins=3))
+        self.assertIn("4", snapshot)
+        self.assertEqual(cache.reloads, 1)
+
+    async def test_unreadable_snapshot_is_never_overwritten(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        cache = self.cache()
+        with self.assertLogs("boost_bot.stats_store", "ERROR"):
+            await cache.append(_match(["1"], ["2"]))
+            await cache.flush()
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "{not json")
+        self.assertEqual(len(self.journal_lines()), 1)
+
+
+class TransactionTest(_StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write_snapshot({str(uid): _entry() for uid in range(1, 5)})
+        self.store = PlayerStatsStore(1, self.path)
+        self._caches.append(self.store._cache)
+
+    async def test_staged_changes_are_visible_inside_the_transaction(self):
+        async with self.store.transaction() as tx:
+            deltas = await tx.record_match(None, [1], [2], delta=10)
+            points = await tx.get_points_for([1, 2])
+            self.assertEqual(points, {"1": 1010, "2": 990})
+            self.assertEqual((await self.store.get_points_for([1]))["1"], 1000)
+        self.assertEqual(deltas, {1: 10, 2: -10})
+        self.assertEqual((await self.store.get_points_for([1]))["1"], 1010)
+
+    async def test_exception_discards_staged_changes(self):
+        with self.assertRaises(RuntimeError):
+            async with self.store.transaction() as tx:
+                await tx.record_match(None, [1], [2], delta=10)
+                raise RuntimeError
+        self.assertEqual(await self.store.get_points_for([1, 2]), {"1": 1000, "2": 1000})
+
+    async def test_conflicting_commit_rebuilds_from_current_points(self):
+        first = self.store.transaction()
+        tx = await first.__aenter__()
+        deltas = await tx.record_match(None, [1], [2])
+        stale = dict(deltas)
+        # Another result for the same players lands before this one commits.
+        await self.store.record_match(None, [2], [1], delta=100)
+        await first.__aexit__(None, None, None)
+
+        self.assertEqual(tx.retries, 1)
+        self.assertNotEqual(deltas, stale)
+        points = await self.store.get_points_for([1, 2])
+        self.assertEqual(points, {"1": 900 + deltas[1], "2": 1100 + deltas[2]})
+
+    async def test_concurrent_results_are_all_recorded(self):
+        await asyncio.gather(*(self.store.record_match(None, [1, 2], [3, 4], delta=5) for _ in range(20)))
+        await self.store.flush()
+
+        stats = self.read_snapshot()
+        self.assertEqual(stats["1"]["wins"], 20)
+        self.assertEqual(stats["3"]["points"], 900)
+
+
+if __name__ == "__main__":
+    unittest.main()
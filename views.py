@@ -1,137 +1,185 @@
+import asyncio
 import math
 
 import discord
 
 from logging_config import setup_logging
 
-from .lobby import Lobby, format_player_mentions
-from .stats_store import PlayerStatsStore
+from .balance import partition_teams, partition_teams_constrained
+from .edit_coalescer import queue_edits
+from .global_ladder import open_ladder
+from .leaderboard import leaderboard_pages
+from .rest_scheduler import defer, followup, respond, send, update
+from .lobby import Lobby, format_constraints, format_player_mentions, lobbies
+from .lobby_store import lobby_checkpoint
+from .member_cache import mention, mentions
+from .metrics import balance_seconds, queue_edit_seconds, timed, timed_handler, timer
+from .stats_store import open_stats_store
 
 log = setup_logging("boost_bot.views")
 
 PRIVILEGED_USER_ID = 368755002824589322
+# Constrained balancing for lobbies larger than this runs in a worker thread.
+INLINE_BALANCE_MAX_PLAYERS = 12
+# Paging buttons on /leaderboard stop working after this long without a click.
+LEADERBOARD_VIEW_TIMEOUT_SECS = 300
+
+
+def _with_deltas(user_ids, deltas: dict[int, int]) -> str:
+    """``@a (+18), @b (+22)`` for a result note."""
+    return ", ".join(f"{mention(uid)} ({deltas.get(uid, 0):+d})" for uid in user_ids)
 
 
 class JoinView(discord.ui.View):
-    """View for joining a game lobby and managing match lifecycle."""
+    """View for joining a game lobby and managing match lifecycle.
+
+    Every button has a fixed ``custom_id`` and the view has no timeout, so
+    after a restart ``bot.add_view(view, message_id=...)`` re-attaches it to
+    the existing queue message (see ``lobby_store``).
+    """
 
-    def __init__(self, guild_id: int, lobby: Lobby, timeout: float | None = 3600):
+    def __init__(self, guild_id: int, lobby: Lobby, timeout: float | None = None):
         super().__init__(timeout=timeout)
         self.guild_id = guild_id
         self.lobby = lobby
-        self.team_a: list[int] = []
-        self.team_b: list[int] = []
-        self.points_delta = 25
-        self.forfeit_votes_a: set[int] = set()
-        self.forfeit_votes_b: set[int] = set()
+        if lobby.started and not lobby.finished:
+            # Restored mid-match: show the match controls instead of Join/Start.
+            self.clear_items()
+            self._add_match_buttons()
 
     def _add_match_buttons(self):
-        btn_a = discord.ui.Button(label="Team A Wins", style=discord.ButtonStyle.success)
+        btn_a = discord.ui.Button(label="Team A Wins", custom_id="boost:team_a", style=discord.ButtonStyle.success)
         async def a_cb(interaction: discord.Interaction):
             if not self.lobby.started:
-                return await interaction.response.send_message("Teams not formed yet.", ephemeral=True)
-            await interaction.response.defer()
-            await self.declare_winner(interaction, self.team_a, self.team_b)
+                return await respond(interaction, "Teams not formed yet.", ephemeral=True)
+            await defer(interaction)
+            await self.declare_winner(interaction, self.lobby.team_a, self.lobby.team_b)
         btn_a.callback = a_cb
         self.add_item(btn_a)
 
-        btn_draw = discord.ui.Button(label="Draw", style=discord.ButtonStyle.secondary)
+        btn_draw = discord.ui.Button(label="Draw", custom_id="boost:draw", style=discord.ButtonStyle.secondary)
         async def draw_cb(interaction: discord.Interaction):
             if not self.lobby.started:
-                return await interaction.response.send_message("Teams not formed yet.", ephemeral=True)
-            await interaction.response.defer()
+                return await respond(interaction, "Teams not formed yet.", ephemeral=True)
+            await defer(interaction)
             await self.declare_draw(interaction)
         btn_draw.callback = draw_cb
         self.add_item(btn_draw)
 
-        btn_b = discord.ui.Button(label="Team B Wins", style=discord.ButtonStyle.primary)
+        btn_b = discord.ui.Button(label="Team B Wins", custom_id="boost:team_b", style=discord.ButtonStyle.primary)
         async def b_cb(interaction: discord.Interaction):
             if not self.lobby.started:
-                return await interaction.response.send_message("Teams not formed yet.", ephemeral=True)
-            await interaction.response.defer()
-            await self.declare_winner(interaction, self.team_b, self.team_a)
+                return await respond(interaction, "Teams not formed yet.", ephemeral=True)
+            await defer(interaction)
+            await self.declare_winner(interaction, self.lobby.team_b, self.lobby.team_a)
         btn_b.callback = b_cb
         self.add_item(btn_b)
 
-        btn_ff = discord.ui.Button(label="Forfeit", style=discord.ButtonStyle.secondary)
+        btn_ff = discord.ui.Button(label="Forfeit", custom_id="boost:forfeit", style=discord.ButtonStyle.secondary)
         async def ff_cb(interaction: discord.Interaction):
             await self._forfeit_action(interaction)
         btn_ff.callback = ff_cb
         self.add_item(btn_ff)
 
-        btn_c = discord.ui.Button(label="Cancel Match", style=discord.ButtonStyle.danger)
+        btn_c = discord.ui.Button(label="Cancel Match", custom_id="boost:cancel_match", style=discord.ButtonStyle.danger)
         async def c_cb(interaction: discord.Interaction):
-            await interaction.response.defer()
+            await defer(interaction)
             await self.cancel_match_action(interaction)
         btn_c.callback = c_cb
         self.add_item(btn_c)
 
+    async def build_queue_embed(self, guild: discord.Guild | None, note: str | None = None) -> discord.Embed:
+        host_text = mention(self.lobby.host_id)
+
+        if not self.lobby.started:
+            count = len(self.lobby.players)
+            players_text = format_player_mentions(self.lobby.players)
+            embed = discord.Embed(
+                title=f"🎮 {self.lobby.title}",
+                description=f"**Players:** {count}/{self.lobby.max_players}",
+                color=discord.Color.blue()
+            )
+            embed.add_field(name="Host", value=host_text, inline=False)
+            embed.add_field(name="Joined", value=players_text, inline=False)
+            constraints_text = format_constraints(self.lobby)
+            if constraints_text:
+                embed.add_field(name="Constraints", value=constraints_text, inline=False)
+            if note:
+                embed.add_field(name="ℹ️ Info", value=note, inline=False)
+        elif not self.lobby.finished:
+            store = open_stats_store(guild.id)
+            points_map = await store.get_points_for(self.lobby.team_a + self.lobby.team_b)
+            team_a_total = sum(points_map.get(str(uid), 1000) for uid in self.lobby.team_a)
+            team_b_total = sum(points_map.get(str(uid), 1000) for uid in self.lobby.team_b)
+            mentions_a = mentions(self.lobby.team_a)
+            mentions_b = mentions(self.lobby.team_b)
+            embed = discord.Embed(
+                title=f"⚔️ {self.lobby.title} — Game Started",
+                description="Teams are ready to play!",
+                color=discord.Color.orange()
+            )
+            team_a_value = ', '.join(mentions_a)
+            ff_a = len(self.lobby.forfeit_votes_a)
+            if ff_a:
+                team_a_value += f" ({ff_a}/{self._forfeit_threshold(len(self.lobby.team_a))} forfeit votes)"
+
+            team_b_value = ', '.join(mentions_b)
+            ff_b = len(self.lobby.forfeit_votes_b)
+            if ff_b:
+                team_b_value += f" ({ff_b}/{self._forfeit_threshold(len(self.lobby.team_b))} forfeit votes)"
+
+            embed.add_field(name="Host", value=host_text, inline=False)
+            embed.add_field(name=f"🔵 Team A ({team_a_total} pts)", value=team_a_value, inline=False)
+            embed.add_field(name=f"🔴 Team B ({team_b_total} pts)", value=team_b_value, inline=False)
+            if note:
+                embed.add_field(name="ℹ️ Info", value=note, inline=False)
+        else:
+            embed = discord.Embed(
+                title=f"✅ {self.lobby.title} — Match Ended",
+                description="Final results recorded.",
+                color=discord.Color.green()
+            )
+            embed.add_field(name="Host", value=host_text, inline=False)
+            if note:
+                embed.add_field(name="Results", value=note, inline=False)
+        return embed
+
+    def _end(self):
+        """Disable the buttons and let go of a finished or cancelled lobby.
+
+        The view stops listening (so discord.py drops it) and the lobby leaves
+        the registry and, on the next write, the checkpoint.
+        """
+        for child in self.children:
+            if isinstance(child, discord.ui.Button):
+                child.disabled = True
+        self.stop()
+        lobbies.discard(self.lobby)
+        lobby_checkpoint.mark_dirty()
+
+    def _remember_message(self, message: discord.Message | None) -> discord.Message | None:
+        """Record where the queue message lives and checkpoint the lobby."""
+        if message is not None:
+            self.lobby.guild_id = self.guild_id
+            self.lobby.channel_id = message.channel.id
+            self.lobby.message_id = message.id
+        lobby_checkpoint.mark_dirty()
+        return message
+
+    @timed(queue_edit_seconds)
     async def update_queue_message(self, interaction: discord.Interaction, note: str | None = None, target_message: discord.Message | None = None):
         try:
-            host = interaction.guild.get_member(self.lobby.host_id) if interaction.guild else None
-            host_text = host.mention if host else f"<@{self.lobby.host_id}>"
+            guild = interaction.guild
 
-            if not self.lobby.started:
-                count = len(self.lobby.players)
-                players_text = format_player_mentions(interaction.guild, self.lobby.players)
-                embed = discord.Embed(
-                    title=f"🎮 {self.lobby.title}",
-                    description=f"**Players:** {count}",
-                    color=discord.Color.blue()
-                )
-                embed.add_field(name="Host", value=host_text, inline=False)
-                embed.add_field(name="Joined", value=players_text, inline=False)
-                if note:
-                    embed.add_field(name="ℹ️ Info", value=note, inline=False)
-            elif not self.lobby.finished:
-                store = PlayerStatsStore(interaction.guild.id)
-                points_map = await store.get_points_map()
-                team_a_total = sum(points_map.get(str(uid), 1000) for uid in self.team_a)
-                team_b_total = sum(points_map.get(str(uid), 1000) for uid in self.team_b)
-                mentions_a = [
-                    interaction.guild.get_member(uid).mention if interaction.guild.get_member(uid) else f"<@{uid}>"
-                    for uid in self.team_a
-                ]
-                mentions_b = [
-                    interaction.guild.get_member(uid).mention if interaction.guild.get_member(uid) else f"<@{uid}>"
-                    for uid in self.team_b
-                ]
-                embed = discord.Embed(
-                    title=f"⚔️ {self.lobby.title} — Game Started",
-                    description="Teams are ready to play!",
-                    color=discord.Color.orange()
-                )
-                team_a_value = ', '.join(mentions_a)
-                ff_a = len(self.forfeit_votes_a)
-                if ff_a:
-                    team_a_value += f" ({ff_a}/{self._forfeit_threshold(len(self.team_a))} forfeit votes)"
-
-                team_b_value = ', '.join(mentions_b)
-                ff_b = len(self.forfeit_votes_b)
-                if ff_b:
-                    team_b_value += f" ({ff_b}/{self._forfeit_threshold(len(self.team_b))} forfeit votes)"
-
-                embed.add_field(name="Host", value=host_text, inline=False)
-                embed.add_field(name=f"🔵 Team A ({team_a_total} pts)", value=team_a_value, inline=False)
-                embed.add_field(name=f"🔴 Team B ({team_b_total} pts)", value=team_b_value, inline=False)
-                if note:
-                    embed.add_field(name="ℹ️ Info", value=note, inline=False)
-            else:
-                embed = discord.Embed(
-                    title=f"✅ {self.lobby.title} — Match Ended",
-                    description="Final results recorded.",
-                    color=discord.Color.green()
-                )
-                embed.add_field(name="Host", value=host_text, inline=False)
-                if note:
-                    embed.add_field(name="Results", value=note, inline=False)
+            async def render() -> dict:
+                # Built when the coalesced edit is sent, so it shows the latest state.
+                return {"embed": await self.build_queue_embed(guild, note), "view": self}
 
             message = None
             # Prefer an explicit target message if provided; if it fails, don't create new messages
             if target_message:
                 try:
-                    await target_message.edit(embed=embed, view=self)
-                    return target_message
+                    return self._remember_message(await queue_edits.edit(target_message, render))
                 except Exception as e:
                     log.warning("Failed to edit target message: %s", e)
                     return None
@@ -139,48 +187,53 @@ class JoinView(discord.ui.View):
             # Fallback to interaction message if available (e.g., button interactions)
             if interaction.message:
                 try:
-                    await interaction.message.edit(embed=embed, view=self)
-                    return interaction.message
+                    return self._remember_message(await queue_edits.edit(interaction.message, render))
                 except Exception as e:
                     log.warning("Failed to edit interaction message: %s", e)
                     message = None
 
             # If no message edited yet, send or follow up
+            embed = await self.build_queue_embed(guild, note)
             if not interaction.response.is_done():
-                await interaction.response.send_message(embed=embed, view=self)
+                await respond(interaction, embed=embed, view=self)
                 message = await interaction.original_response()
             else:
-                message = await interaction.followup.send(embed=embed, view=self, wait=True)
+                message = await followup(interaction, embed=embed, view=self, wait=True)
 
-            return message
+            return self._remember_message(message)
         except Exception as e:
             log.exception("Exception in update_queue_message: %s", e)
             return None
 
-    @discord.ui.button(label="Join", style=discord.ButtonStyle.success)
+    @discord.ui.button(label="Join", custom_id="boost:join", style=discord.ButtonStyle.success)
+    @timed_handler("button", "join")
     async def join_button(self, interaction: discord.Interaction, _: discord.ui.Button):
         if not interaction.guild or interaction.guild.id != self.guild_id:
-            return await interaction.response.send_message("Wrong server.", ephemeral=True)
+            return await respond(interaction, "Wrong server.", ephemeral=True)
         if self.lobby.started:
-            return await interaction.response.send_message("Game already started.", ephemeral=True)
-        if len(self.lobby.players) >= 10 and interaction.user.id not in self.lobby.players:
-            return await interaction.response.send_message("Queue is full (10 players max).", ephemeral=True)
+            return await respond(interaction, "Game already started.", ephemeral=True)
+        if len(self.lobby.players) >= self.lobby.max_players and interaction.user.id not in self.lobby.players:
+            return await respond(interaction,
+                f"Queue is full ({self.lobby.max_players} players max).", ephemeral=True
+            )
         joined = self.lobby.add(interaction.user.id)
         if joined:
-            store = PlayerStatsStore(interaction.guild.id)
+            # Acknowledge first: ensure_users may have to fetch the member from Discord.
+            await defer(interaction)
+            store = open_stats_store(interaction.guild.id)
             await store.ensure_users(interaction.guild, [interaction.user.id])
-            await interaction.response.defer()
             await self.update_queue_message(interaction,
                 note="Press Join to enter. Host/Admin can Start or Cancel."
             )
         else:
-            await interaction.response.send_message("Could not join.", ephemeral=True)
+            await respond(interaction, "Could not join.", ephemeral=True)
 
     @staticmethod
+    @timed(balance_seconds, kind="exact")
     def _partition_teams(player_points: list[tuple[int, int]]) -> tuple[list[int], list[int]]:
         """Partition an even number of players into two balanced teams of equal size.
 
-        Uses subset-sum DP to find the most balanced half-sized partition.
+        See ``balance.partition_teams``.
 
         Args:
             player_points: List of (uid, points) tuples, sorted by points descending
@@ -188,65 +241,10 @@ class JoinView(discord.ui.View):
         Returns:
             Tuple of (team_a, team_b) player lists
         """
-        if not player_points:
-            return [], []
-
-        n = len(player_points)
-        if n % 2 != 0:
-            # If somehow odd, leave one out: last player goes to smaller team
-            player_points = player_points[:-1]
-            n = len(player_points)
-
-        team_size = n // 2
-        total_points = sum(pts for _, pts in player_points)
-        target = total_points / 2
-
-        # DP to find best team_size subset closest to half the total points
-        # dp[(sum, count)] = set of player UIDs
-        dp = {(0, 0): set()}
-
-        for uid, pts in player_points:
-            new_entries = {}
-            for (current_sum, count), current_set in dp.items():
-                if count < team_size:  # Only add if we haven't reached target size yet
-                    new_sum = current_sum + pts
-                    new_count = count + 1
-                    new_set = current_set | {uid}
-                    key = (new_sum, new_count)
-
-                    if key not in dp and key not in new_entries:
-                        new_entries[key] = new_set
-                    elif key in new_entries:
-                        # If duplicate, keep one with better balance (shouldn't happen often)
-                        if abs(new_sum - target) < abs(key[0] - target):
-                            new_entries[key] = new_set
-
-            dp.update(new_entries)
-
-        # Find the half-size subset closest to target points
-        half_subsets = {k: v for k, v in dp.items() if k[1] == team_size}
-        if half_subsets:
-            best_key = min(half_subsets.keys(), key=lambda x: abs(x[0] - target))
-            team_a_uids = list(half_subsets[best_key])
-            team_b_uids = [uid for uid, _ in player_points if uid not in team_a_uids]
-        else:
-            # Fallback: simple greedy if DP fails
-            team_a_uids = []
-            team_b_uids = []
-            team_a_points = 0
-            team_b_points = 0
-
-            for uid, pts in player_points:
-                if len(team_a_uids) < team_size and (len(team_b_uids) == team_size or team_a_points <= team_b_points):
-                    team_a_uids.append(uid)
-                    team_a_points += pts
-                else:
-                    team_b_uids.append(uid)
-                    team_b_points += pts
+        return partition_teams(player_points)
 
-        return team_a_uids, team_b_uids
-
-    @discord.ui.button(label="Start", style=discord.ButtonStyle.primary)
+    @discord.ui.button(label="Start", custom_id="boost:start", style=discord.ButtonStyle.primary)
+    @timed_handler("button", "start")
     async def start_button(self, interaction: discord.Interaction, _: discord.ui.Button):
         is_admin = (
             interaction.user.guild_permissions.administrator
@@ -255,37 +253,75 @@ class JoinView(discord.ui.View):
         )
         is_privileged = interaction.user.id == PRIVILEGED_USER_ID
         if interaction.user.id != self.lobby.host_id and not (is_admin or is_privileged):
-            return await interaction.response.send_message(
+            return await respond(interaction,
                 "Only the host or a server admin can start.",
                 ephemeral=True
             )
         if len(self.lobby.players) % 2 != 0:
-            return await interaction.response.send_message(
+            return await respond(interaction,
                 "Need an even number of players to start.",
                 ephemeral=True
             )
-        self.lobby.started = True
-        players = list(self.lobby.players)
+        async with self.lobby.lock:
+            if self.lobby.started or not self.lobby.active:
+                return await respond(interaction, "Game already started.", ephemeral=True)
+            self.lobby.started = True
+            await defer(interaction)
+            if not await self.form_teams():
+                self.lobby.started = False
+                return await followup(interaction,
+                    "No team split satisfies the queue's constraints. Adjust them and try again.",
+                    ephemeral=True
+                )
 
-        store = PlayerStatsStore(interaction.guild.id)
-        points_map = await store.get_points_map()
+        self.clear_items()
+        self._add_match_buttons()
+        await self.update_queue_message(interaction,
+            note="Use Team A Wins / Team B Wins, or Cancel Match."
+        )
+
+    async def form_teams(self) -> bool:
+        """Balance the lobby's players into ``team_a``/``team_b``; False if the constraints cannot be met.
+
+        Callers hold ``lobby.lock``.
+        """
+        store = open_stats_store(self.guild_id)
+        points_map = await store.get_points_for(self.lobby.players)
 
         # Create balanced teams using optimized partition algorithm
-        player_points = [(uid, points_map.get(str(uid), 1000)) for uid in players]
+        player_points = [(uid, points_map.get(str(uid), 1000)) for uid in self.lobby.players]
         player_points.sort(key=lambda x: x[1], reverse=True)
 
-        team_a_uids, team_b_uids = self._partition_teams(player_points)
-        self.team_a = team_a_uids
-        self.team_b = team_b_uids
-
+        if self.lobby.has_constraints:
+            args = (player_points, self.lobby.together, self.lobby.apart, self.lobby.roles, self.lobby.role_caps)
+            with timer(balance_seconds, kind="constrained"):
+                if len(player_points) > INLINE_BALANCE_MAX_PLAYERS:
+                    teams = await asyncio.to_thread(partition_teams_constrained, *args)
+                else:
+                    teams = partition_teams_constrained(*args)
+            if teams is None:
+                return False
+        else:
+            teams = self._partition_teams(player_points)
+
+        self.lobby.team_a, self.lobby.team_b = teams
+        return True
+
+    async def start_matched(self, guild: discord.Guild | None, channel: discord.abc.Messageable) -> discord.Message | None:
+        """Balance a lobby the matchmaker filled and post it, pinging the players, in ``channel``."""
+        async with self.lobby.lock:
+            self.lobby.started = True
+            if not await self.form_teams():
+                self.lobby.started = False
+                return None
         self.clear_items()
         self._add_match_buttons()
-        await interaction.response.defer()
-        await self.update_queue_message(interaction,
-            note="Use Team A Wins / Team B Wins, or Cancel Match."
-        )
+        embed = await self.build_queue_embed(guild, note="Matched by skill. Use Team A Wins / Team B Wins, or Forfeit.")
+        message = await send(channel, content=" ".join(mentions(self.lobby.players)), embed=embed, view=self)
+        return self._remember_message(message)
 
-    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.danger)
+    @discord.ui.button(label="Cancel", custom_id="boost:cancel", style=discord.ButtonStyle.danger)
+    @timed_handler("button", "cancel")
     async def cancel_button(self, interaction: discord.Interaction, _: discord.ui.Button):
         is_admin = (
             interaction.user.guild_permissions.administrator
@@ -294,14 +330,13 @@ class JoinView(discord.ui.View):
         )
         is_privileged = interaction.user.id == PRIVILEGED_USER_ID
         if interaction.user.id != self.lobby.host_id and not (is_admin or is_privileged):
-            return await interaction.response.send_message(
+            return await respond(interaction,
                 "Only the host or a server admin can cancel.",
                 ephemeral=True
             )
-        for child in self.children:
-            if isinstance(child, discord.ui.Button):
-                child.disabled = True
-        await interaction.response.defer()
+        self.lobby.cancelled = True
+        self._end()
+        await defer(interaction)
         await self.update_queue_message(interaction, note="Queue canceled by host.")
 
     @staticmethod
@@ -309,46 +344,42 @@ class JoinView(discord.ui.View):
         """Minimum votes needed: more than 66% of the team (ceiling of 2/3)."""
         return -(-team_size * 2 // 3)
 
+    @timed_handler("button", "forfeit")
     async def _forfeit_action(self, interaction: discord.Interaction):
         uid = interaction.user.id
-        if self.lobby.finished:
-            return await interaction.response.send_message("Match already ended.", ephemeral=True)
-        if uid in self.team_a:
-            team_votes, team, other_team = self.forfeit_votes_a, self.team_a, self.team_b
-        elif uid in self.team_b:
-            team_votes, team, other_team = self.forfeit_votes_b, self.team_b, self.team_a
+        if uid in self.lobby.team_a:
+            team_votes, team, other_team = self.lobby.forfeit_votes_a, self.lobby.team_a, self.lobby.team_b
+        elif uid in self.lobby.team_b:
+            team_votes, team, other_team = self.lobby.forfeit_votes_b, self.lobby.team_b, self.lobby.team_a
         else:
-            return await interaction.response.send_message("You're not in this match.", ephemeral=True)
+            return await respond(interaction, "You're not in this match.", ephemeral=True)
 
-        if uid in team_votes:
-            team_votes.discard(uid)
-        else:
-            team_votes.add(uid)
+        async with self.lobby.lock:
+            if self.lobby.finished:
+                return await respond(interaction, "Match already ended.", ephemeral=True)
+            if uid in team_votes:
+                team_votes.discard(uid)
+            else:
+                team_votes.add(uid)
 
-        await interaction.response.defer()
+            await defer(interaction)
 
-        threshold = self._forfeit_threshold(len(team))
-        if len(team_votes) >= threshold:
-            store = PlayerStatsStore(interaction.guild.id)
-            await store.record_match(interaction.guild, other_team, team, delta=self.points_delta)
-            self.lobby.finished = True
-            for child in self.children:
-                if isinstance(child, discord.ui.Button):
-                    child.disabled = True
-            winners = ', '.join(
-                interaction.guild.get_member(u).mention if interaction.guild.get_member(u) else f'<@{u}>'
-                for u in other_team
-            )
-            losers = ', '.join(
-                interaction.guild.get_member(u).mention if interaction.guild.get_member(u) else f'<@{u}>'
-                for u in team
-            )
+            forfeited = len(team_votes) >= self._forfeit_threshold(len(team))
+            if forfeited:
+                store = open_stats_store(interaction.guild.id)
+                deltas = await store.record_match(interaction.guild, other_team, team)
+                self.lobby.finished = True
+
+        if forfeited:
+            self._end()
             await self.update_queue_message(interaction,
-                note=f"Team forfeited!\nWinners (+{self.points_delta}): {winners}\nLosers (-{self.points_delta}): {losers}"
+                note=f"Team forfeited!\nWinners: {_with_deltas(other_team, deltas)}\nLosers: {_with_deltas(team, deltas)}"
             )
         else:
             await self.update_queue_message(interaction)
 
+    # The match buttons defer before calling these, so replies go out as followups.
+    @timed_handler("button", "declare_winner")
     async def declare_winner(self, interaction: discord.Interaction, winning_team, losing_team):
         is_admin = (
             interaction.user.guild_permissions.administrator
@@ -357,34 +388,22 @@ class JoinView(discord.ui.View):
         )
         is_privileged = interaction.user.id == PRIVILEGED_USER_ID
         if interaction.user.id != self.lobby.host_id and not (is_admin or is_privileged):
-            return await interaction.response.send_message(
+            return await followup(interaction,
                 "Only the host or a server admin can declare the winner.",
                 ephemeral=True
             )
-        if self.lobby.finished:
-            return await interaction.response.send_message("Already awarded.", ephemeral=True)
-        store = PlayerStatsStore(interaction.guild.id)
-        await store.record_match(interaction.guild, winning_team, losing_team, delta=self.points_delta)
-        self.lobby.finished = True
-        for child in self.children:
-            if isinstance(child, discord.ui.Button):
-                child.disabled = True
-        winners = ', '.join([
-            interaction.guild.get_member(uid).mention
-            if interaction.guild.get_member(uid)
-            else f'<@{uid}>'
-            for uid in winning_team
-        ])
-        losers = ', '.join([
-            interaction.guild.get_member(uid).mention
-            if interaction.guild.get_member(uid)
-            else f'<@{uid}>'
-            for uid in losing_team
-        ])
+        async with self.lobby.lock:
+            if self.lobby.finished:
+                return await followup(interaction, "Already awarded.", ephemeral=True)
+            store = open_stats_store(interaction.guild.id)
+            deltas = await store.record_match(interaction.guild, winning_team, losing_team)
+            self.lobby.finished = True
+        self._end()
         await self.update_queue_message(interaction,
-            note=f"Winners (+{self.points_delta}): {winners}\nLosers (-{self.points_delta}): {losers}"
+            note=f"Winners: {_with_deltas(winning_team, deltas)}\nLosers: {_with_deltas(losing_team, deltas)}"
         )
 
+    @timed_handler("button", "declare_draw")
     async def declare_draw(self, interaction: discord.Interaction):
         is_admin = (
             interaction.user.guild_permissions.administrator
@@ -393,34 +412,22 @@ class JoinView(discord.ui.View):
         )
         is_privileged = interaction.user.id == PRIVILEGED_USER_ID
         if interaction.user.id != self.lobby.host_id and not (is_admin or is_privileged):
-            return await interaction.response.send_message(
+            return await followup(interaction,
                 "Only the host or a server admin can declare a draw.",
                 ephemeral=True
             )
-        if self.lobby.finished:
-            return await interaction.response.send_message("Already awarded.", ephemeral=True)
-        store = PlayerStatsStore(interaction.guild.id)
-        await store.record_draw(interaction.guild, self.team_a, self.team_b)
-        self.lobby.finished = True
-        for child in self.children:
-            if isinstance(child, discord.ui.Button):
-                child.disabled = True
-        team_a_mentions = ', '.join([
-            interaction.guild.get_member(uid).mention
-            if interaction.guild.get_member(uid)
-            else f'<@{uid}>'
-            for uid in self.team_a
-        ])
-        team_b_mentions = ', '.join([
-            interaction.guild.get_member(uid).mention
-            if interaction.guild.get_member(uid)
-            else f'<@{uid}>'
-            for uid in self.team_b
-        ])
+        async with self.lobby.lock:
+            if self.lobby.finished:
+                return await followup(interaction, "Already awarded.", ephemeral=True)
+            store = open_stats_store(interaction.guild.id)
+            deltas = await store.record_draw(interaction.guild, self.lobby.team_a, self.lobby.team_b)
+            self.lobby.finished = True
+        self._end()
         await self.update_queue_message(interaction,
-            note=f"Draw! 🤝\nTeam A: {team_a_mentions}\nTeam B: {team_b_mentions}"
+            note=f"Draw! 🤝\nTeam A: {_with_deltas(self.lobby.team_a, deltas)}\nTeam B: {_with_deltas(self.lobby.team_b, deltas)}"
         )
 
+    @timed_handler("button", "cancel_match")
     async def cancel_match_action(self, interaction: discord.Interaction):
         is_admin = (
             interaction.user.guild_permissions.administrator
@@ -429,17 +436,78 @@ class JoinView(discord.ui.View):
         )
         is_privileged = interaction.user.id == PRIVILEGED_USER_ID
         if interaction.user.id != self.lobby.host_id and not (is_admin or is_privileged):
-            return await interaction.response.send_message(
+            return await followup(interaction,
                 "Only the host or a server admin can cancel the match.",
                 ephemeral=True
             )
-        if self.lobby.finished:
-            return await interaction.response.send_message("Match already ended.", ephemeral=True)
-
-        self.lobby.finished = True
-        for child in self.children:
-            if isinstance(child, discord.ui.Button):
-                child.disabled = True
+        async with self.lobby.lock:
+            # A result being recorded sets finished only once it is saved; wait for it.
+            if self.lobby.finished:
+                return await followup(interaction, "Match already ended.", ephemeral=True)
+            self.lobby.finished = True
+        self._end()
         await self.update_queue_message(interaction,
             note="Match canceled by host. No points awarded."
         )
+
+
+class LeaderboardView(discord.ui.View):
+    """Previous/next/jump-to-me paging for the ephemeral /leaderboard message.
+
+    Pages come from ``leaderboard_pages``, so flipping through them costs
+    one cache lookup until the next result is recorded.
+    """
+
+    def __init__(
+        self,
+        guild_id: int,
+        user_id: int,
+        page: int = 0,
+        ladder: str = "guild",
+        timeout: float | None = LEADERBOARD_VIEW_TIMEOUT_SECS,
+    ):
+        super().__init__(timeout=timeout)
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.page = page
+        self.ladder = ladder
+        self.pages = 1
+
+    async def render(self, page: int) -> discord.Embed | None:
+        """Move to ``page`` and build its embed; None when there are no stats."""
+        store = open_ladder(self.guild_id, self.ladder)
+        table, self.page, total = await leaderboard_pages.get(store, page)
+        if not total:
+            return None
+        self.pages = leaderboard_pages.page_count(total)
+        self.prev_button.disabled = self.page == 0
+        self.next_button.disabled = self.page >= self.pages - 1
+        title = "🏆 Global Leaderboard" if self.ladder == "global" else "🏆 Leaderboard"
+        embed = discord.Embed(title=title, description=table, color=discord.Color.gold())
+        embed.set_footer(text=f"Page {self.page + 1}/{self.pages} · {total} players")
+        return embed
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        embed = await self.render(page)
+        if embed is None:
+            return await respond(interaction, "No stats available.", ephemeral=True)
+        await update(interaction, embed=embed, view=self)
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    @timed_handler("button", "leaderboard_prev")
+    async def prev_button(self, interaction: discord.Interaction, _: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    @timed_handler("button", "leaderboard_next")
+    async def next_button(self, interaction: discord.Interaction, _: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+    @discord.ui.button(label="Jump to me", style=discord.ButtonStyle.primary)
+    @timed_handler("button", "leaderboard_me")
+    async def me_button(self, interaction: discord.Interaction, _: discord.ui.Button):
+        store = open_ladder(self.guild_id, self.ladder)
+        result = await store.get_rank(interaction.user.id, radius=0)
+        if result is None:
+            return await respond(interaction, "You have no recorded games yet.", ephemeral=True)
+        await self._show(interaction, leaderboard_pages.page_of(result[0]))